@@ -0,0 +1,76 @@
+"""
+Throughput of --requests concurrent generations against a fake LLM that takes
+--delay-ms milliseconds per response: acall_gemini() on one event loop against
+call_gemini() on a pool of --threads worker threads, the way a sync worker
+serves them.
+
+    python -m RAGpipelines.benchmarks.asyncLoad --requests 200 --delay-ms 200 --threads 4
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Tuple
+
+import numpy as np
+
+from RAGpipelines.benchmarks.fakeLLM import fake_llm
+
+
+def timed(request: Callable[[], object], submitted: float) -> float:
+    request()
+    return time.perf_counter() - submitted
+
+
+def measure_sync(request: Callable[[], object], requests: int, threads: int) -> Tuple[float, List[float]]:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        # latency counts from submission, so time spent queued for a thread is included
+        timings = list(executor.map(lambda _: timed(request, start), range(requests)))
+    return time.perf_counter() - start, timings
+
+
+def measure_async(request: Callable[[], object], requests: int) -> Tuple[float, List[float]]:
+    async def one(submitted: float) -> float:
+        await request()
+        return time.perf_counter() - submitted
+
+    async def run() -> List[float]:
+        submitted = time.perf_counter()
+        return list(await asyncio.gather(*(one(submitted) for _ in range(requests))))
+
+    start = time.perf_counter()
+    timings = asyncio.run(run())
+    return time.perf_counter() - start, timings
+
+
+def report(name: str, elapsed: float, timings: List[float]) -> None:
+    ms = np.array(timings) * 1000
+    print(f"{name:<6} {len(timings) / elapsed:8.1f} req/s   mean {ms.mean():9.1f} ms   "
+          f"p50 {np.percentile(ms, 50):9.1f} ms   p95 {np.percentile(ms, 95):9.1f} ms")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark async against thread-pooled sync generation under load.")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--delay-ms", type=float, default=200.0, help="simulated LLM response time")
+    parser.add_argument("--threads", type=int, default=4, help="sync worker threads")
+    args = parser.parse_args(argv)
+
+    with fake_llm(delay=args.delay_ms / 1000):
+        from RAGpipelines.questionGeneratorPipeline import GeneratorClient
+
+        client = GeneratorClient()
+
+        def sync_request():
+            return client.call_gemini(prompt="Python", questions=5, difficulty_level="easy")
+
+        def async_request():
+            return client.acall_gemini(prompt="Python", questions=5, difficulty_level="easy")
+
+        report("sync", *measure_sync(sync_request, args.requests, args.threads))
+        report("async", *measure_async(async_request, args.requests))
+
+
+if __name__ == "__main__":
+    main()
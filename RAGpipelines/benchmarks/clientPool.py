@@ -0,0 +1,55 @@
+"""
+Per-request cost of building a GeneratorClient versus reusing the pooled one
+from the client registry, against a fake LLM whose construction takes
+--setup-ms milliseconds.
+
+    python -m RAGpipelines.benchmarks.clientPool --requests 200 --setup-ms 20
+"""
+import argparse
+import time
+from typing import Callable, List
+
+import numpy as np
+
+from RAGpipelines.benchmarks.fakeLLM import fake_llm
+
+
+def measure(request: Callable[[], object], requests: int) -> List[float]:
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        request()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(name: str, timings: List[float]) -> None:
+    ms = np.array(timings) * 1000
+    print(f"{name:<8} mean {ms.mean():8.3f} ms   p50 {np.percentile(ms, 50):8.3f} ms   p95 {np.percentile(ms, 95):8.3f} ms")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark pooled against per-request GeneratorClient construction.")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--setup-ms", type=float, default=20.0, help="simulated client construction time")
+    args = parser.parse_args(argv)
+
+    with fake_llm(setup_delay=args.setup_ms / 1000):
+        from RAGpipelines.clientRegistry import ClientRegistry
+        from RAGpipelines.questionGeneratorPipeline import GeneratorClient
+
+        registry = ClientRegistry()
+
+        def fresh():
+            return GeneratorClient().call_gemini(prompt="Python", questions=5, difficulty_level="easy")
+
+        def pooled():
+            return registry.get().call_gemini(prompt="Python", questions=5, difficulty_level="easy")
+
+        pooled()  # the first request pays the setup once
+        report("fresh", measure(fresh, args.requests))
+        report("pooled", measure(pooled, args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import asyncio
+import json
+import os
+import re
+import time
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Dict
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+
+def fake_questions(topic: str, count: int) -> Dict[str, Any]:
+    return {
+        "questions": [
+            {
+                "id": number,
+                "question": f"{topic}: fake question {number}?",
+                "choices": ["Option A", "Option B", "Option C", "Option D"],
+                "correct_index": number % 4,
+                "related_topic": [topic],
+                "hint": "A fake hint.",
+                "explanation": "A fake explanation.",
+            }
+            for number in range(1, count + 1)
+        ]
+    }
+
+
+def _request(prompt: str):
+    topic = re.search(r"^Topic: (.*)$", prompt, re.MULTILINE)
+    count = re.search(r"^Number of questions: (\d+)$", prompt, re.MULTILINE)
+    return (topic.group(1) if topic else "topic"), (int(count.group(1)) if count else 5)
+
+
+def _usage(prompt: str, output: str) -> Dict[str, int]:
+    # roughly four characters per token
+    return {"input_tokens": len(prompt) // 4, "output_tokens": len(output) // 4, "total_tokens": (len(prompt) + len(output)) // 4}
+
+
+class FakeStructuredModel:
+    def __init__(self, llm: "FakeChatModel", include_raw: bool):
+        self.llm = llm
+        self.include_raw = include_raw
+
+    def _response(self, prompt: str) -> Any:
+        parsed = fake_questions(*_request(prompt))
+        if not self.include_raw:
+            return parsed
+        text = json.dumps(parsed)
+        return {"raw": AIMessage(content=text, usage_metadata=_usage(prompt, text)), "parsed": parsed, "parsing_error": None}
+
+    def invoke(self, prompt: str, *args, **kwargs) -> Any:
+        time.sleep(self.llm.delay)
+        return self._response(prompt)
+
+    async def ainvoke(self, prompt: str, *args, **kwargs) -> Any:
+        await asyncio.sleep(self.llm.delay)
+        return self._response(prompt)
+
+
+class FakeJsonModel:
+    def __init__(self, llm: "FakeChatModel"):
+        self.llm = llm
+
+    async def astream(self, prompt: str, *args, **kwargs) -> AsyncIterator[AIMessageChunk]:
+        text = json.dumps(fake_questions(*_request(prompt)))
+        pieces = [text[i:i + 40] for i in range(0, len(text), 40)]
+        for piece in pieces:
+            await asyncio.sleep(self.llm.delay / len(pieces))
+            yield AIMessageChunk(content=piece)
+        yield AIMessageChunk(content="", usage_metadata=_usage(prompt, text))
+
+
+class FakeChatModel:
+    """
+    Offline stand-in for ChatGoogleGenerativeAI with the surface GeneratorClient
+    uses. Building one takes ``setup_delay`` seconds (standing in for channel
+    creation and the TLS handshake), every response takes ``delay`` seconds.
+    """
+    setup_delay = 0.0
+    delay = 0.0
+
+    def __init__(self, model: str = "fake", temperature: float = 0.0, **kwargs):
+        self.model = model
+        self.temperature = temperature
+        time.sleep(self.setup_delay)
+
+    def with_structured_output(self, schema=None, method: str = "json_schema", include_raw: bool = False):
+        return FakeStructuredModel(self, include_raw)
+
+    def bind(self, **kwargs):
+        return FakeJsonModel(self)
+
+
+@contextmanager
+def fake_llm(setup_delay: float = 0.0, delay: float = 0.0):
+    """
+    Makes GeneratorClient build FakeChatModel instead of ChatGoogleGenerativeAI
+    inside the block.
+    """
+    from RAGpipelines import questionGeneratorPipeline
+
+    model = type("FakeChatModel", (FakeChatModel,), {"setup_delay": setup_delay, "delay": delay})
+    original = questionGeneratorPipeline.ChatGoogleGenerativeAI
+    os.environ.setdefault("GOOGLE_API_KEY", "fake")
+    questionGeneratorPipeline.ChatGoogleGenerativeAI = model
+    try:
+        yield model
+    finally:
+        questionGeneratorPipeline.ChatGoogleGenerativeAI = original
@@ -0,0 +1,61 @@
+"""
+Validation cost per question of the compiled QUESTION_VALIDATOR against
+building the validator (compiling build_schema()) for every response, over
+--questions questions split into responses of --batch.
+
+    python -m RAGpipelines.benchmarks.validatorCost --questions 1000 --batch 10
+"""
+import argparse
+import time
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+from RAGpipelines.benchmarks.fakeLLM import fake_questions
+
+
+def responses(questions: int, batch: int, invalid_every: int) -> List[Dict[str, Any]]:
+    sets = []
+    for start in range(0, questions, batch):
+        response = fake_questions("Python", min(batch, questions - start))
+        for question in response["questions"][::invalid_every] if invalid_every else []:
+            # one kind of error the repair loop sees in practice
+            question["correct_index"] = len(question["choices"])
+        sets.append(response)
+    return sets
+
+
+def measure(validate: Callable[[Dict[str, Any]], Any], sets: List[Dict[str, Any]], rounds: int) -> List[float]:
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for response in sets:
+            validate(response)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(name: str, timings: List[float], questions: int) -> None:
+    us = np.array(timings) / questions * 1e6
+    print(f"{name:<10} mean {us.mean():8.3f} us/question   p50 {np.percentile(us, 50):8.3f}   p95 {np.percentile(us, 95):8.3f}")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark question set validation.")
+    parser.add_argument("--questions", type=int, default=1000)
+    parser.add_argument("--batch", type=int, default=10, help="questions per model response")
+    parser.add_argument("--invalid-every", type=int, default=5, help="make every n-th question invalid, 0 for none")
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    from RAGpipelines.questionGeneratorPipeline import QUESTION_VALIDATOR, build_schema
+    from RAGpipelines.validation import QuestionSetValidator
+
+    sets = responses(args.questions, args.batch, args.invalid_every)
+    report("compiled", measure(QUESTION_VALIDATOR.split, sets, args.rounds), args.questions)
+    report("per-call", measure(lambda response: QuestionSetValidator(build_schema()).split(response), sets, args.rounds),
+           args.questions)
+
+
+if __name__ == "__main__":
+    main()
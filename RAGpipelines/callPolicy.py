@@ -0,0 +1,296 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, List, Optional, Tuple
+
+import numpy as np
+from tenacity import (
+    AsyncRetrying,
+    Retrying,
+    retry_if_not_exception_type,
+    stop_after_attempt,
+    stop_after_delay,
+    wait_random_exponential,
+)
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class LatencyWindow:
+    """
+    Rolling window of the latest successful call latencies, in seconds.
+    """
+    def __init__(self, size: int = 200):
+        self.samples = deque(maxlen=size)
+        self.lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self.lock:
+            self.samples.append(seconds)
+
+    def percentile(self, percentile: float, min_samples: int = 1) -> Optional[float]:
+        with self.lock:
+            if len(self.samples) < min_samples:
+                return None
+            samples = np.fromiter(self.samples, dtype=np.float64, count=len(self.samples))
+        return float(np.percentile(samples, percentile))
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+
+class CircuitBreaker:
+    """
+    Opens after ``failure_threshold`` consecutive failures and rejects calls for
+    ``recovery_timeout`` seconds. After that a single probe call is let through
+    (half-open); its outcome closes or re-opens the circuit. A probe that ends
+    without an outcome (cancelled, rejected by the deadline) must call
+    release_probe() so the next call can probe instead.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = 0.0
+        self._state = self.CLOSED
+        self._probing = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self.lock:
+            if self._state == self.OPEN and self.clock() - self.opened_at >= self.recovery_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def admit(self) -> Tuple[bool, bool]:
+        """
+        Returns (allowed, probe); probe is True for the half-open trial call.
+        """
+        with self.lock:
+            if self._state == self.CLOSED:
+                return True, False
+            if self._state == self.OPEN and self.clock() - self.opened_at >= self.recovery_timeout:
+                self._state = self.HALF_OPEN
+                self._probing = False
+            if self._state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True, True
+            return False, False
+
+    def allow(self) -> bool:
+        return self.admit()[0]
+
+    def release_probe(self) -> None:
+        """
+        Frees the probe slot if the probe recorded no outcome; a no-op after
+        record_success() or record_failure().
+        """
+        with self.lock:
+            if self._state == self.HALF_OPEN:
+                self._probing = False
+
+    def record_success(self) -> None:
+        with self.lock:
+            self.failures = 0
+            self._state = self.CLOSED
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self.lock:
+            self.failures += 1
+            if self._state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self.opened_at = self.clock()
+                self._probing = False
+
+
+class CallPolicy:
+    """
+    Wraps provider calls with:
+
+    - jittered exponential retries (tenacity), bounded by ``retries`` and by the deadline
+    - a per-call ``deadline`` in seconds covering all attempts
+    - hedging: when an attempt is still running after ``hedge_after`` seconds
+      (default: the rolling ``hedge_percentile`` latency once ``min_samples``
+      calls were seen) a duplicate request is started and the first success wins
+    - a circuit breaker that fails fast with CircuitOpenError while the provider is degraded
+
+    Sync calls run on a small thread pool so a stuck request can be abandoned at
+    the deadline; the thread itself finishes in the background.
+    """
+    def __init__(
+        self,
+        retries: int = 2,
+        deadline: float = 90.0,
+        hedge_after: Optional[float] = None,
+        hedge_percentile: float = 95.0,
+        min_samples: int = 20,
+        max_hedges: int = 1,
+        backoff_initial: float = 0.5,
+        backoff_max: float = 8.0,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        max_workers: int = 16,
+    ):
+        self.retries = retries
+        self.deadline = deadline
+        self.hedge_after = hedge_after
+        self.hedge_percentile = hedge_percentile
+        self.min_samples = min_samples
+        self.max_hedges = max_hedges
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.breaker = CircuitBreaker(failure_threshold=failure_threshold, recovery_timeout=recovery_timeout)
+        self.latency = LatencyWindow()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-call")
+        self.hedges_started = 0
+
+    def hedge_delay(self) -> Optional[float]:
+        if self.hedge_after is not None:
+            return self.hedge_after
+        return self.latency.percentile(self.hedge_percentile, self.min_samples)
+
+    def _retry_options(self):
+        return dict(
+            stop=stop_after_attempt(self.retries + 1) | stop_after_delay(self.deadline),
+            wait=wait_random_exponential(multiplier=self.backoff_initial, max=self.backoff_max),
+            retry=retry_if_not_exception_type((CircuitOpenError, DeadlineExceeded)),
+            reraise=True,
+        )
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        deadline = time.monotonic() + self.deadline
+        for attempt in Retrying(**self._retry_options()):
+            with attempt:
+                return self._hedged(fn, deadline, args, kwargs)
+
+    async def acall(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Async counterpart of call(); ``fn`` returns an awaitable. Losing hedges are cancelled.
+        """
+        deadline = time.monotonic() + self.deadline
+        async for attempt in AsyncRetrying(**self._retry_options()):
+            with attempt:
+                return await self._ahedged(fn, deadline, args, kwargs)
+
+    def _admit(self, deadline: float) -> bool:
+        """
+        Returns True when the call is the breaker's half-open probe.
+        """
+        # checked first, a rejected call must not take the probe slot
+        if time.monotonic() >= deadline:
+            raise DeadlineExceeded("deadline exceeded")
+        allowed, probe = self.breaker.admit()
+        if not allowed:
+            raise CircuitOpenError("provider circuit is open")
+        return probe
+
+    def _next_wait(self, start: float, deadline: float, hedges: int, hedge_delay: Optional[float]) -> float:
+        now = time.monotonic()
+        timeout = deadline - now
+        if hedge_delay is not None and hedges < self.max_hedges:
+            timeout = min(timeout, start + hedge_delay * (hedges + 1) - now)
+        return max(0.0, timeout)
+
+    def _should_hedge(self, start: float, hedges: int, hedge_delay: Optional[float]) -> bool:
+        return (
+            hedge_delay is not None
+            and hedges < self.max_hedges
+            and time.monotonic() - start >= hedge_delay * (hedges + 1)
+        )
+
+    def _hedged(self, fn, deadline: float, args, kwargs) -> Any:
+        probe = self._admit(deadline)
+        try:
+            return self._hedged_call(fn, deadline, args, kwargs)
+        finally:
+            if probe:
+                self.breaker.release_probe()
+
+    def _hedged_call(self, fn, deadline: float, args, kwargs) -> Any:
+        start = time.monotonic()
+        hedge_delay = self.hedge_delay()
+        pending = {self.executor.submit(fn, *args, **kwargs)}
+        hedges = 0
+        errors: List[BaseException] = []
+
+        while pending:
+            done, pending = wait(pending, timeout=self._next_wait(start, deadline, hedges, hedge_delay),
+                                 return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return self._succeeded(start, future.result(), pending)
+                errors.append(future.exception())
+            if pending and time.monotonic() >= deadline:
+                self.breaker.record_failure()
+                raise DeadlineExceeded(f"no response within {self.deadline}s")
+            if pending and self._should_hedge(start, hedges, hedge_delay):
+                hedges += 1
+                self.hedges_started += 1
+                pending.add(self.executor.submit(fn, *args, **kwargs))
+
+        self.breaker.record_failure()
+        raise errors[-1]
+
+    async def _ahedged(self, fn, deadline: float, args, kwargs) -> Any:
+        probe = self._admit(deadline)
+        start = time.monotonic()
+        hedge_delay = self.hedge_delay()
+        pending = set()
+        hedges = 0
+        errors: List[BaseException] = []
+
+        try:
+            pending.add(asyncio.ensure_future(fn(*args, **kwargs)))
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=self._next_wait(start, deadline, hedges, hedge_delay),
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return self._succeeded(start, task.result(), pending)
+                    errors.append(task.exception())
+                if pending and time.monotonic() >= deadline:
+                    self.breaker.record_failure()
+                    raise DeadlineExceeded(f"no response within {self.deadline}s")
+                if pending and self._should_hedge(start, hedges, hedge_delay):
+                    hedges += 1
+                    self.hedges_started += 1
+                    pending.add(asyncio.ensure_future(fn(*args, **kwargs)))
+            self.breaker.record_failure()
+            raise errors[-1]
+        finally:
+            for task in pending:
+                task.cancel()
+            if probe:
+                self.breaker.release_probe()
+
+    def _succeeded(self, start: float, result: Any, pending) -> Any:
+        self.latency.record(time.monotonic() - start)
+        self.breaker.record_success()
+        for other in pending:
+            other.cancel()
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "circuit": self.breaker.state,
+            "p50": self.latency.percentile(50),
+            "p95": self.latency.percentile(95),
+            "p99": self.latency.percentile(99),
+            "samples": len(self.latency),
+            "hedges_started": self.hedges_started,
+        }
@@ -0,0 +1,79 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+from RAGpipelines.questionGeneratorPipeline import GeneratorClient
+
+
+class ClientRegistry:
+    """
+    Process-wide, thread-safe pool of GeneratorClient instances keyed by
+    (model_name, temperature).
+
+    Each client keeps its ChatGoogleGenerativeAI transport and structured-output
+    runnable alive between requests, so the per-request setup cost (env lookup,
+    channel creation, TLS handshake, schema binding) is paid once per key.
+    The pool is bounded (least recently used key is evicted first) and clients
+    idle for longer than ``idle_timeout`` seconds are dropped.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 8,
+        idle_timeout: float = 600.0,
+        factory: Optional[Callable[..., GeneratorClient]] = None,
+    ):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.factory = factory or GeneratorClient
+        self._clients: "OrderedDict[Tuple[str, float], Tuple[GeneratorClient, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, model_name: str = "gemini-2.5-flash", temperature: float = 0.6) -> GeneratorClient:
+        key = (model_name, float(temperature))
+        now = time.monotonic()
+
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._clients.get(key)
+            if entry is not None:
+                self._clients[key] = (entry[0], now)
+                self._clients.move_to_end(key)
+                return entry[0]
+
+        # build outside the lock, creating the transport can be slow
+        client = self.factory(model_name=model_name, temperature=temperature)
+
+        with self._lock:
+            entry = self._clients.get(key)
+            if entry is not None:
+                # another thread won the race, keep its client
+                client = entry[0]
+            self._clients[key] = (client, now)
+            self._clients.move_to_end(key)
+            while len(self._clients) > self.max_size:
+                self._clients.popitem(last=False)
+        return client
+
+    def _evict_idle(self, now: float) -> None:
+        expired = [key for key, (_, last_used) in self._clients.items() if now - last_used > self.idle_timeout]
+        for key in expired:
+            del self._clients[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clients.clear()
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+
+registry = ClientRegistry()
+
+
+def get_generator_client(model_name: str = "gemini-2.5-flash", temperature: float = 0.6) -> GeneratorClient:
+    """
+    Returns the shared GeneratorClient for (model_name, temperature).
+    """
+    return registry.get(model_name=model_name, temperature=temperature)
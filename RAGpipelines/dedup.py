@@ -0,0 +1,209 @@
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, Hashable, Iterable, List, Set, Tuple
+
+import numpy as np
+import xxhash
+
+from RAGpipelines.questionSets import normalize_text
+
+
+_MASK64 = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+def shingles(text: str, size: int = 3) -> Set[str]:
+    """
+    Word n-grams of the normalized text; short texts fall back to single words.
+    """
+    words = normalize_text(text).replace("?", " ").replace(".", " ").split()
+    if len(words) < size:
+        return set(words) or {""}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class MinHasher:
+    """
+    MinHash signatures computed with one xxhash per shingle followed by
+    ``num_perm`` vectorized affine permutations.
+    """
+    def __init__(self, num_perm: int = 64, seed: int = 7):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        base = np.fromiter(
+            (xxhash.xxh64_intdigest(shingle.encode("utf-8")) for shingle in shingles(text)), dtype=np.uint64
+        )
+        with np.errstate(over="ignore"):
+            permuted = (base[:, None] * self.a[None, :] + self.b[None, :]) & _MASK64
+        return (permuted >> np.uint64(32)).min(axis=0).astype(np.uint32)
+
+
+def estimated_similarity(first: np.ndarray, second: np.ndarray) -> float:
+    return float(np.count_nonzero(first == second)) / len(first)
+
+
+class LSHIndex:
+    """
+    Banded locality-sensitive hash over MinHash signatures. A lookup touches only
+    the buckets of the query's bands, so its cost does not grow with the number
+    of stored items.
+    """
+    def __init__(self, num_perm: int = 64, bands: int = 16):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.buckets: List[Dict[bytes, List[Hashable]]] = [defaultdict(list) for _ in range(bands)]
+        self.signatures: Dict[Hashable, np.ndarray] = {}
+
+    def _band_keys(self, signature: np.ndarray) -> Iterable[Tuple[int, bytes]]:
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def add(self, key: Hashable, signature: np.ndarray) -> None:
+        if key in self.signatures:
+            return
+        self.signatures[key] = signature
+        for band, band_key in self._band_keys(signature):
+            self.buckets[band][band_key].append(key)
+
+    def query(self, signature: np.ndarray, threshold: float) -> List[Tuple[Hashable, float]]:
+        candidates = set()
+        for band, band_key in self._band_keys(signature):
+            candidates.update(self.buckets[band].get(band_key, ()))
+        matches = [(key, estimated_similarity(signature, self.signatures[key])) for key in candidates]
+        return sorted((match for match in matches if match[1] >= threshold), key=lambda match: -match[1])
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+
+class QuestionDeduplicator:
+    """
+    Drops near-duplicate questions within a batch and against earlier questions
+    stored under one or more scopes (e.g. ("user", 42, "python") or ("topic", "python")).
+
+    Scopes are kept in memory, least recently used scopes are evicted past
+    ``max_scopes``. ``loader(scope)`` may return the texts to seed a scope with
+    the first time it is seen; with a ``ttl`` the scope is loaded again once it
+    is older than ``ttl`` seconds, so it also sees texts stored by other
+    processes. An optional embedder adds a cosine check within the batch for
+    paraphrases that share few words.
+    """
+    def __init__(
+        self,
+        threshold: float = 0.7,
+        num_perm: int = 64,
+        bands: int = 16,
+        max_scopes: int = 10000,
+        loader=None,
+        embedder=None,
+        embedding_threshold: float = 0.92,
+        ttl: float = None,
+    ):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.max_scopes = max_scopes
+        self.loader = loader
+        self.embedder = embedder
+        self.embedding_threshold = embedding_threshold
+        self.ttl = ttl
+        self.hasher = MinHasher(num_perm=num_perm)
+        self.scopes: "OrderedDict[Hashable, LSHIndex]" = OrderedDict()
+        self.loaded_at: Dict[Hashable, float] = {}
+        self.lock = threading.Lock()
+
+    def _expired(self, scope: Hashable) -> bool:
+        return bool(self.loader and self.ttl is not None and time.monotonic() - self.loaded_at[scope] >= self.ttl)
+
+    def _scope(self, scope: Hashable) -> LSHIndex:
+        with self.lock:
+            index = self.scopes.get(scope)
+            if index is not None and not self._expired(scope):
+                self.scopes.move_to_end(scope)
+                return index
+
+        loaded_at = time.monotonic()
+        index = LSHIndex(num_perm=self.num_perm, bands=self.bands)
+        for text in (self.loader(scope) if self.loader else []):
+            index.add(normalize_text(text), self.hasher.signature(text))
+
+        with self.lock:
+            current = self.scopes.get(scope)
+            if current is not None and self.loaded_at[scope] >= loaded_at:
+                # another thread reloaded it meanwhile
+                index = current
+            else:
+                if current is not None:
+                    # keep what was remembered here since the last load and is not stored yet
+                    for key, signature in current.signatures.items():
+                        index.add(key, signature)
+                self.scopes[scope] = index
+                self.loaded_at[scope] = loaded_at
+            self.scopes.move_to_end(scope)
+            while len(self.scopes) > self.max_scopes:
+                evicted, _ = self.scopes.popitem(last=False)
+                del self.loaded_at[evicted]
+        return index
+
+    def filter(
+        self, questions: List[Dict[str, Any]], scopes: Iterable[Hashable] = (), remember: bool = True
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Returns (kept, dropped). Kept questions are added to every scope when remember is True.
+        """
+        indexes = [self._scope(scope) for scope in scopes]
+        batch = LSHIndex(num_perm=self.num_perm, bands=self.bands)
+        kept, dropped, signatures = [], [], []
+
+        for question in questions:
+            text = question.get("question", "")
+            signature = self.hasher.signature(text)
+            if any(index.query(signature, self.threshold) for index in [batch] + indexes):
+                dropped.append(question)
+                continue
+            batch.add(len(kept), signature)
+            kept.append(question)
+            signatures.append((normalize_text(text), signature))
+
+        if self.embedder is not None and len(kept) > 1:
+            kept, dropped, signatures = self._drop_paraphrases(kept, dropped, signatures)
+
+        if remember:
+            self._add(indexes, signatures)
+        return kept, dropped
+
+    def remember(self, questions: List[Dict[str, Any]], scopes: Iterable[Hashable]) -> None:
+        """
+        Adds questions to every scope, for sets filtered with remember=False
+        once they are actually kept (e.g. saved).
+        """
+        signatures = [
+            (normalize_text(question.get("question", "")), self.hasher.signature(question.get("question", "")))
+            for question in questions
+        ]
+        self._add([self._scope(scope) for scope in scopes], signatures)
+
+    def _add(self, indexes: List[LSHIndex], signatures: List[Tuple[str, np.ndarray]]) -> None:
+        with self.lock:
+            for index in indexes:
+                for key, signature in signatures:
+                    index.add(key, signature)
+
+    def _drop_paraphrases(self, kept, dropped, signatures):
+        vectors = self.embedder.embed_documents([question.get("question", "") for question in kept])
+        similarity = vectors @ vectors.T
+        keep_mask = np.ones(len(kept), dtype=bool)
+        for i in range(len(kept)):
+            if keep_mask[i]:
+                duplicates = np.flatnonzero(similarity[i, i + 1:] >= self.embedding_threshold) + i + 1
+                keep_mask[duplicates] = False
+        dropped = dropped + [question for question, keep in zip(kept, keep_mask) if not keep]
+        kept = [question for question, keep in zip(kept, keep_mask) if keep]
+        signatures = [signature for signature, keep in zip(signatures, keep_mask) if keep]
+        return kept, dropped, signatures
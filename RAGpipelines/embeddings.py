@@ -0,0 +1,79 @@
+import re
+from typing import List
+
+import numpy as np
+import xxhash
+
+
+_TOKEN = re.compile(r"\w+")
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class HashingEmbedder:
+    """
+    Deterministic, offline embedder based on signed feature hashing of word
+    unigrams and bigrams. Good enough for lexical retrieval and for tests that
+    must not call out to a provider.
+    """
+    name = "hashing"
+
+    def __init__(self, dim: int = 256, seed: int = 0):
+        self.dim = dim
+        self.seed = seed
+
+    def _embed(self, text: str, out: np.ndarray) -> None:
+        tokens = _TOKEN.findall(text.lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        for feature in features:
+            h = xxhash.xxh64_intdigest(feature.encode("utf-8"), seed=self.seed)
+            out[h % self.dim] += 1.0 if (h >> 63) & 1 else -1.0
+
+    def embed_documents(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            self._embed(text, vectors[row])
+        return _normalize_rows(vectors)
+
+    def embed_query(self, text: str) -> np.ndarray:
+        return self.embed_documents([text])[0]
+
+
+class GoogleEmbedder:
+    """
+    Gemini embeddings through langchain-google-genai. Needs GOOGLE_API_KEY.
+    """
+    name = "google"
+
+    def __init__(self, model: str = "models/gemini-embedding-001", dim: int = 768):
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+        self.dim = dim
+        self.client = GoogleGenerativeAIEmbeddings(model=model)
+
+    def embed_documents(self, texts: List[str]) -> np.ndarray:
+        vectors = np.asarray(
+            self.client.embed_documents(texts, output_dimensionality=self.dim), dtype=np.float32
+        )
+        return _normalize_rows(vectors.reshape(len(texts), self.dim))
+
+    def embed_query(self, text: str) -> np.ndarray:
+        vector = np.asarray(self.client.embed_query(text, output_dimensionality=self.dim), dtype=np.float32)
+        return _normalize_rows(vector.reshape(1, self.dim))[0]
+
+
+EMBEDDERS = {
+    HashingEmbedder.name: HashingEmbedder,
+    GoogleEmbedder.name: GoogleEmbedder,
+}
+
+
+def get_embedder(name: str = "hashing", **kwargs):
+    try:
+        return EMBEDDERS[name](**kwargs)
+    except KeyError:
+        raise ValueError(f"Unknown embedder: {name}")
@@ -0,0 +1,151 @@
+import copy
+import hashlib
+import random
+import threading
+from typing import Any, Dict, Optional
+
+from cachetools import TTLCache
+
+from RAGpipelines.prompts import question_generation_prompt
+from RAGpipelines.questionSets import normalize_text, renumber_questions, shuffle_question_set
+
+
+POLICY_REUSE = "reuse"
+POLICY_SHUFFLE = "shuffle"
+POLICY_MIX = "mix"
+
+
+def generation_cache_key(
+    topic: str, num_questions: int, difficulty: str, model_name: str, temperature: float, context_version: str = ""
+) -> str:
+    """
+    Content address of a generation: hash of the normalized final prompt plus
+    the model settings that produced it. context_version identifies the course
+    material the prompt is grounded in, so re-ingesting it starts a new key.
+    """
+    final_prompt = question_generation_prompt(topic=topic, num_questions=num_questions, difficulty=difficulty)
+    payload = "\x1f".join([normalize_text(final_prompt), model_name, repr(float(temperature)), context_version])
+    return "questions:" + hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def client_cache_key(client, topic: str, num_questions: int, difficulty: str) -> str:
+    """
+    generation_cache_key() for a request served by ``client``.
+    """
+    return generation_cache_key(
+        topic, num_questions, difficulty, client.model_name, client.temperature,
+        getattr(client, "context_version", ""),
+    )
+
+
+class LRUCacheBackend:
+    """
+    In-process LRU cache with a per-entry TTL.
+    """
+    def __init__(self, max_entries: int = 1024, timeout: float = 3600):
+        self._cache = TTLCache(maxsize=max_entries, ttl=timeout)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._cache.get(key)
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._cache[key] = value
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._cache.pop(key, None)
+
+
+class DjangoCacheBackend:
+    """
+    Stores question sets through the Django cache framework, so every worker shares them.
+    """
+    def __init__(self, alias: str = "default", timeout: Optional[float] = 3600):
+        from django.core.cache import caches
+
+        self._cache = caches[alias]
+        self.timeout = timeout
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self._cache.get(key)
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        self._cache.set(key, value, timeout=self.timeout)
+
+    def delete(self, key: str) -> None:
+        self._cache.delete(key)
+
+
+class GenerationCache:
+    """
+    Serves question sets from the backend when the same prompt was generated
+    before, and calls the client otherwise.
+
+    Freshness policies:
+        reuse   - return the cached set unchanged
+        shuffle - return the cached set with question and choice order shuffled
+        mix     - keep (1 - mix_ratio) of the questions from the cached set and
+                  generate the rest fresh
+    """
+    def __init__(self, backend, policy: str = POLICY_SHUFFLE, mix_ratio: float = 0.5):
+        if policy not in (POLICY_REUSE, POLICY_SHUFFLE, POLICY_MIX):
+            raise ValueError(f"Unknown freshness policy: {policy}")
+        self.backend = backend
+        self.policy = policy
+        self.mix_ratio = mix_ratio
+
+    def call(self, client, prompt: str, questions: int = 5, difficulty_level: str = "easy") -> Dict[str, Any]:
+        key = client_cache_key(client, prompt, questions, difficulty_level)
+        cached = self.backend.get(key)
+
+        if cached is None:
+            response = client.call_gemini(prompt=prompt, questions=questions, difficulty_level=difficulty_level)
+            self._store(key, response)
+            return response
+
+        if self.policy != POLICY_MIX:
+            return self._serve(cached)
+        fresh_count = max(1, round(questions * self.mix_ratio))
+        fresh = client.call_gemini(prompt=prompt, questions=fresh_count, difficulty_level=difficulty_level)
+        return self._mix(cached, fresh, questions)
+
+    async def acall(self, client, prompt: str, questions: int = 5, difficulty_level: str = "easy") -> Dict[str, Any]:
+        """
+        Async counterpart of call(), using client.acall_gemini() on a miss.
+        """
+        key = client_cache_key(client, prompt, questions, difficulty_level)
+        cached = self.backend.get(key)
+
+        if cached is None:
+            response = await client.acall_gemini(prompt=prompt, questions=questions, difficulty_level=difficulty_level)
+            self._store(key, response)
+            return response
+
+        if self.policy != POLICY_MIX:
+            return self._serve(cached)
+        fresh_count = max(1, round(questions * self.mix_ratio))
+        fresh = await client.acall_gemini(prompt=prompt, questions=fresh_count, difficulty_level=difficulty_level)
+        return self._mix(cached, fresh, questions)
+
+    def _store(self, key: str, response: Dict[str, Any]) -> None:
+        if "questions" in response:
+            # never cache errors or unparsed responses
+            self.backend.set(key, copy.deepcopy(response))
+
+    def _serve(self, cached: Dict[str, Any]) -> Dict[str, Any]:
+        if self.policy == POLICY_REUSE:
+            return copy.deepcopy(cached)
+        return shuffle_question_set(cached)
+
+    def _mix(self, cached: Dict[str, Any], fresh: Dict[str, Any], questions: int) -> Dict[str, Any]:
+        if "questions" not in fresh:
+            # provider failed, the cached set is still a valid answer
+            return shuffle_question_set(cached)
+
+        cached_questions = copy.deepcopy(cached.get("questions", []))
+        kept = random.sample(cached_questions, min(len(cached_questions), questions - len(fresh["questions"])))
+        mixed = {"questions": renumber_questions(kept + fresh["questions"])}
+        return shuffle_question_set(mixed)
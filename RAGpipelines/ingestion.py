@@ -0,0 +1,229 @@
+import argparse
+import json
+import os
+from typing import Dict, Iterable, List, Optional
+
+import xxhash
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from pypdf import PdfReader
+
+from RAGpipelines.embeddings import get_embedder
+from RAGpipelines.vectorIndex import VectorIndex
+
+
+TEXT_EXTENSIONS = {".txt", ".md"}
+
+
+def read_document(path: str) -> str:
+    """
+    Extracts the plain text of a PDF, text or markdown file.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".pdf":
+        reader = PdfReader(path)
+        return "\n".join(page.extract_text() or "" for page in reader.pages)
+    if extension in TEXT_EXTENSIONS:
+        with open(path, encoding="utf-8", errors="ignore") as fh:
+            return fh.read()
+    raise ValueError(f"Unsupported document type: {path}")
+
+
+def iter_document_paths(paths: Iterable[str]) -> List[str]:
+    """
+    Expands directories into the supported files they contain.
+    """
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    if os.path.splitext(name)[1].lower() in TEXT_EXTENSIONS | {".pdf"}:
+                        found.append(os.path.join(root, name))
+        else:
+            found.append(path)
+    return found
+
+
+def chunk_text(text: str, chunk_size: int = 1000, chunk_overlap: int = 150) -> List[str]:
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    return splitter.split_text(text)
+
+
+class IndexManifest:
+    """
+    Records what is in a VectorIndex: for every document its text hash, the
+    size, mtime and hash of the file it was read from and, for every chunk, the
+    chunk hash and the row that holds its vector. Stored as manifest.json next
+    to the index files.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.documents: Dict[str, Dict] = {}
+        if os.path.exists(path):
+            with open(path) as fh:
+                self.documents = json.load(fh).get("documents", {})
+
+    def save(self) -> None:
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as fh:
+            json.dump({"documents": self.documents}, fh)
+        os.replace(tmp, self.path)
+
+    def remap_rows(self, remap: Dict[int, int]) -> None:
+        for entry in self.documents.values():
+            entry["chunks"] = {h: remap[row] for h, row in entry["chunks"].items() if row in remap}
+
+
+def content_hash(text: str) -> str:
+    return xxhash.xxh3_64_hexdigest(text.encode("utf-8"))
+
+
+def file_hash(path: str) -> str:
+    digest = xxhash.xxh3_64()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def ingest(
+    paths: Iterable[str],
+    index: VectorIndex,
+    embedder,
+    chunk_size: int = 1000,
+    chunk_overlap: int = 150,
+    prune: bool = False,
+    compact_threshold: float = 0.25,
+) -> Dict[str, int]:
+    """
+    Incrementally (re)indexes documents. Unchanged documents are skipped before
+    any text is extracted: first by size and mtime, then by a hash of the raw
+    file bytes, and for files rewritten with the same text by the hash of the
+    extracted text. For changed ones only chunks whose hash is new are embedded,
+    and chunks that disappeared are tombstoned. With prune=True, documents in
+    the manifest that are no longer among ``paths`` are removed. The vector file
+    is compacted once the share of tombstoned rows exceeds compact_threshold.
+    """
+    manifest = IndexManifest(os.path.join(index.path, "manifest.json"))
+    stats = {"documents_changed": 0, "documents_unchanged": 0, "chunks_added": 0, "chunks_removed": 0, "compacted": 0}
+    seen_paths = set()
+
+    for path in map(os.path.abspath, iter_document_paths(paths)):
+        seen_paths.add(path)
+        entry = manifest.documents.get(path, {"hash": None, "chunks": {}})
+        stat = os.stat(path)
+        if entry.get("size") == stat.st_size and entry.get("mtime") == stat.st_mtime_ns:
+            stats["documents_unchanged"] += 1
+            continue
+        # touched or copied but not edited: one read of the bytes, no PDF extraction
+        raw_hash = file_hash(path)
+        if entry.get("file_hash") == raw_hash:
+            entry.update(size=stat.st_size, mtime=stat.st_mtime_ns)
+            stats["documents_unchanged"] += 1
+            continue
+
+        text = read_document(path)
+        doc_hash = content_hash(text)
+        if entry["hash"] == doc_hash:
+            entry.update(file_hash=raw_hash, size=stat.st_size, mtime=stat.st_mtime_ns)
+            stats["documents_unchanged"] += 1
+            continue
+
+        # identical chunks inside one document are stored once
+        chunks = {}
+        for chunk in chunk_text(text, chunk_size=chunk_size, chunk_overlap=chunk_overlap):
+            chunks.setdefault(content_hash(chunk), chunk)
+
+        old_chunks = entry["chunks"]
+        removed = [row for h, row in old_chunks.items() if h not in chunks]
+        new_hashes = [h for h in chunks if h not in old_chunks]
+
+        kept = {h: row for h, row in old_chunks.items() if h in chunks}
+        if new_hashes:
+            texts = [chunks[h] for h in new_hashes]
+            rows = index.add(
+                embedder.embed_documents(texts),
+                [{"source": path, "hash": h, "text": chunks[h]} for h in new_hashes]
+            )
+            kept.update(zip(new_hashes, rows))
+        if removed:
+            index.delete(removed)
+
+        manifest.documents[path] = {
+            "hash": doc_hash, "file_hash": raw_hash, "size": stat.st_size, "mtime": stat.st_mtime_ns, "chunks": kept,
+        }
+        stats["documents_changed"] += 1
+        stats["chunks_added"] += len(new_hashes)
+        stats["chunks_removed"] += len(removed)
+
+    if prune:
+        for path in [p for p in manifest.documents if p not in seen_paths]:
+            rows = list(manifest.documents.pop(path)["chunks"].values())
+            index.delete(rows)
+            stats["chunks_removed"] += len(rows)
+
+    if index.deleted_ratio > compact_threshold:
+        manifest.remap_rows(index.compact())
+        stats["compacted"] = 1
+
+    manifest.save()
+    return stats
+
+
+class Retriever:
+    """
+    Embeds a query and returns the most similar chunks from a VectorIndex.
+    """
+    def __init__(self, index: VectorIndex, embedder, k: int = 4, max_chars: int = 4000):
+        self.index = index
+        self.embedder = embedder
+        self.k = k
+        self.max_chars = max_chars
+
+    def retrieve(self, query: str, k: Optional[int] = None):
+        return self.index.search(self.embedder.embed_query(query), k=k or self.k)
+
+    def context_for(self, query: str) -> str:
+        """
+        Joins the retrieved chunks into a prompt-ready block, capped at max_chars.
+        """
+        parts = []
+        used = 0
+        for hit in self.retrieve(query):
+            text = hit["text"].strip()
+            if used + len(text) > self.max_chars:
+                break
+            parts.append(text)
+            used += len(text)
+        return "\n\n---\n\n".join(parts)
+
+    @property
+    def version(self) -> str:
+        """
+        Identifies what context_for() can return: the index contents and the
+        retrieval settings. Part of the generation cache key.
+        """
+        return f"{self.index.embedder}:{self.index.version}:{self.k}:{self.max_chars}"
+
+
+def load_retriever(index_dir: str, k: int = 4) -> Retriever:
+    """
+    Opens an existing index with the embedder it was built with.
+    """
+    index = VectorIndex(index_dir)
+    return Retriever(index, get_embedder(index.embedder, dim=index.dim), k=k)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest course material into a RAG vector index.")
+    parser.add_argument("paths", nargs="+", help="PDF/text files or directories")
+    parser.add_argument("--index", default=os.getenv("RAG_INDEX_DIR", "rag_index"))
+    parser.add_argument("--embedder", default="hashing")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--prune", action="store_true", help="remove indexed documents not listed in paths")
+    args = parser.parse_args()
+
+    index = VectorIndex(args.index, dim=args.dim, embedder=args.embedder)
+    stats = ingest(args.paths, index, get_embedder(index.embedder, dim=index.dim), prune=args.prune)
+    print(f"Indexed {args.index}: {stats}")
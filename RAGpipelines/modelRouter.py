@@ -0,0 +1,267 @@
+import bisect
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from RAGpipelines.questionSets import renumber_questions
+
+
+# upper bucket edges in milliseconds, the last bucket is open ended
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+TIER_FAST = "fast"
+TIER_STRONG = "strong"
+
+
+class LatencyHistogram:
+    """
+    Rolling histogram over the last ``window`` calls of a backend: bucket counts
+    are updated as samples enter and leave the window, so reads are O(buckets).
+    """
+    def __init__(self, window: int = 500, buckets_ms: Iterable[float] = LATENCY_BUCKETS_MS):
+        self.edges = tuple(buckets_ms)
+        self.samples = deque()
+        self.window = window
+        self.counts = np.zeros(len(self.edges) + 1, dtype=np.int64)
+        self.total_ms = 0.0
+        self.errors = 0
+        self.last_recorded = 0.0
+        self.lock = threading.Lock()
+
+    def record(self, seconds: float, ok: bool = True) -> None:
+        ms = seconds * 1000.0
+        bucket = bisect.bisect_left(self.edges, ms)
+        with self.lock:
+            self.last_recorded = time.monotonic()
+            self.samples.append((bucket, ms, ok))
+            self.counts[bucket] += 1
+            self.total_ms += ms
+            self.errors += not ok
+            if len(self.samples) > self.window:
+                old_bucket, old_ms, old_ok = self.samples.popleft()
+                self.counts[old_bucket] -= 1
+                self.total_ms -= old_ms
+                self.errors -= not old_ok
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """
+        Upper edge (ms) of the bucket holding the percentile, None without samples.
+        """
+        with self.lock:
+            total = int(self.counts.sum())
+            if not total:
+                return None
+            bucket = int(np.searchsorted(np.cumsum(self.counts), total * percentile / 100.0))
+        return float(self.edges[bucket]) if bucket < len(self.edges) else float("inf")
+
+    @property
+    def count(self) -> int:
+        return len(self.samples)
+
+    @property
+    def mean_ms(self) -> Optional[float]:
+        with self.lock:
+            return self.total_ms / len(self.samples) if self.samples else None
+
+    @property
+    def error_rate(self) -> float:
+        with self.lock:
+            return self.errors / len(self.samples) if self.samples else 0.0
+
+    def recent_error_rate(self, last: int) -> float:
+        with self.lock:
+            recent = [ok for _, _, ok in list(self.samples)[-last:]]
+        return recent.count(False) / len(recent) if recent else 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            counts = self.counts.tolist()
+        labels = [f"<={edge}ms" for edge in self.edges] + [f">{self.edges[-1]}ms"]
+        return {
+            "count": self.count,
+            "mean_ms": self.mean_ms,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "error_rate": self.error_rate,
+            "buckets": dict(zip(labels, counts)),
+        }
+
+
+class StubClient:
+    """
+    Offline stand-in for GeneratorClient that builds placeholder questions
+    locally. Useful for tests and for running the API without an API key.
+    """
+    def __init__(self, model_name: str = "stub", temperature: float = 0.0):
+        self.model_name = model_name
+        self.temperature = temperature
+        # placeholder questions are not grounded in course material
+        self.context_version = ""
+
+    def _questions(self, prompt: str, questions: int, difficulty_level: str) -> List[Dict[str, Any]]:
+        return renumber_questions([
+            {
+                "id": 0,
+                "question": f"[{difficulty_level}] {prompt}: placeholder question {number}?",
+                "choices": ["Option A", "Option B", "Option C", "Option D"],
+                "correct_index": number % 4,
+                "related_topic": [prompt],
+                "hint": "This is a generated placeholder.",
+                "explanation": "Placeholder questions come from the offline stub model.",
+            }
+            for number in range(1, questions + 1)
+        ])
+
+    def call_gemini(self, prompt: str, questions: int = 5, difficulty_level: str = "easy") -> Dict[str, Any]:
+        return {"questions": self._questions(prompt, questions, difficulty_level)}
+
+    async def acall_gemini(self, prompt: str, questions: int = 5, difficulty_level: str = "easy") -> Dict[str, Any]:
+        return self.call_gemini(prompt, questions, difficulty_level)
+
+    async def astream_questions(
+        self, prompt: str, questions: int = 5, difficulty_level: str = "easy"
+    ) -> AsyncIterator[Dict[str, Any]]:
+        for question in self._questions(prompt, questions, difficulty_level):
+            yield question
+
+
+class Backend:
+    """
+    One routable model: a GeneratorClient-like client, its tier and relative cost.
+    """
+    def __init__(self, name: str, client, tier: str = TIER_FAST, cost: float = 1.0, histogram: LatencyHistogram = None):
+        self.name = name
+        self.client = client
+        self.tier = tier
+        self.cost = cost
+        self.histogram = histogram or LatencyHistogram()
+
+    @property
+    def circuit(self) -> str:
+        policy = getattr(self.client, "policy", None)
+        return policy.breaker.state if policy is not None else "closed"
+
+    def healthy(self, max_error_rate: float, min_samples: int, probe_interval: float) -> bool:
+        """
+        Judged on the last ``min_samples`` calls; a backend left unused for
+        ``probe_interval`` seconds is tried again so it can recover.
+        """
+        if self.circuit == "open":
+            return False
+        if time.monotonic() - self.histogram.last_recorded >= probe_interval:
+            return True
+        return self.histogram.recent_error_rate(min_samples) <= max_error_rate
+
+
+class ModelRouter:
+    """
+    Sends each generation to one of several backends and exposes the same
+    call_gemini / acall_gemini / astream_questions interface as GeneratorClient.
+
+    Large sets (more than ``large_set`` questions) and ``strong_difficulties``
+    prefer the strong tier, everything else the fast tier. Within the preferred
+    tier backends are ordered by rolling mean latency (cheaper first on ties);
+    unhealthy backends (open circuit or error rate of the last ``min_samples``
+    calls above ``max_error_rate``) are tried last. A failed call moves on to the next backend.
+    """
+    def __init__(
+        self,
+        backends: List[Backend],
+        large_set: int = 20,
+        strong_difficulties: Iterable[str] = ("hard",),
+        max_error_rate: float = 0.5,
+        min_samples: int = 10,
+        probe_interval: float = 30.0,
+    ):
+        if not backends:
+            raise ValueError("ModelRouter needs at least one backend")
+        self.backends = backends
+        self.large_set = large_set
+        self.strong_difficulties = set(strong_difficulties)
+        self.max_error_rate = max_error_rate
+        self.min_samples = min_samples
+        self.probe_interval = probe_interval
+        # the cache key is built from these, see RAGpipelines.generationCache
+        self.model_name = "router:" + ",".join(backend.name for backend in backends)
+        self.temperature = 0.0
+
+    @property
+    def context_version(self) -> str:
+        return ",".join(getattr(backend.client, "context_version", "") for backend in self.backends)
+
+    def preferred_tier(self, questions: int, difficulty_level: str) -> str:
+        if questions > self.large_set or difficulty_level in self.strong_difficulties:
+            return TIER_STRONG
+        return TIER_FAST
+
+    def candidates(self, questions: int, difficulty_level: str) -> List[Backend]:
+        tier = self.preferred_tier(questions, difficulty_level)
+
+        def rank(backend: Backend):
+            mean = backend.histogram.mean_ms
+            return (
+                not backend.healthy(self.max_error_rate, self.min_samples, self.probe_interval),
+                backend.tier != tier,
+                mean if mean is not None else 0.0,
+                backend.cost,
+            )
+        return sorted(self.backends, key=rank)
+
+    def call_gemini(self, prompt: str, questions: int = 5, difficulty_level: str = "easy") -> Dict[str, Any]:
+        response: Dict[str, Any] = {"error": "No backend available"}
+        for backend in self.candidates(questions, difficulty_level):
+            start = time.monotonic()
+            try:
+                response = backend.client.call_gemini(prompt=prompt, questions=questions, difficulty_level=difficulty_level)
+            except Exception as e:
+                response = {"error": str(e)}
+            backend.histogram.record(time.monotonic() - start, ok="error" not in response)
+            if "error" not in response:
+                return response
+        return response
+
+    async def acall_gemini(self, prompt: str, questions: int = 5, difficulty_level: str = "easy") -> Dict[str, Any]:
+        response: Dict[str, Any] = {"error": "No backend available"}
+        for backend in self.candidates(questions, difficulty_level):
+            start = time.monotonic()
+            try:
+                response = await backend.client.acall_gemini(prompt=prompt, questions=questions, difficulty_level=difficulty_level)
+            except Exception as e:
+                response = {"error": str(e)}
+            backend.histogram.record(time.monotonic() - start, ok="error" not in response)
+            if "error" not in response:
+                return response
+        return response
+
+    async def astream_questions(
+        self, prompt: str, questions: int = 5, difficulty_level: str = "easy"
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streams from the first candidate; the whole stream is recorded as one sample.
+        """
+        backend = self.candidates(questions, difficulty_level)[0]
+        start = time.monotonic()
+        ok = False
+        try:
+            async for question in backend.client.astream_questions(
+                prompt=prompt, questions=questions, difficulty_level=difficulty_level
+            ):
+                yield question
+            ok = True
+        finally:
+            backend.histogram.record(time.monotonic() - start, ok=ok)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            backend.name: {
+                "tier": backend.tier,
+                "cost": backend.cost,
+                "circuit": backend.circuit,
+                **backend.histogram.snapshot(),
+            }
+            for backend in self.backends
+        }
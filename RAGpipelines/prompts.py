@@ -1,51 +1,72 @@
-def question_generation_prompt(topic: str, num_questions: int = 5, difficulty: str = "medium") -> str:
+def compact_prompt(text: str) -> str:
     """
-    Generates a prompt for an LLM to create multiple-choice questions on a given topic.
+    Strips indentation and blank lines from a prompt template. Indented
+    triple-quoted strings otherwise cost input tokens on every call.
+    """
+    return "\n".join(line.strip() for line in text.strip().splitlines() if line.strip())
 
-    Args:
-        topic (str): The topic for which questions should be generated.
-        num_questions (int, optional): Number of questions to generate. Defaults to 5.
-        difficulty (str, optional): Difficulty level ("easy", "medium", "hard"). Defaults to "medium".
 
-    Returns:
-        str: The fully formatted prompt.
-    """
-    prompt = f"""
-        You are an expert exam-question generator.
+# compiled once at import; nothing request-specific may go in here
+QUESTION_INSTRUCTIONS = compact_prompt("""
+    You are an expert exam-question generator.
+
+    Create exactly the requested number of high-quality multiple-choice questions
+    on the topic and at the difficulty level given at the end.
+
+    Your output MUST follow these rules EXACTLY:
+
+    1. Output ONLY valid JSON (no explanation, no markdown, no text before or after).
+    2. JSON structure must strictly follow the provided schema.
 
-        Create exactly {num_questions} high-quality multiple-choice questions on the following topic:
-        Topic: {topic}
-        Difficulty level: {difficulty}
+    3. Question requirements:
+    - Must be clear, academically correct, and unambiguous.
+    - Must NOT include definitions or explanations inside the question text.
+    - Must NOT reveal clues that indicate the correct answer.
 
-        Your output MUST follow these rules EXACTLY:
+    4. Choices requirements:
+    - Must be short, distinct, and mutually exclusive.
+    - Must NOT include hints, clues, or overlapping meanings.
+    - Must be similar in length to avoid revealing the correct choice.
 
-        1. Output ONLY valid JSON (no explanation, no markdown, no text before or after).
-        2. JSON structure must strictly follow the provided schema.
+    5. Explanation requirements:
+    - Must be concise, factual, and directly reference why the correct answer is correct.
+    - Must NOT repeat the question.
+    - Must NOT mention distractors.
 
-        3. Question requirements:
-        - Must be clear, academically correct, and unambiguous.
-        - Must NOT include definitions or explanations inside the question text.
-        - Must NOT reveal clues that indicate the correct answer.
+    6. IDs:
+    - Generate sequential integer ids starting from 1.
 
-        4. Choices requirements:
-        - Must be short, distinct, and mutually exclusive.
-        - Must NOT include hints, clues, or overlapping meanings.
-        - Must be similar in length to avoid revealing the correct choice.
+    7. Related topic:
+    - Write topic name to which, question is related
 
-        5. Explanation requirements:
-        - Must be concise, factual, and directly reference why the correct answer is correct.
-        - Must NOT repeat the question.
-        - Must NOT mention distractors.
+    8. Hint:
+    - Must provide a useful, brief clue to aid in answering.
 
-        6. IDs:
-        - Generate sequential integer ids starting from 1.
+    Return ONLY the JSON. Ensure it is syntactically valid.
+    """)
 
-        7. Related topic:
-        - Write topic name to which, question is related
+GROUNDING_INSTRUCTIONS = compact_prompt("""
+    Base every question on the course material below. Do not ask about facts that are not in it.
+    """)
 
-        8. Hint:
-        - Must provide a useful, brief clue to aid in answering.
 
-        Return ONLY the JSON. Ensure it is syntactically valid.
-        """
-    return prompt
\ No newline at end of file
+def question_generation_prompt(topic: str, num_questions: int = 5, difficulty: str = "medium", context: str = "") -> str:
+    """
+    Generates a prompt for an LLM to create multiple-choice questions on a given topic.
+
+    Args:
+        topic (str): The topic for which questions should be generated.
+        num_questions (int, optional): Number of questions to generate. Defaults to 5.
+        difficulty (str, optional): Difficulty level ("easy", "medium", "hard"). Defaults to "medium".
+        context (str, optional): Retrieved course material the questions must be grounded in. Defaults to "".
+
+    The static instructions come first and are identical for every request, so
+    provider-side prefix caching can reuse them; only the short suffix varies.
+
+    Returns:
+        str: The fully formatted prompt.
+    """
+    prompt = f"{QUESTION_INSTRUCTIONS}\nTopic: {topic}\nDifficulty level: {difficulty}\nNumber of questions: {num_questions}"
+    if context:
+        prompt += f"\n{GROUNDING_INSTRUCTIONS}\nCourse material:\n{context.strip()}"
+    return prompt
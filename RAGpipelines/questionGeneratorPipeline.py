@@ -1,9 +1,19 @@
 import os
 import json
-from typing import Any, Dict
+import asyncio
+import contextvars
+import math
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, List
 from dotenv import load_dotenv
 from langchain_google_genai import ChatGoogleGenerativeAI
+from RAGpipelines.callPolicy import CallPolicy
 from RAGpipelines.prompts import question_generation_prompt
+from RAGpipelines.questionSets import normalize_text, renumber_questions
+from RAGpipelines.streaming import QuestionStreamParser
+from RAGpipelines.tokenUsage import record_usage
+from RAGpipelines.ingestion import load_retriever
+from RAGpipelines.validation import QuestionSetValidator
 
 
 load_dotenv()
@@ -49,64 +59,355 @@ def build_schema() -> Dict[str, Any]:
     }
 
 
+# compiled once per process; see RAGpipelines.validation
+QUESTION_VALIDATOR = QuestionSetValidator(build_schema())
+
+
+def _message_text(message: Any) -> str:
+    """
+    Extracts plain text from a LangChain message chunk whose content may be a
+    string or a list of content parts.
+    """
+    content = getattr(message, "content", message)
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(
+            part if isinstance(part, str) else part.get("text", "")
+            for part in content
+            if isinstance(part, (str, dict))
+        )
+    return ""
+
 
 class GeneratorClient:
-    def __init__(self, model_name: str = "gemini-2.5-flash", temperature: float = 0.6):
+    def __init__(
+        self,
+        model_name: str = "gemini-2.5-flash",
+        temperature: float = 0.6,
+        chunk_size: int = 10,
+        max_parallel_chunks: int = 8,
+        chunk_retries: int = 1,
+        repair_rounds: int = 1,
+        retriever=None,
+        policy: CallPolicy = None,
+        request_timeout: float = None,
+    ):
         self.api_key = os.getenv("GOOGLE_API_KEY")
         self.model_name = model_name
         self.temperature = temperature
+        # requests above chunk_size questions are split into parallel sub-requests
+        self.chunk_size = chunk_size
+        self.max_parallel_chunks = max_parallel_chunks
+        self.chunk_retries = chunk_retries
+        # invalid questions in a response are regenerated up to repair_rounds times
+        self.repair_rounds = repair_rounds
+        # retries, deadline, hedging and circuit breaking around every model call
+        self.policy = policy if policy is not None else CallPolicy()
+        # transport timeout of one request, below the policy deadline so an abandoned request ends too
+        self.request_timeout = request_timeout if request_timeout is not None else self.policy.deadline * 0.9
 
         if not self.api_key:
             raise RuntimeError("Please set GOOGLE_API_KEY environment variable")
 
+        # optional retrieval over ingested course material (see RAGpipelines.ingestion)
+        self.retriever = retriever
+        index_dir = os.getenv("RAG_INDEX_DIR")
+        if self.retriever is None and index_dir and os.path.exists(os.path.join(index_dir, "index.json")):
+            self.retriever = load_retriever(index_dir)
+
         # instantiate the LangChain wrapper LLM
         self.client = ChatGoogleGenerativeAI(
             model=self.model_name,
             temperature=self.temperature,
-            # you can pass other params here like max_tokens, timeout, etc.
+            timeout=self.request_timeout,
+        )
+
+        # create a structured model that enforces the json_schema method.
+        # built once per client so pooled clients reuse it across calls.
+        # include_raw keeps the AIMessage so its usage_metadata can be recorded
+        self.structured_model = self.client.with_structured_output(
+            schema=build_schema(),
+            method="json_schema",
+            include_raw=True
+        )
+
+        # same JSON-schema binding as above but without the output parser,
+        # used to stream raw text for incremental parsing
+        self.json_model = self.client.bind(
+            response_mime_type="application/json",
+            response_json_schema=build_schema()
         )
 
     def call_gemini(self, prompt: str, questions: int = 5, difficulty_level: str = "easy") -> Dict[str, Any]:
         """
         Use the LangChain ChatGoogleGenerativeAI wrapper and LangChain's structured-output helper
         to force JSON output matching build_schema().
+
+        Requests larger than chunk_size are fanned out into concurrent sub-requests
+        and merged, see call_gemini_chunked().
+        """
+        if self.chunk_size and questions > self.chunk_size:
+            return self.call_gemini_chunked(prompt=prompt, questions=questions, difficulty_level=difficulty_level)
+        return self._call_single(prompt=prompt, questions=questions, difficulty_level=difficulty_level)
+
+    def call_gemini_chunked(self, prompt: str, questions: int = 5, difficulty_level: str = "easy") -> Dict[str, Any]:
+        """
+        Splits a large request into chunks of at most chunk_size questions, runs them
+        concurrently and merges the results with sequential ids. Questions repeated
+        across chunks are dropped. A failing chunk is retried chunk_retries times and
+        then skipped, so it only costs its own questions.
+        """
+        sizes = self._chunk_sizes(questions)
+
+        with ThreadPoolExecutor(max_workers=min(len(sizes), self.max_parallel_chunks)) as executor:
+            # each chunk runs in a copy of the caller's context so its token usage is recorded
+            results = list(executor.map(
+                lambda job: job[0].run(self._call_chunk, prompt=prompt, questions=job[1], difficulty_level=difficulty_level),
+                [(contextvars.copy_context(), size) for size in sizes]
+            ))
+
+        return self._merge_chunks(results, questions)
+
+    async def acall_gemini(self, prompt: str, questions: int = 5, difficulty_level: str = "easy") -> Dict[str, Any]:
+        """
+        Async counterpart of call_gemini() built on the LangChain ainvoke API, so an
+        event loop can hold many generations in flight without a thread each.
         """
-        final_prompt = question_generation_prompt(topic=prompt, num_questions=questions, difficulty=difficulty_level)
+        if self.chunk_size and questions > self.chunk_size:
+            return await self.acall_gemini_chunked(prompt=prompt, questions=questions, difficulty_level=difficulty_level)
+        return await self._acall_single(prompt=prompt, questions=questions, difficulty_level=difficulty_level)
 
+    async def acall_gemini_chunked(self, prompt: str, questions: int = 5, difficulty_level: str = "easy") -> Dict[str, Any]:
+        """
+        Async counterpart of call_gemini_chunked().
+        """
+        semaphore = asyncio.Semaphore(self.max_parallel_chunks)
+
+        async def run_chunk(size: int) -> Dict[str, Any]:
+            async with semaphore:
+                return await self._acall_chunk(prompt=prompt, questions=size, difficulty_level=difficulty_level)
+
+        results = await asyncio.gather(*(run_chunk(size) for size in self._chunk_sizes(questions)))
+        return self._merge_chunks(results, questions)
+
+    async def astream_questions(
+        self, prompt: str, questions: int = 5, difficulty_level: str = "easy"
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streams the model output and yields each question as soon as it is complete
+        and valid. Ids are renumbered in emission order. Once enough questions are
+        out the rest of the stream is drained for its usage metadata.
+
+        Opening the stream (up to the first chunk) goes through the call policy, so
+        it is retried, bounded by the deadline and refused while the circuit is
+        open. A stream that breaks off later counts as a failure for the breaker.
+        """
+        final_prompt = self.build_prompt(prompt, questions, difficulty_level)
+        parser = QuestionStreamParser()
+        emitted = 0
+        # chunks carry usage deltas, the last one usually holds most of it
+        usage = {"input_tokens": 0, "output_tokens": 0}
+
+        stream, first = await self.policy.acall(self._aopen_stream, final_prompt)
         try:
-            # create a structured model that enforces the json_schema method
-            structured_model = self.client.with_structured_output(
-                schema=build_schema(),
-                method="json_schema"
-            )
+            async for chunk in _prepend(first, stream):
+                for key, value in (getattr(chunk, "usage_metadata", None) or {}).items():
+                    if key in usage:
+                        usage[key] += value or 0
+                if emitted >= questions:
+                    continue
+                for question in parser.feed(_message_text(chunk)):
+                    if not QUESTION_VALIDATOR.is_valid(question):
+                        continue
+                    emitted += 1
+                    question["id"] = emitted
+                    yield question
+                    if emitted >= questions:
+                        break
+        except Exception:
+            self.policy.breaker.record_failure()
+            raise
+        finally:
+            if stream is not None:
+                await stream.aclose()
+            if any(usage.values()):
+                record_usage(usage)
 
-            # call the model. It returns a dict when using with_structured_output(..., method="json_schema")
-            response = structured_model.invoke(final_prompt)
-
-            # response should already be a dict matching your schema
-            # If it's wrapped in an AIMessage-like object, .content or .text might be needed,
-            # but with_structured_output + method="json_schema" returns parsed dict per docs.
-            if isinstance(response, dict):
-                return response
-
-            # fallback: try converting to dict if it's a string or has .text
-            if hasattr(response, "text"):
-                try:
-                    return json.loads(response.text)
-                except Exception:
-                    return {"raw": response.text}
-            if isinstance(response, str):
-                try:
-                    return json.loads(response)
-                except Exception:
-                    return {"raw": response}
-
-            return {"full_response": str(response)}
+    @property
+    def context_version(self) -> str:
+        """
+        Version of the retrieved course material, empty without a retriever.
+        """
+        return self.retriever.version if self.retriever is not None else ""
+
+    def build_prompt(self, prompt: str, questions: int, difficulty_level: str) -> str:
+        """
+        Final prompt for the model, grounded in retrieved course material when a retriever is set.
+        """
+        context = self.retriever.context_for(prompt) if self.retriever is not None else ""
+        return question_generation_prompt(topic=prompt, num_questions=questions, difficulty=difficulty_level, context=context)
+
+    def _chunk_sizes(self, questions: int) -> List[int]:
+        chunk_count = math.ceil(questions / self.chunk_size)
+        return [self.chunk_size] * (chunk_count - 1) + [questions - self.chunk_size * (chunk_count - 1)]
+
+    def _merge_chunks(self, results: List[Dict[str, Any]], questions: int) -> Dict[str, Any]:
+        merged: List[Dict[str, Any]] = []
+        seen = set()
+        errors = []
+        for result in results:
+            if "questions" not in result:
+                errors.append(result.get("error", "invalid chunk response"))
+                continue
+            for question in result["questions"]:
+                fingerprint = normalize_text(question.get("question", ""))
+                if fingerprint in seen:
+                    continue
+                seen.add(fingerprint)
+                merged.append(question)
+
+        if not merged:
+            return {"error": errors[0] if errors else "No questions generated"}
+        return {"questions": renumber_questions(merged[:questions])}
+
+    def _call_chunk(self, prompt: str, questions: int, difficulty_level: str) -> Dict[str, Any]:
+        result: Dict[str, Any] = {}
+        for _ in range(self.chunk_retries + 1):
+            result = self._call_single(prompt=prompt, questions=questions, difficulty_level=difficulty_level)
+            if isinstance(result.get("questions"), list):
+                return result
+        return result
 
+    async def _acall_chunk(self, prompt: str, questions: int, difficulty_level: str) -> Dict[str, Any]:
+        result: Dict[str, Any] = {}
+        for _ in range(self.chunk_retries + 1):
+            result = await self._acall_single(prompt=prompt, questions=questions, difficulty_level=difficulty_level)
+            if isinstance(result.get("questions"), list):
+                return result
+        return result
+
+    def _call_single(self, prompt: str, questions: int = 5, difficulty_level: str = "easy") -> Dict[str, Any]:
+        final_prompt = self.build_prompt(prompt, questions, difficulty_level)
+
+        try:
+            # call the model. It returns a dict when using with_structured_output(..., method="json_schema")
+            response = self._parsed(self.policy.call(self._invoke, final_prompt))
         except Exception as e:
             # return the error so you can debug locally
             return {"error": str(e)}
 
+        valid, errors = QUESTION_VALIDATOR.split(_coerce_response(response))
+        for _ in range(self.repair_rounds):
+            missing = questions - len(valid)
+            if not errors or not valid or missing <= 0:
+                break
+            # keep the valid questions and only ask again for the ones that failed validation
+            try:
+                response = self._parsed(self.policy.call(self._invoke, self.build_prompt(prompt, missing, difficulty_level)))
+            except Exception:
+                break
+            extra, errors = QUESTION_VALIDATOR.split(_coerce_response(response))
+            valid += extra
+        return self._validated_result(valid, errors, questions)
+
+    async def _acall_single(self, prompt: str, questions: int = 5, difficulty_level: str = "easy") -> Dict[str, Any]:
+        final_prompt = self.build_prompt(prompt, questions, difficulty_level)
+
+        try:
+            response = self._parsed(await self.policy.acall(self._ainvoke, final_prompt))
+        except Exception as e:
+            return {"error": str(e)}
+
+        valid, errors = QUESTION_VALIDATOR.split(_coerce_response(response))
+        for _ in range(self.repair_rounds):
+            missing = questions - len(valid)
+            if not errors or not valid or missing <= 0:
+                break
+            try:
+                response = self._parsed(await self.policy.acall(self._ainvoke, self.build_prompt(prompt, missing, difficulty_level)))
+            except Exception:
+                break
+            extra, errors = QUESTION_VALIDATOR.split(_coerce_response(response))
+            valid += extra
+        return self._validated_result(valid, errors, questions)
+
+    def _invoke(self, final_prompt: str) -> Any:
+        response = self.structured_model.invoke(final_prompt)
+        # with include_raw a bad response no longer raises; raise it so the call policy retries
+        if isinstance(response, dict) and response.get("parsing_error") is not None:
+            raise response["parsing_error"]
+        return response
+
+    async def _aopen_stream(self, final_prompt: str):
+        """
+        Starts a streaming request and waits for its first chunk. Returns the
+        stream and that chunk, or (None, None) for an empty stream.
+        """
+        stream = self.json_model.astream(final_prompt)
+        try:
+            return stream, await stream.__anext__()
+        except StopAsyncIteration:
+            return None, None
+        except BaseException:
+            # a failed or cancelled (losing hedge) attempt closes its own request
+            await stream.aclose()
+            raise
+
+    async def _ainvoke(self, final_prompt: str) -> Any:
+        response = await self.structured_model.ainvoke(final_prompt)
+        if isinstance(response, dict) and response.get("parsing_error") is not None:
+            raise response["parsing_error"]
+        return response
+
+    @staticmethod
+    def _parsed(response: Any) -> Any:
+        """
+        Token accounting hook: records the prompt and completion tokens from the
+        raw message's usage_metadata (see RAGpipelines.tokenUsage) and returns
+        the parsed output. Responses without a raw message pass through.
+        """
+        if isinstance(response, dict) and "raw" in response and "parsed" in response:
+            record_usage(getattr(response["raw"], "usage_metadata", None))
+            return response["parsed"]
+        return response
+
+    @staticmethod
+    def _validated_result(valid: List[Dict[str, Any]], errors: List[str], questions: int) -> Dict[str, Any]:
+        if not valid:
+            return {"error": "; ".join(errors[:3]) or "No questions generated"}
+        return {"questions": renumber_questions(valid[:questions])}
+
+
+async def _prepend(first: Any, stream) -> AsyncIterator[Any]:
+    if stream is None:
+        return
+    yield first
+    async for chunk in stream:
+        yield chunk
+
+
+def _coerce_response(response: Any) -> Dict[str, Any]:
+    # response should already be a dict matching your schema
+    # If it's wrapped in an AIMessage-like object, .content or .text might be needed,
+    # but with_structured_output + method="json_schema" returns parsed dict per docs.
+    if isinstance(response, dict):
+        return response
+
+    # fallback: try converting to dict if it's a string or has .text
+    if hasattr(response, "text"):
+        try:
+            return json.loads(response.text)
+        except Exception:
+            return {"raw": response.text}
+    if isinstance(response, str):
+        try:
+            return json.loads(response)
+        except Exception:
+            return {"raw": response}
+
+    return {"full_response": str(response)}
+
 # client = GeneratorClient()
 # import json
 # d = client.call_gemini(
@@ -0,0 +1,51 @@
+import copy
+import random
+import re
+from typing import Any, Dict, List, Optional
+
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Lowercases and collapses whitespace so trivially different strings compare equal.
+    """
+    return _WHITESPACE.sub(" ", str(text)).strip().lower()
+
+
+def renumber_questions(questions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Rewrites question ids to be sequential starting from 1, as build_schema() expects.
+    """
+    for index, question in enumerate(questions, start=1):
+        question["id"] = index
+    return questions
+
+
+def shuffle_choices(question: Dict[str, Any], rng: random.Random) -> Dict[str, Any]:
+    """
+    Shuffles the choices of one question and moves correct_index along with its answer.
+    """
+    choices = list(question.get("choices", []))
+    correct_index = question.get("correct_index")
+    order = list(range(len(choices)))
+    rng.shuffle(order)
+    question["choices"] = [choices[i] for i in order]
+    if isinstance(correct_index, int) and 0 <= correct_index < len(choices):
+        question["correct_index"] = order.index(correct_index)
+    return question
+
+
+def shuffle_question_set(question_set: Dict[str, Any], seed: Optional[Any] = None) -> Dict[str, Any]:
+    """
+    Returns a copy of question_set with question order and choice order shuffled.
+    """
+    rng = random.Random(seed)
+    shuffled = copy.deepcopy(question_set)
+    questions = shuffled.get("questions", [])
+    rng.shuffle(questions)
+    for question in questions:
+        shuffle_choices(question, rng)
+    renumber_questions(questions)
+    return shuffled
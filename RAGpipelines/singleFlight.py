@@ -0,0 +1,174 @@
+import asyncio
+import copy
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+class _Flight:
+    """
+    One in-flight async call and the number of callers waiting for it.
+    """
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key inside one process: the first
+    caller runs the function, the others wait for its result. do() and ado()
+    return (result, shared) where shared is True for callers that did not run
+    the function themselves; each of them gets its own deep copy.
+    """
+    def __init__(self):
+        self._calls: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        # asyncio tasks are bound to their loop, so they are tracked per loop
+        self._async_calls: Dict[Tuple[int, str], "_Flight"] = {}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+
+        if not leader:
+            return copy.deepcopy(future.result()[0]), True
+
+        try:
+            future.set_result(self._run(key, fn))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+        return future.result()
+
+    async def ado(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        The call runs in its own task and every caller, the leader included,
+        awaits it through asyncio.shield(), so a cancelled caller (a client that
+        disconnected) only stops waiting. The task is cancelled once no caller
+        waits for it any more.
+        """
+        loop = asyncio.get_running_loop()
+        slot = (id(loop), key)
+        flight = self._async_calls.get(slot)
+        leader = flight is None
+        if leader:
+            flight = self._async_calls[slot] = _Flight(loop.create_task(self._arun(key, fn)))
+            flight.task.add_done_callback(lambda _: self._forget(slot, flight))
+
+        flight.waiters += 1
+        try:
+            result = await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if not flight.waiters and not flight.task.done():
+                # a later caller must not join a call that is being cancelled
+                self._forget(slot, flight)
+                flight.task.cancel()
+        if leader:
+            return result
+        return copy.deepcopy(result[0]), True
+
+    def _forget(self, slot: Tuple[int, str], flight: "_Flight") -> None:
+        if self._async_calls.get(slot) is flight:
+            del self._async_calls[slot]
+
+    def _run(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        return fn(), False
+
+    async def _arun(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        return await fn(), False
+
+
+class DjangoCacheSingleFlight(SingleFlight):
+    """
+    SingleFlight that also coalesces across worker processes through a shared
+    Django cache (database, Redis or Memcached backend; the default LocMemCache
+    is per process). The process-level leader takes a lock with cache.add();
+    when another worker holds it, it polls for the result that worker publishes
+    and runs the call itself if none shows up within ``wait_timeout`` seconds.
+    """
+    def __init__(self, alias: str = "default", lock_timeout: float = 180, result_timeout: float = 60,
+                 wait_timeout: float = 120, poll_interval: float = 0.2):
+        super().__init__()
+        from django.core.cache import caches
+
+        self._cache = caches[alias]
+        self.lock_timeout = lock_timeout
+        self.result_timeout = result_timeout
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+
+    def _acquire(self, key: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Returns (our token, None) when we got the lock, else (None, holder token).
+        """
+        token = uuid.uuid4().hex
+        if self._cache.add(f"singleflight:lock:{key}", token, timeout=self.lock_timeout):
+            return token, None
+        return None, self._cache.get(f"singleflight:lock:{key}")
+
+    def _publish(self, key: str, token: str, result: Any) -> None:
+        self._cache.set(f"singleflight:result:{key}:{token}", result, timeout=self.result_timeout)
+        self._cache.delete(f"singleflight:lock:{key}")
+
+    def _poll(self, key: str, holder: str) -> Tuple[bool, Any]:
+        """
+        (True, result) once the holder published, (True, None) if it released
+        the lock without a result, (False, None) while it is still running.
+        """
+        result = self._cache.get(f"singleflight:result:{key}:{holder}")
+        if result is not None:
+            return True, result
+        return self._cache.get(f"singleflight:lock:{key}") != holder, None
+
+    def _run(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        token, holder = self._acquire(key)
+        if token is None:
+            deadline = time.monotonic() + self.wait_timeout
+            while holder is not None and time.monotonic() < deadline:
+                time.sleep(self.poll_interval)
+                finished, result = self._poll(key, holder)
+                if result is not None:
+                    return result, True
+                if finished:
+                    break
+            return fn(), False
+
+        try:
+            result = fn()
+        except BaseException:
+            self._cache.delete(f"singleflight:lock:{key}")
+            raise
+        self._publish(key, token, result)
+        return result, False
+
+    async def _arun(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        token, holder = await asyncio.to_thread(self._acquire, key)
+        if token is None:
+            deadline = time.monotonic() + self.wait_timeout
+            while holder is not None and time.monotonic() < deadline:
+                await asyncio.sleep(self.poll_interval)
+                finished, result = await asyncio.to_thread(self._poll, key, holder)
+                if result is not None:
+                    return result, True
+                if finished:
+                    break
+            return await fn(), False
+
+        try:
+            result = await fn()
+        except BaseException:
+            await asyncio.to_thread(self._cache.delete, f"singleflight:lock:{key}")
+            raise
+        await asyncio.to_thread(self._publish, key, token, result)
+        return result, False
@@ -0,0 +1,93 @@
+import json
+from typing import Any, Dict, List
+
+
+REQUIRED_FIELDS = ("id", "question", "choices", "correct_index", "related_topic", "hint", "explanation")
+
+
+def is_complete_question(question: Any) -> bool:
+    """
+    Cheap check that a parsed object carries every field build_schema() requires.
+    """
+    if not isinstance(question, dict) or any(field not in question for field in REQUIRED_FIELDS):
+        return False
+    choices = question["choices"]
+    return (
+        isinstance(choices, list)
+        and len(choices) >= 2
+        and isinstance(question["correct_index"], int)
+        and 0 <= question["correct_index"] < len(choices)
+    )
+
+
+class QuestionStreamParser:
+    """
+    Incremental parser for the {"questions": [...]} document described by build_schema().
+
+    Text is fed in arbitrary pieces as the LLM streams it. Each question object is
+    returned by feed() as soon as its closing brace arrives, without waiting for
+    the rest of the document.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._in_array = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._object_start = None
+        self.done = False
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        self._buffer += text
+        completed: List[Dict[str, Any]] = []
+
+        if not self._in_array:
+            key_at = self._buffer.find('"questions"')
+            if key_at == -1:
+                return completed
+            array_at = self._buffer.find("[", key_at)
+            if array_at == -1:
+                return completed
+            self._in_array = True
+            self._pos = array_at + 1
+
+        buffer = self._buffer
+        pos = self._pos
+        while pos < len(buffer) and not self.done:
+            char = buffer[pos]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                if self._depth == 0:
+                    self._object_start = pos
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0 and self._object_start is not None:
+                    try:
+                        question = json.loads(buffer[self._object_start:pos + 1])
+                    except ValueError:
+                        question = None
+                    if is_complete_question(question):
+                        completed.append(question)
+                    self._object_start = None
+            elif char == "]" and self._depth == 0:
+                self.done = True
+            pos += 1
+
+        # drop text that can no longer be part of an unfinished object
+        keep_from = self._object_start if self._object_start is not None else pos
+        self._buffer = buffer[keep_from:]
+        if self._object_start is not None:
+            self._object_start = 0
+        self._pos = pos - keep_from
+        return completed
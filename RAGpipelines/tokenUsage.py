@@ -0,0 +1,58 @@
+import contextvars
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+
+class TokenUsage:
+    """
+    Prompt and completion tokens of the model calls made while it is tracked.
+    Safe to update from the threads of a chunked request.
+    """
+    def __init__(self):
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def add(self, prompt_tokens: int, completion_tokens: int) -> None:
+        with self.lock:
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.calls += 1
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+_current = contextvars.ContextVar("token_usage", default=None)
+
+
+@contextmanager
+def track_usage() -> Iterator[TokenUsage]:
+    """
+    Collects the usage of every model call made in this context (and in tasks
+    or threads started with a copy of it) into a fresh TokenUsage.
+    """
+    usage = TokenUsage()
+    token = _current.set(usage)
+    try:
+        yield usage
+    finally:
+        try:
+            _current.reset(token)
+        except ValueError:
+            # an async generator closed by the event loop runs in another context
+            pass
+
+
+def record_usage(metadata: Optional[Dict[str, Any]]) -> None:
+    """
+    Adds a LangChain ``usage_metadata`` dict (input_tokens / output_tokens) to
+    the current tracker. A no-op outside track_usage() or without metadata.
+    """
+    usage = _current.get()
+    if usage is None or not metadata:
+        return
+    usage.add(metadata.get("input_tokens") or 0, metadata.get("output_tokens") or 0)
@@ -0,0 +1,123 @@
+from typing import Any, Callable, Dict, List, Tuple
+
+
+Check = Callable[[Any, str], List[str]]
+
+_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+}
+
+
+def compile_schema(schema: Dict[str, Any]) -> Check:
+    """
+    Turns the subset of JSON schema used by build_schema() (type, properties,
+    required, additionalProperties, items, minItems, minimum) into a tree of
+    closures, so a document is validated without re-reading the schema.
+    The returned check gives a list of error messages, empty when valid.
+    """
+    checks: List[Check] = []
+
+    expected = _TYPES.get(schema.get("type"))
+    if expected is not None:
+        type_name = schema["type"]
+
+        def check_type(value, path):
+            # bool is an int subclass, but not a JSON integer
+            if not isinstance(value, expected) or (isinstance(value, bool) and type_name != "boolean"):
+                return [f"{path}: expected {type_name}"]
+            return []
+        checks.append(check_type)
+
+    if "minimum" in schema:
+        minimum = schema["minimum"]
+        checks.append(lambda value, path: [f"{path}: below {minimum}"] if value < minimum else [])
+
+    if "minItems" in schema:
+        min_items = schema["minItems"]
+        checks.append(lambda value, path: [f"{path}: fewer than {min_items} items"] if len(value) < min_items else [])
+
+    if "items" in schema:
+        item_check = compile_schema(schema["items"])
+
+        def check_items(value, path):
+            errors = []
+            for index, item in enumerate(value):
+                errors.extend(item_check(item, f"{path}[{index}]"))
+            return errors
+        checks.append(check_items)
+
+    if "properties" in schema or "required" in schema:
+        property_checks = {name: compile_schema(sub) for name, sub in schema.get("properties", {}).items()}
+        required = tuple(schema.get("required", ()))
+        closed = schema.get("additionalProperties") is False
+
+        def check_object(value, path):
+            errors = [f"{path}.{name}: missing" for name in required if name not in value]
+            for name, item in value.items():
+                check = property_checks.get(name)
+                if check is not None:
+                    errors.extend(check(item, f"{path}.{name}"))
+                elif closed:
+                    errors.append(f"{path}.{name}: not allowed")
+            return errors
+        checks.append(check_object)
+
+    def check(value, path="$"):
+        # later checks assume the type check passed
+        for step in checks:
+            errors = step(value, path)
+            if errors:
+                return errors
+        return []
+    return check
+
+
+class QuestionSetValidator:
+    """
+    Validates generated question sets against build_schema() plus the rules the
+    schema cannot express: correct_index inside choices, distinct choices and
+    sequential ids. The schema is compiled once, in __init__.
+    """
+    def __init__(self, schema: Dict[str, Any]):
+        self.check_question = compile_schema(schema["properties"]["questions"]["items"])
+
+    def question_errors(self, question: Any, path: str = "$") -> List[str]:
+        errors = self.check_question(question, path)
+        if errors:
+            return errors
+        choices = question["choices"]
+        if question["correct_index"] >= len(choices):
+            errors.append(f"{path}.correct_index: out of range")
+        if len({" ".join(choice.lower().split()) for choice in choices}) != len(choices):
+            errors.append(f"{path}.choices: not unique")
+        if not question["question"].strip():
+            errors.append(f"{path}.question: empty")
+        return errors
+
+    def is_valid(self, question: Any) -> bool:
+        return not self.question_errors(question)
+
+    def split(self, response: Any) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """
+        Returns (valid questions, errors) for a model response. Ids that are not
+        sequential are reported but do not invalidate a question; callers renumber.
+        """
+        if not isinstance(response, dict) or not isinstance(response.get("questions"), list):
+            return [], [str(response.get("error", "malformed response")) if isinstance(response, dict) else "malformed response"]
+
+        valid, errors = [], []
+        for index, question in enumerate(response["questions"]):
+            question_errors = self.question_errors(question, f"$.questions[{index}]")
+            if question_errors:
+                errors.extend(question_errors)
+            else:
+                valid.append(question)
+
+        if [question["id"] for question in valid] != list(range(1, len(valid) + 1)):
+            errors.append("$.questions: ids are not sequential")
+        return valid, errors
@@ -0,0 +1,246 @@
+import hashlib
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+
+
+class VectorIndex:
+    """
+    Flat vector index stored on disk as a raw float32 matrix and searched through
+    a memory map, so the OS page cache holds the hot part and start-up is instant.
+
+    Layout of ``path``:
+        index.json    - {"dim": ..., "count": ..., "embedder": ..., "stamp": ...}
+        vectors.f32   - count x dim float32 rows, L2-normalized
+        chunks.jsonl  - one JSON record (text + source metadata) per row
+        tombstones.json - rows deleted since the last compaction
+
+    Vectors are normalized on insert, so cosine similarity is a single
+    matrix-vector product over the whole file. Deleted rows stay in the file
+    and are masked out of results until compact() rewrites it.
+
+    Every write replaces index.json last. An index opened in another process
+    (the web workers, while manage.py or ingestion.py re-indexes) notices the
+    new header within ``reload_interval`` seconds and reloads its files and
+    memory map.
+    """
+
+    def __init__(self, path: str, dim: int = 256, embedder: str = "hashing", reload_interval: float = 1.0):
+        self.path = path
+        self.lock = threading.Lock()
+        self.reload_interval = reload_interval
+        os.makedirs(path, exist_ok=True)
+
+        if not os.path.exists(self._file("index.json")):
+            self.dim = dim
+            self.count = 0
+            self.embedder = embedder
+            self._write_header()
+        self._load(embedder)
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _read_header(self) -> Dict[str, Any]:
+        with open(self._file("index.json")) as fh:
+            return json.load(fh)
+
+    def _load(self, embedder: str = "hashing") -> None:
+        header = self._read_header()
+        self._stamp = header.get("stamp")
+        self._checked = time.monotonic()
+        self.dim = header["dim"]
+        self.embedder = header.get("embedder", embedder)
+        self.count = header["count"]
+        if self.count:
+            # never map past the end of the file, even while a writer is mid-way through a compaction
+            rows_on_disk = os.path.getsize(self._file("vectors.f32")) // (self.dim * 4)
+            self.count = min(self.count, rows_on_disk)
+
+        self._records = self._load_records()
+        self.count = min(self.count, len(self._records))
+        self._vectors = None
+        self.deleted = self._load_tombstones()
+        self._deleted_rows = None
+        self._version = None
+
+    def refresh(self) -> bool:
+        """
+        Reloads the index if another process rewrote it. Reads the header at
+        most every reload_interval seconds; returns True after a reload.
+        """
+        if time.monotonic() - self._checked < self.reload_interval:
+            return False
+        with self.lock:
+            self._checked = time.monotonic()
+            if self._read_header().get("stamp") == self._stamp:
+                return False
+            self._load(self.embedder)
+        return True
+
+    def _write_header(self) -> None:
+        # a new stamp on every write tells readers in other processes to reload
+        self._stamp = uuid.uuid4().hex
+        tmp = self._file("index.json.tmp")
+        with open(tmp, "w") as fh:
+            json.dump({"dim": self.dim, "count": self.count, "embedder": self.embedder, "stamp": self._stamp}, fh)
+        os.replace(tmp, self._file("index.json"))
+
+    def _load_records(self) -> List[Dict[str, Any]]:
+        if not os.path.exists(self._file("chunks.jsonl")):
+            return []
+        with open(self._file("chunks.jsonl")) as fh:
+            # lines past count may still be being appended
+            return [json.loads(line) for line in itertools.islice(fh, self.count)]
+
+    def _load_tombstones(self) -> set:
+        if not os.path.exists(self._file("tombstones.json")):
+            return set()
+        with open(self._file("tombstones.json")) as fh:
+            return {row for row in json.load(fh) if row < self.count}
+
+    def _write_tombstones(self) -> None:
+        tmp = self._file("tombstones.json.tmp")
+        with open(tmp, "w") as fh:
+            json.dump(sorted(self.deleted), fh)
+        os.replace(tmp, self._file("tombstones.json"))
+        self._deleted_rows = None
+
+    def _tombstone_rows(self) -> np.ndarray:
+        # built once per change of the tombstones, not on every search
+        if self._deleted_rows is None:
+            self._deleted_rows = np.fromiter(self.deleted, dtype=np.int64, count=len(self.deleted))
+        return self._deleted_rows
+
+    @property
+    def vectors(self) -> np.ndarray:
+        if self._vectors is None:
+            if self.count == 0:
+                return np.zeros((0, self.dim), dtype=np.float32)
+            self._vectors = np.memmap(self._file("vectors.f32"), dtype=np.float32, mode="r", shape=(self.count, self.dim))
+        return self._vectors
+
+    def add(self, vectors: np.ndarray, records: List[Dict[str, Any]]) -> List[int]:
+        """
+        Appends rows and returns their row numbers.
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        if len(vectors) != len(records):
+            raise ValueError("vectors and records must have the same length")
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        vectors = vectors / norms
+
+        with self.lock:
+            with open(self._file("vectors.f32"), "ab") as fh:
+                fh.write(vectors.tobytes())
+            with open(self._file("chunks.jsonl"), "a") as fh:
+                for record in records:
+                    fh.write(json.dumps(record) + "\n")
+            first_row = self.count
+            self._records.extend(records)
+            self.count += len(records)
+            self._write_header()
+            self._vectors = None
+            self._version = None
+        return list(range(first_row, first_row + len(records)))
+
+    def delete(self, rows: Iterable[int]) -> None:
+        """
+        Tombstones rows; they are skipped by search() until the next compact().
+        """
+        with self.lock:
+            self.deleted.update(row for row in rows if 0 <= row < self.count)
+            self._write_tombstones()
+            self._write_header()
+            self._version = None
+
+    @property
+    def live_count(self) -> int:
+        return self.count - len(self.deleted)
+
+    @property
+    def version(self) -> str:
+        """
+        Hash of the live chunks, changes whenever a chunk is added or deleted
+        (compaction keeps it). Cached until the next change.
+        """
+        self.refresh()
+        with self.lock:
+            if self._version is None:
+                digest = hashlib.sha256()
+                for row, record in enumerate(self._records):
+                    if row not in self.deleted:
+                        digest.update((record.get("hash") or record.get("text", "")).encode("utf-8"))
+                        digest.update(b"\x1f")
+                self._version = digest.hexdigest()[:16]
+            return self._version
+
+    @property
+    def deleted_ratio(self) -> float:
+        return len(self.deleted) / self.count if self.count else 0.0
+
+    def compact(self) -> Dict[int, int]:
+        """
+        Rewrites the vector and record files without tombstoned rows.
+        Returns a mapping from old to new row numbers for the surviving rows.
+        """
+        with self.lock:
+            mask = np.ones(self.count, dtype=bool)
+            mask[self._tombstone_rows()] = False
+            live = np.flatnonzero(mask)
+            remap = {int(old): new for new, old in enumerate(live)}
+            vectors = np.asarray(self.vectors)[live] if len(live) else np.zeros((0, self.dim), dtype=np.float32)
+            records = [self._records[row] for row in live]
+
+            self._vectors = None
+            tmp = self._file("vectors.f32.tmp")
+            with open(tmp, "wb") as fh:
+                fh.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+            os.replace(tmp, self._file("vectors.f32"))
+            tmp = self._file("chunks.jsonl.tmp")
+            with open(tmp, "w") as fh:
+                for record in records:
+                    fh.write(json.dumps(record) + "\n")
+            os.replace(tmp, self._file("chunks.jsonl"))
+
+            self._records = records
+            self.count = len(records)
+            self.deleted = set()
+            self._write_tombstones()
+            self._write_header()
+        return remap
+
+    def search(self, query: np.ndarray, k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Returns the top-k records by cosine similarity, best first, each with a "score".
+        """
+        self.refresh()
+        with self.lock:
+            # one consistent snapshot, a reload may swap these while we score
+            vectors, records, deleted_rows = self.vectors, self._records, self._tombstone_rows()
+        if len(vectors) == 0:
+            return []
+        query = np.asarray(query, dtype=np.float32).reshape(vectors.shape[1])
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        scores = vectors @ query
+        if len(deleted_rows):
+            scores[deleted_rows] = -np.inf
+        k = min(k, len(vectors) - len(deleted_rows))
+        if k <= 0:
+            return []
+        top = np.argpartition(scores, -k)[-k:]
+        top = top[np.argsort(scores[top])[::-1]]
+        return [dict(records[i], score=float(scores[i])) for i in top]
+
+    def __len__(self) -> int:
+        return self.count
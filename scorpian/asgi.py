@@ -2,6 +2,8 @@
 ASGI config for scorpian project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Run it with an ASGI server (e.g. ``uvicorn scorpian.asgi:application``) so the
+streaming generation endpoint can hold connections open without blocking workers.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -14,3 +16,13 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'scorpian.settings')
 
 application = get_asgi_application()
+
+# pick up generation jobs orphaned by the previous server process
+from user_profiles.jobs import start_session_recovery
+
+start_session_recovery()
+
+# deliver emails the previous server process left in the outbox
+from user_profiles.outbox import start_sender
+
+start_sender()
@@ -0,0 +1,153 @@
+import contextvars
+import functools
+import inspect
+import os
+import random
+from contextlib import contextmanager
+from typing import Any, Dict, List, Mapping, Optional
+
+from django.db import DEFAULT_DB_ALIAS
+
+
+SERVER_ENGINES = {
+    "postgresql": "django.db.backends.postgresql",
+    "mysql": "django.db.backends.mysql",
+}
+
+# applied to every new SQLite connection, see apply_sqlite_pragmas
+SQLITE_PRAGMAS = {
+    # readers no longer block the writer and vice versa
+    "journal_mode": "WAL",
+    # WAL is still crash safe at NORMAL, it only skips an fsync per commit
+    "synchronous": "NORMAL",
+    # wait for a busy write lock instead of failing with "database is locked"
+    "busy_timeout": 20000,
+}
+
+
+def database_config(base_dir, environ: Mapping[str, str] = os.environ) -> Dict[str, Dict[str, Any]]:
+    """
+    DATABASES built from the environment.
+
+    DATABASE_ENGINE is "sqlite" (default), "postgresql" or "mysql". Server
+    databases keep their connections open for DATABASE_CONN_MAX_AGE seconds and
+    check them before reuse. DATABASE_REPLICAS is a comma separated list of
+    read replicas: hosts for a server database, file paths for SQLite (a copy
+    of the main file stands in for a replica locally). Replicas are named
+    replica1, replica2, ... and mirror "default" in tests.
+    """
+    engine = environ.get("DATABASE_ENGINE", "sqlite")
+    if engine == "sqlite":
+        default = {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": environ.get("DATABASE_NAME") or base_dir / "db.sqlite3",
+            "OPTIONS": {
+                # take the write lock when the transaction starts, a deferred
+                # transaction that upgrades to a writer cannot wait for the lock
+                "transaction_mode": "IMMEDIATE",
+                "timeout": SQLITE_PRAGMAS["busy_timeout"] / 1000,
+            },
+        }
+        replica_field = "NAME"
+    else:
+        default = {
+            "ENGINE": SERVER_ENGINES.get(engine, engine),
+            "NAME": environ.get("DATABASE_NAME", "scorpian"),
+            "USER": environ.get("DATABASE_USER", ""),
+            "PASSWORD": environ.get("DATABASE_PASSWORD", ""),
+            "HOST": environ.get("DATABASE_HOST", "localhost"),
+            "PORT": environ.get("DATABASE_PORT", ""),
+            "CONN_MAX_AGE": int(environ.get("DATABASE_CONN_MAX_AGE", 60)),
+            "CONN_HEALTH_CHECKS": True,
+        }
+        replica_field = "HOST"
+
+    databases = {DEFAULT_DB_ALIAS: default}
+    replicas = [value.strip() for value in environ.get("DATABASE_REPLICAS", "").split(",") if value.strip()]
+    for number, value in enumerate(replicas, start=1):
+        databases[f"replica{number}"] = dict(default, **{replica_field: value, "TEST": {"MIRROR": DEFAULT_DB_ALIAS}})
+    return databases
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs) -> None:
+    """
+    connection_created receiver that sets SQLITE_PRAGMAS on SQLite connections.
+    """
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+
+
+def install_sqlite_pragmas() -> None:
+    from django.db.backends.signals import connection_created
+
+    connection_created.connect(apply_sqlite_pragmas, dispatch_uid="scorpian.database.apply_sqlite_pragmas")
+
+
+# alias of the replica the current block reads from, None for the primary
+_replica = contextvars.ContextVar("replica", default=None)
+
+
+def replica_aliases() -> List[str]:
+    """
+    Aliases in DATABASES that mirror another database, i.e. the read replicas.
+    """
+    from django.conf import settings
+
+    return [alias for alias, config in settings.DATABASES.items() if config.get("TEST", {}).get("MIRROR")]
+
+
+def reading_from_replica() -> bool:
+    return _replica.get() is not None
+
+
+@contextmanager
+def replica_reads(enabled: bool = True):
+    """
+    Sends reads inside the block to one randomly picked replica (or back to the
+    primary with enabled=False). A single replica per block keeps the reads of
+    a request consistent with each other. Writes always go to the primary.
+    """
+    replicas = replica_aliases() if enabled else []
+    token = _replica.set(random.choice(replicas) if replicas else None)
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+def read_from_replica(view):
+    """
+    Runs a (sync or async) view with replica_reads(). Only for views that can
+    live with a replica being slightly behind the primary.
+    """
+    if inspect.iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def wrapper(*args, **kwargs):
+            with replica_reads():
+                return await view(*args, **kwargs)
+    else:
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            with replica_reads():
+                return view(*args, **kwargs)
+    return wrapper
+
+
+class ReadReplicaRouter:
+    """
+    Routes reads made under replica_reads() to that block's replica; everything
+    else, including writes of objects that were loaded from a replica, goes to
+    the primary.
+    """
+    def db_for_read(self, model, **hints) -> Optional[str]:
+        return _replica.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints) -> Optional[str]:
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints) -> Optional[bool]:
+        # replicas hold the same rows as the primary
+        return True
@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 
+from scorpian.database import database_config
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -80,12 +82,13 @@ CORS_ALLOWED_ORIGINS = [
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
-}
+# Built from DATABASE_* environment variables, see scorpian.database.database_config.
+# SQLite runs in WAL mode with a busy timeout so concurrent writers wait instead of
+# failing; server databases reuse connections. Views decorated with
+# read_from_replica (quiz, history, analytics) read from DATABASE_REPLICAS.
+DATABASES = database_config(BASE_DIR)
+
+DATABASE_ROUTERS = ['scorpian.database.ReadReplicaRouter']
 
 
 # Password validation
@@ -131,6 +134,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
+        'user_profiles.tokens.SignedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -157,4 +161,147 @@ EMAIL_HOST = "smtp.gmail.com"
 EMAIL_PORT = 587
 EMAIL_HOST_USER = os.environ.get('EMAIL_USER')
 EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_PASSWORD')
-EMAIL_USE_TLS = True
\ No newline at end of file
+EMAIL_USE_TLS = True
+
+# Outgoing mail is queued in the OutboundEmail table and sent in batches over one
+# connection by a background thread (or `manage.py send_outbox --loop` when
+# AUTO_START is off). Failed sends are retried with exponential backoff.
+EMAIL_OUTBOX = {
+    'BATCH_SIZE': 50,
+    'MAX_ATTEMPTS': 6,
+    'BACKOFF_BASE': 30,
+    'BACKOFF_MAX': 3600,
+    'POLL_INTERVAL': 60,
+    'AUTO_START': True,
+}
+
+
+# Background question generation. ThreadPoolQueue runs jobs in-process,
+# ImmediateQueue runs them inline (handy for tests). Every RECOVER_INTERVAL
+# seconds, sessions left pending by a restart for STALE_AFTER seconds are queued
+# again and sessions left running that long are marked failed.
+GENERATION_QUEUE = {
+    'BACKEND': 'user_profiles.jobs.ThreadPoolQueue',
+    'OPTIONS': {
+        'workers': int(os.environ.get('GENERATION_WORKERS', 4)),
+    },
+    'STALE_AFTER': 1800,
+    'RECOVER_INTERVAL': 300,
+}
+
+
+# Cache of generated question sets, keyed on the final prompt and model settings.
+# POLICY is one of "reuse", "shuffle" or "mix" (MIX_RATIO of the questions are generated fresh).
+# Use 'RAGpipelines.generationCache.DjangoCacheBackend' to share entries across workers.
+GENERATION_CACHE = {
+    'BACKEND': 'RAGpipelines.generationCache.LRUCacheBackend',
+    'OPTIONS': {
+        'max_entries': 1024,
+        'timeout': 60 * 60 * 24,
+    },
+    'POLICY': 'shuffle',
+    'MIX_RATIO': 0.5,
+}
+
+
+# Pre-generated question bank. Hot topics are HOT_TOPICS plus the most requested
+# (topic, difficulty) pairs of the last HOT_TOPIC_WINDOW_DAYS. Refill them with
+# `python manage.py warm_question_bank`, or set AUTO_WARM to refill every
+# WARM_INTERVAL seconds from a background thread.
+QUESTION_BANK = {
+    'TARGET_DEPTH': 50,
+    'BATCH_SIZE': 10,
+    'HOT_TOPICS': [],
+    'HOT_TOPIC_LIMIT': 20,
+    'HOT_TOPIC_WINDOW_DAYS': 7,
+    'WARM_INTERVAL': 600,
+    'AUTO_WARM': False,
+}
+
+
+# In-memory skill model behind difficultyLevel="adaptive". Dirty ratings are
+# written to the SkillRating table every persist_interval seconds.
+SKILL_MODEL = {
+    'target_success': 0.7,
+    'persist_interval': 60,
+}
+
+
+# Near-duplicate detection (MinHash + LSH) against a user's earlier questions on
+# the same topic and against the question bank.
+QUESTION_DEDUP = {
+    'THRESHOLD': 0.7,
+    'NUM_PERM': 64,
+    'BANDS': 16,
+    'HISTORY_LIMIT': 2000,
+    'REGENERATE_ROUNDS': 1,
+    # reload a scope after this many seconds to see questions saved by other workers
+    'SCOPE_TTL': 60,
+}
+
+# Call policy around every LLM request (see RAGpipelines.callPolicy.CallPolicy):
+# jittered retries, a per-call deadline, a hedged duplicate request once an attempt
+# runs past the rolling p95 latency, and a circuit breaker.
+GENERATION_POLICY = {
+    'retries': 2,
+    'deadline': 90.0,
+    'hedge_percentile': 95.0,
+    'failure_threshold': 5,
+    'recovery_timeout': 30.0,
+}
+
+
+# Optional multi-model routing (see RAGpipelines.modelRouter.ModelRouter). Small
+# easy/medium sets go to the fast tier, large or hard sets to the strong tier.
+# A backend with 'CLIENT' is built from that dotted path instead of a Gemini model,
+# e.g. {'NAME': 'stub', 'CLIENT': 'RAGpipelines.modelRouter.StubClient', 'TIER': 'fast'}.
+# Leave empty to send everything to the default gemini-2.5-flash client.
+GENERATION_ROUTER = {}
+if os.getenv('GENERATION_ROUTING', 'false').lower() == 'true':
+    GENERATION_ROUTER = {
+        'BACKENDS': [
+            {'NAME': 'flash-lite', 'MODEL': 'gemini-2.5-flash-lite', 'TIER': 'fast', 'COST': 1.0},
+            {'NAME': 'flash', 'MODEL': 'gemini-2.5-flash', 'TIER': 'strong', 'COST': 3.0},
+        ],
+        'LARGE_SET': 20,
+        'STRONG_DIFFICULTIES': ['hard'],
+        'MAX_ERROR_RATE': 0.5,
+    }
+
+
+# Single-flight coalescing: concurrent generations of the same prompt share one
+# LLM call and every request still gets its own TestSession. SingleFlight works
+# within a process; DjangoCacheSingleFlight also coalesces across workers through
+# a shared cache alias (e.g. a DatabaseCache or Redis). SHUFFLE gives requests that
+# joined another one's call their own question and choice order.
+GENERATION_COALESCING = {
+    'BACKEND': 'RAGpipelines.singleFlight.SingleFlight',
+    'OPTIONS': {},
+    'SHUFFLE': True,
+}
+
+
+# Token-bucket limits on generation, charged with the estimated output tokens
+# (BASE_TOKENS + TOKENS_PER_QUESTION * noOfQuestions). Requests over the limit are
+# queued and released round-robin across users instead of being rejected.
+# Use user_profiles.throttling.DjangoCacheBucketStore to share buckets across workers.
+GENERATION_RATE_LIMIT = {
+    'BACKEND': 'user_profiles.throttling.MemoryBucketStore',
+    'USER_TOKENS_PER_MINUTE': 20000,
+    'USER_BURST': 30000,
+    'GLOBAL_TOKENS_PER_MINUTE': 200000,
+    'GLOBAL_BURST': 300000,
+    'TOKENS_PER_QUESTION': 150,
+    'MAX_QUESTIONS': 100,
+}
+
+
+
+# Signed bearer tokens (user_profiles.tokens), an alternative to session cookies that
+# needs no database access per request. Revoked token ids live in CACHE_ALIAS; use a
+# cache shared by all workers in production.
+AUTH_TOKENS = {
+    'ACCESS_TTL': 15 * 60,
+    'REFRESH_TTL': 14 * 24 * 3600,
+    'CACHE_ALIAS': 'default',
+}
\ No newline at end of file
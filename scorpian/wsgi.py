@@ -14,3 +14,13 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'scorpian.settings')
 
 application = get_wsgi_application()
+
+# pick up generation jobs orphaned by the previous server process
+from user_profiles.jobs import start_session_recovery
+
+start_session_recovery()
+
+# deliver emails the previous server process left in the outbox
+from user_profiles.outbox import start_sender
+
+start_sender()
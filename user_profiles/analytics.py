@@ -0,0 +1,95 @@
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
+
+from user_profiles.models import Answer, TopicMastery
+
+
+def record_attempt(user, difficulty_level: str, topic_breakdown: Dict[str, Dict[str, int]]) -> None:
+    """
+    Adds one attempt's per-topic counts to the user's rollup rows. Cost depends
+    only on the number of topics in the attempt, never on the user's history.
+    """
+    for topic, counts in topic_breakdown.items():
+        topic = topic[:255]
+        attempted = counts.get("total", 0)
+        correct = counts.get("correct", 0)
+        if not attempted:
+            continue
+
+        rows = TopicMastery.objects.filter(user=user, relatedTopic=topic, difficultyLevel=difficulty_level)
+        updated = rows.update(
+            attempted=F("attempted") + attempted,
+            correct=F("correct") + correct,
+            accuracy=Cast(F("correct") + correct, FloatField()) / (F("attempted") + attempted),
+        )
+        if updated:
+            continue
+        try:
+            with transaction.atomic():
+                TopicMastery.objects.create(
+                    user=user,
+                    relatedTopic=topic,
+                    difficultyLevel=difficulty_level,
+                    attempted=attempted,
+                    correct=correct,
+                    accuracy=correct / attempted,
+                )
+        except IntegrityError:
+            # a concurrent attempt created the row first
+            rows.update(
+                attempted=F("attempted") + attempted,
+                correct=F("correct") + correct,
+                accuracy=Cast(F("correct") + correct, FloatField()) / (F("attempted") + attempted),
+            )
+
+
+def rebuild_topic_mastery(user_ids: Optional[List[int]] = None) -> int:
+    """
+    Recomputes rollups from stored answers (backfill), each counted at the
+    difficulty of its question. Returns the number of rows written.
+    """
+    answers = Answer.objects.values_list(
+        "attempt__user_id", "question__difficultyLevel", "question__related_topic", "isCorrect"
+    )
+    mastery = TopicMastery.objects.all()
+    if user_ids:
+        answers = answers.filter(attempt__user_id__in=user_ids)
+        mastery = mastery.filter(user_id__in=user_ids)
+
+    totals = defaultdict(lambda: [0, 0])
+    for user_id, difficulty_level, related_topic, is_correct in answers.iterator(chunk_size=2000):
+        for topic in {str(topic) for topic in related_topic or []}:
+            entry = totals[(user_id, topic[:255], difficulty_level)]
+            entry[0] += 1
+            entry[1] += int(is_correct)
+
+    rows = [
+        TopicMastery(
+            user_id=user_id,
+            relatedTopic=topic,
+            difficultyLevel=difficulty_level,
+            attempted=attempted,
+            correct=correct,
+            accuracy=correct / attempted,
+        )
+        for (user_id, topic, difficulty_level), (attempted, correct) in totals.items()
+        if attempted
+    ]
+    with transaction.atomic():
+        mastery.delete()
+        TopicMastery.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def weakest_topics(user, limit: int = 5, difficulty_level: Optional[str] = None, min_attempted: int = 1):
+    """
+    Lowest-accuracy topics for a user, served from the (user, accuracy) index.
+    """
+    rows = TopicMastery.objects.filter(user=user, attempted__gte=min_attempted)
+    if difficulty_level:
+        rows = rows.filter(difficultyLevel=difficulty_level)
+    return rows.order_by("accuracy", "-attempted")[:limit]
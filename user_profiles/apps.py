@@ -4,3 +4,15 @@ from django.apps import AppConfig
 class UserProfilesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'user_profiles'
+
+    def ready(self):
+        from django.conf import settings
+        from scorpian.database import install_sqlite_pragmas
+        from user_profiles.generation import configure_generator_clients
+
+        install_sqlite_pragmas()
+        configure_generator_clients()
+        if getattr(settings, "QUESTION_BANK", {}).get("AUTO_WARM"):
+            from user_profiles.jobs import start_bank_warmer
+
+            start_bank_warmer()
@@ -0,0 +1,233 @@
+import threading
+from typing import Any, Dict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from RAGpipelines.callPolicy import CallPolicy
+from RAGpipelines.clientRegistry import get_generator_client, registry
+from RAGpipelines.dedup import QuestionDeduplicator
+from RAGpipelines.generationCache import GenerationCache, client_cache_key
+from RAGpipelines.modelRouter import Backend, ModelRouter
+from RAGpipelines.questionGeneratorPipeline import GeneratorClient
+from RAGpipelines.questionSets import normalize_text, shuffle_question_set
+
+
+_cache = None
+_cache_lock = threading.Lock()
+_deduplicator = None
+_router = None
+_single_flight = None
+
+
+_policies: Dict[str, CallPolicy] = {}
+_policy_lock = threading.Lock()
+
+
+def get_call_policy(model_name: str) -> CallPolicy:
+    """
+    The CallPolicy of one model, built from settings.GENERATION_POLICY. It
+    outlives the model's clients, so circuit state and latency history are
+    kept when the client registry evicts and rebuilds a client.
+    """
+    with _policy_lock:
+        policy = _policies.get(model_name)
+        if policy is None:
+            policy = _policies[model_name] = CallPolicy(**getattr(settings, "GENERATION_POLICY", {}))
+    return policy
+
+
+def _build_generator_client(**kwargs) -> GeneratorClient:
+    return GeneratorClient(policy=get_call_policy(kwargs["model_name"]), **kwargs)
+
+
+def configure_generator_clients() -> None:
+    """
+    Makes the shared client registry build clients with the call policy of
+    their model (one policy, so one circuit breaker, per model).
+    """
+    registry.factory = _build_generator_client
+    registry.clear()
+
+
+def get_router():
+    """
+    Builds the ModelRouter described by settings.GENERATION_ROUTER once per
+    process. Returns None when routing is not configured.
+    """
+    global _router
+    config = getattr(settings, "GENERATION_ROUTER", None)
+    if not config:
+        return None
+    if _router is None:
+        with _cache_lock:
+            if _router is None:
+                backends = []
+                for backend in config["BACKENDS"]:
+                    if "CLIENT" in backend:
+                        client = import_string(backend["CLIENT"])(**backend.get("OPTIONS", {}))
+                    else:
+                        client = get_generator_client(model_name=backend["MODEL"], temperature=backend.get("TEMPERATURE", 0.6))
+                    backends.append(Backend(
+                        name=backend["NAME"], client=client, tier=backend.get("TIER", "fast"), cost=backend.get("COST", 1.0)))
+                _router = ModelRouter(
+                    backends,
+                    large_set=config.get("LARGE_SET", 20),
+                    strong_difficulties=config.get("STRONG_DIFFICULTIES", ["hard"]),
+                    max_error_rate=config.get("MAX_ERROR_RATE", 0.5),
+                )
+    return _router
+
+
+def get_generator():
+    """
+    The object generations go through: the model router when one is configured,
+    otherwise the shared default GeneratorClient. Both expose call_gemini,
+    acall_gemini and astream_questions.
+    """
+    return get_router() or get_generator_client()
+
+
+def get_generation_cache():
+    """
+    Builds the GenerationCache described by settings.GENERATION_CACHE once per
+    process. Returns None when caching is disabled.
+    """
+    global _cache
+    config = getattr(settings, "GENERATION_CACHE", None)
+    if not config:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                backend = import_string(config["BACKEND"])(**config.get("OPTIONS", {}))
+                _cache = GenerationCache(
+                    backend,
+                    policy=config.get("POLICY", "shuffle"),
+                    mix_ratio=config.get("MIX_RATIO", 0.5),
+                )
+    return _cache
+
+
+def get_single_flight():
+    """
+    Builds the SingleFlight described by settings.GENERATION_COALESCING once per
+    process. Returns None when coalescing is disabled.
+    """
+    global _single_flight
+    config = getattr(settings, "GENERATION_COALESCING", None)
+    if not config:
+        return None
+    if _single_flight is None:
+        with _cache_lock:
+            if _single_flight is None:
+                _single_flight = import_string(config["BACKEND"])(**config.get("OPTIONS", {}))
+    return _single_flight
+
+
+def _coalesced_response(response: Dict[str, Any], shared: bool) -> Dict[str, Any]:
+    # callers that piggybacked on another request's generation get their own order
+    if shared and "questions" in response and settings.GENERATION_COALESCING.get("SHUFFLE", True):
+        return shuffle_question_set(response)
+    return response
+
+
+def generate_question_set(topic: str, questions: int, difficulty_level: str) -> Dict[str, Any]:
+    """
+    Single entry point for producing a question set for a TestSession.
+    Concurrent calls for the same prompt share one generation, see get_single_flight().
+    """
+    client = get_generator()
+    cache = get_generation_cache()
+
+    def generate():
+        if cache is not None:
+            return cache.call(client, prompt=topic, questions=questions, difficulty_level=difficulty_level)
+        return client.call_gemini(prompt=topic, questions=questions, difficulty_level=difficulty_level)
+
+    single_flight = get_single_flight()
+    if single_flight is None:
+        return generate()
+    key = client_cache_key(client, topic, questions, difficulty_level)
+    return _coalesced_response(*single_flight.do(key, generate))
+
+
+async def agenerate_question_set(topic: str, questions: int, difficulty_level: str) -> Dict[str, Any]:
+    """
+    Async counterpart of generate_question_set() for the ASGI views.
+    """
+    client = get_generator()
+    cache = get_generation_cache()
+
+    async def generate():
+        if cache is not None:
+            return await cache.acall(client, prompt=topic, questions=questions, difficulty_level=difficulty_level)
+        return await client.acall_gemini(prompt=topic, questions=questions, difficulty_level=difficulty_level)
+
+    single_flight = get_single_flight()
+    if single_flight is None:
+        return await generate()
+    key = client_cache_key(client, topic, questions, difficulty_level)
+    return _coalesced_response(*await single_flight.ado(key, generate))
+
+
+def dedup_settings() -> Dict[str, Any]:
+    config = {
+        "THRESHOLD": 0.7,
+        "NUM_PERM": 64,
+        "BANDS": 16,
+        "MAX_SCOPES": 10000,
+        "HISTORY_LIMIT": 2000,
+        "REGENERATE_ROUNDS": 1,
+        # seconds before a scope is loaded again to see questions saved by other workers
+        "SCOPE_TTL": 60,
+    }
+    config.update(getattr(settings, "QUESTION_DEDUP", {}))
+    return config
+
+
+def user_scope(user_id: int, topic: str):
+    return ("user", user_id, normalize_text(topic))
+
+
+def topic_scope(topic: str, difficulty_level: str):
+    return ("topic", normalize_text(topic), difficulty_level)
+
+
+def _load_scope(scope):
+    from user_profiles.models import Question, QuestionBank, TestSession
+
+    limit = dedup_settings()["HISTORY_LIMIT"]
+    if scope[0] == "user":
+        _, user_id, topic = scope
+        # only finished sessions, the one being generated is deduplicated as a batch
+        return Question.objects.filter(
+            testSession__user_id=user_id,
+            testSession__topicsName__iexact=topic,
+            testSession__status=TestSession.STATUS_COMPLETED,
+        ).order_by("-id").values_list("text", flat=True)[:limit]
+    _, topic, difficulty_level = scope
+    return QuestionBank.objects.filter(
+        normalizedTopic=topic, difficultyLevel=difficulty_level
+    ).order_by("-id").values_list("question__question", flat=True)[:limit]
+
+
+def get_deduplicator() -> QuestionDeduplicator:
+    """
+    Process-wide near-duplicate index, seeded per scope from the database on
+    first use and reloaded every SCOPE_TTL seconds.
+    """
+    global _deduplicator
+    if _deduplicator is None:
+        with _cache_lock:
+            if _deduplicator is None:
+                config = dedup_settings()
+                _deduplicator = QuestionDeduplicator(
+                    threshold=config["THRESHOLD"],
+                    num_perm=config["NUM_PERM"],
+                    bands=config["BANDS"],
+                    max_scopes=config["MAX_SCOPES"],
+                    loader=_load_scope,
+                    ttl=config["SCOPE_TTL"],
+                )
+    return _deduplicator
@@ -0,0 +1,304 @@
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Any, Dict, List
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from user_profiles.models import TestSession
+from user_profiles.generation import generate_question_set, get_deduplicator, get_generator, dedup_settings, user_scope
+from user_profiles.question_bank import tag_difficulty, take_from_bank
+from RAGpipelines.questionSets import normalize_text, renumber_questions
+from RAGpipelines.tokenUsage import track_usage
+
+
+logger = logging.getLogger(__name__)
+
+
+class ThreadPoolQueue:
+    """
+    In-process queue backed by a thread pool. Jobs run outside the request
+    cycle so the web worker is released as soon as the session row exists.
+    """
+    def __init__(self, workers: int = 4):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="generation")
+
+    def submit(self, func, *args, **kwargs):
+        return self.executor.submit(_run_job, func, *args, **kwargs)
+
+
+class ImmediateQueue:
+    """
+    Runs jobs inline on submit. Useful for tests and management commands.
+    """
+    def __init__(self, **kwargs):
+        pass
+
+    def submit(self, func, *args, **kwargs):
+        return func(*args, **kwargs)
+
+
+def _run_job(func, *args, **kwargs):
+    # worker threads keep their own DB connections, so drop stale ones around each job
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    except Exception:
+        logger.exception("Background job %s failed", getattr(func, "__name__", func))
+    finally:
+        close_old_connections()
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue():
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                config = getattr(settings, "GENERATION_QUEUE", {})
+                backend = import_string(config.get("BACKEND", "user_profiles.jobs.ThreadPoolQueue"))
+                _queue = backend(**config.get("OPTIONS", {}))
+    return _queue
+
+
+def generate_test_session(session_pk: int) -> None:
+    """
+    Job body: calls the LLM for a pending TestSession and stores the result.
+    """
+    updated = TestSession.objects.filter(
+        pk=session_pk, status=TestSession.STATUS_PENDING
+    ).update(status=TestSession.STATUS_RUNNING, startedAt=timezone.now())
+    if not updated:
+        # already picked up by another worker or removed
+        return
+
+    test_session = TestSession.objects.get(pk=session_pk)
+    try:
+        with track_usage() as usage:
+            _fill_test_session(test_session)
+    except Exception as e:
+        # never leave the session running, the client would poll it forever
+        logger.exception("Generation failed for session %s", session_pk)
+        TestSession.objects.filter(pk=session_pk, status=TestSession.STATUS_RUNNING).update(
+            status=TestSession.STATUS_FAILED, errorMessage=str(e))
+        return
+    if usage.calls:
+        TestSession.objects.filter(pk=session_pk).update(
+            promptTokens=usage.prompt_tokens, completionTokens=usage.completion_tokens)
+
+
+def _fill_test_session(test_session: TestSession) -> None:
+    # the view may have pre-filled part of the set from the question bank
+    existing = test_session.question_dicts()
+    difficultyMix = test_session.difficultyMix or {test_session.difficultyLevel: test_session.noOfQuestions}
+    have = Counter(question["difficulty_level"] for question in existing)
+    shortfalls = {level: count - have[level] for level, count in difficultyMix.items() if count > have[level]}
+
+    # the LLM fills the shortfall of every level at that level
+    generated, fallback, errors = [], [], {}
+    seen = {normalize_text(question.get("question", "")) for question in existing}
+    for level, shortfall in shortfalls.items():
+        try:
+            modelResponse = generate_question_set(
+                topic=test_session.topicsName,
+                questions=shortfall,
+                difficulty_level=level)
+        except Exception as e:
+            modelResponse = {"error": str(e)}
+
+        if "error" in modelResponse:
+            # provider degraded (retries exhausted, deadline hit or circuit open): fall back to
+            # the bank, repeating questions the user has seen if needed
+            errors[level] = str(modelResponse["error"])
+            fallback += [
+                question for question in take_from_bank(
+                    test_session.user, test_session.topicsName, level,
+                    shortfall + len(existing), include_served=True)
+                if normalize_text(question.get("question", "")) not in seen
+            ][:shortfall]
+            continue
+        generated += tag_difficulty([q for q in modelResponse.get("questions", []) if isinstance(q, dict)], level)
+
+    if errors:
+        if not existing and not generated and not fallback:
+            test_session.status = TestSession.STATUS_FAILED
+            test_session.errorMessage = next(iter(errors.values()))
+            test_session.save(update_fields=["status", "errorMessage"])
+            return
+        logger.warning("Generation failed for session %s, served %d bank questions: %s",
+                       test_session.pk, len(fallback), "; ".join(errors.values()))
+
+    # drop near-duplicates within the set and of the user's earlier questions on the topic,
+    # then ask the LLM (bypassing the cache) for replacements at the levels that lost some.
+    # Nothing is remembered until the set is saved, so discarded candidates never block later ones
+    deduplicator = get_deduplicator()
+    scopes = [user_scope(test_session.user_id, test_session.topicsName)]
+    questions, dropped = deduplicator.filter(existing + generated, scopes=scopes, remember=False)
+
+    for _ in range(dedup_settings()["REGENERATE_ROUNDS"]):
+        counts = Counter(question["difficulty_level"] for question in questions)
+        missing = {
+            level: difficultyMix[level] - counts[level]
+            for level in shortfalls if level not in errors and difficultyMix[level] > counts[level]
+        }
+        if not missing:
+            break
+        for level, count in missing.items():
+            try:
+                extra = get_generator().call_gemini(
+                    prompt=test_session.topicsName, questions=count, difficulty_level=level)
+            except Exception as e:
+                # circuit open or deadline hit: keep the questions in hand, the top-up below fills the gap
+                extra = {"error": str(e)}
+            if "error" in extra:
+                logger.warning("Regeneration failed for session %s: %s", test_session.pk, extra["error"])
+                errors[level] = str(extra["error"])
+                continue
+            # filtered together with the kept questions so replacements are checked against them too
+            questions, repeated = deduplicator.filter(
+                questions + tag_difficulty(extra.get("questions", []), level), scopes=scopes, remember=False)
+            dropped += repeated
+
+    questions += fallback[:test_session.noOfQuestions - len(questions)]
+    questions = top_up_questions(test_session.user, test_session.topicsName, questions, dropped, difficultyMix)
+    questions = renumber_questions(questions[:test_session.noOfQuestions])
+    if not questions:
+        test_session.status = TestSession.STATUS_FAILED
+        test_session.errorMessage = "No questions generated"
+        test_session.save(update_fields=["status", "errorMessage"])
+        return
+
+    test_session.save_questions(questions)
+    test_session.status = TestSession.STATUS_COMPLETED
+    test_session.save(update_fields=["status"])
+    deduplicator.remember(questions, scopes)
+
+
+def top_up_questions(user, topic: str, questions: List[Dict[str, Any]], dropped: List[Dict[str, Any]],
+                     difficultyMix: Dict[str, int]) -> List[Dict[str, Any]]:
+    """
+    Fills a set that deduplication left short of difficultyMix, first with bank
+    questions of the short levels the user has not been served, then with the
+    dropped candidates that only repeat the user's earlier questions (not
+    another question of the set). A repeat is better than failing the session.
+    """
+    counts = Counter(question.get("difficulty_level") for question in questions)
+    missing = {level: count - counts[level] for level, count in difficultyMix.items() if count > counts[level]}
+    if not missing:
+        return questions
+
+    seen = {normalize_text(question.get("question", "")) for question in questions}
+    candidates = [
+        question
+        for level, count in missing.items()
+        for question in take_from_bank(user, topic, level, count)
+        if normalize_text(question.get("question", "")) not in seen
+    ]
+    # checked against the set only, the user's history is what made them drop out
+    kept, _ = get_deduplicator().filter(questions + candidates + dropped, remember=False)
+    kept_ids = {id(question) for question in kept}
+    for question in candidates + dropped:
+        level = question.get("difficulty_level")
+        if id(question) in kept_ids and missing.get(level, 0) > 0:
+            questions.append(question)
+            missing[level] -= 1
+    return questions
+
+
+def enqueue_test_session(session_pk: int, user_id: int = None, questions: int = 0) -> None:
+    """
+    Schedules generation once the surrounding transaction has committed,
+    so the worker never reads a row that is not visible yet. With a user_id
+    the job goes through the rate limiter and may wait for its turn.
+    """
+    if user_id is None:
+        transaction.on_commit(lambda: get_queue().submit(generate_test_session, session_pk))
+        return
+
+    from user_profiles.throttling import estimate_tokens, get_scheduler
+
+    transaction.on_commit(
+        lambda: get_scheduler().submit(user_id, estimate_tokens(questions), generate_test_session, session_pk)
+    )
+
+
+
+def recover_stale_sessions() -> Dict[str, int]:
+    """
+    Cleans up after a crash or restart: sessions still pending STALE_AFTER
+    seconds after they were created are queued again through the rate
+    limiter, sessions a worker started more than STALE_AFTER seconds ago and
+    never finished are marked failed. Returns counts.
+    """
+    stale = timezone.now() - timedelta(seconds=getattr(settings, "GENERATION_QUEUE", {}).get("STALE_AFTER", 1800))
+    failed = TestSession.objects.filter(status=TestSession.STATUS_RUNNING, startedAt__lt=stale).update(
+        status=TestSession.STATUS_FAILED, errorMessage="Generation was interrupted")
+    pending = list(TestSession.objects.filter(status=TestSession.STATUS_PENDING, created_at__lt=stale).annotate(
+        stored=Count("questions")).values_list("pk", "user_id", "noOfQuestions", "stored"))
+    for session_pk, user_id, noOfQuestions, stored in pending:
+        # generate_test_session claims the row atomically, a duplicate submit is a no-op;
+        # only the questions the bank did not pre-fill are charged to the user
+        enqueue_test_session(session_pk, user_id, max(noOfQuestions - stored, 0))
+    if failed or pending:
+        logger.warning("Recovered stale sessions: %d queued again, %d failed", len(pending), failed)
+    return {"requeued": len(pending), "failed": failed}
+
+
+_recovery = None
+
+
+def _recovery_loop(interval: float) -> None:
+    while True:
+        _run_job(recover_stale_sessions)
+        time.sleep(interval)
+
+
+def start_session_recovery() -> None:
+    """
+    Runs recover_stale_sessions() now and every RECOVER_INTERVAL seconds from a
+    daemon thread (once per process). Started by the WSGI/ASGI entry points.
+    """
+    global _recovery
+    interval = getattr(settings, "GENERATION_QUEUE", {}).get("RECOVER_INTERVAL", 300)
+    if not interval:
+        return
+    with _queue_lock:
+        if _recovery is None:
+            _recovery = threading.Thread(target=_recovery_loop, args=(interval,), name="session-recovery", daemon=True)
+            _recovery.start()
+
+
+_warmer = None
+
+
+def _warm_loop(interval: float) -> None:
+    from user_profiles.question_bank import warm_bank
+
+    while True:
+        _run_job(warm_bank)
+        time.sleep(interval)
+
+
+def start_bank_warmer() -> None:
+    """
+    Starts the periodic question bank warm-up in a daemon thread (once per process).
+    """
+    global _warmer
+    from user_profiles.question_bank import bank_settings
+
+    with _queue_lock:
+        if _warmer is None:
+            _warmer = threading.Thread(
+                target=_warm_loop, args=(bank_settings()["WARM_INTERVAL"],), name="bank-warmer", daemon=True
+            )
+            _warmer.start()
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from user_profiles.analytics import rebuild_topic_mastery
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the per-user topic mastery rollups from stored attempts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, action="append", dest="users", help="Only rebuild this user id (repeatable)")
+
+    def handle(self, *args, **options):
+        count = rebuild_topic_mastery(options["users"])
+        self.stdout.write(f"Wrote {count} topic mastery rows")
@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from user_profiles.outbox import outbox_settings, send_all_pending
+
+
+class Command(BaseCommand):
+    help = "Sends the emails waiting in the outbox."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Keep running every POLL_INTERVAL seconds")
+
+    def handle(self, *args, **options):
+        while True:
+            stats = send_all_pending()
+            self.stdout.write(f"sent {stats['sent']}, retrying {stats['retried']}, failed {stats['failed']}")
+
+            if not options["loop"]:
+                break
+            time.sleep(outbox_settings()["POLL_INTERVAL"])
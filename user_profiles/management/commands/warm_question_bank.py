@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from user_profiles.question_bank import bank_settings, hot_topics, refill
+
+
+class Command(BaseCommand):
+    help = "Fills the question bank for hot topics up to the target depth."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--topic", help="Warm only this topic (requires --difficulty)")
+        parser.add_argument("--difficulty", choices=["easy", "medium", "hard"])
+        parser.add_argument("--depth", type=int, help="Target depth per topic/difficulty")
+        parser.add_argument("--loop", action="store_true", help="Keep running every WARM_INTERVAL seconds")
+
+    def handle(self, *args, **options):
+        if options["topic"] and not options["difficulty"]:
+            self.stderr.write("--topic requires --difficulty")
+            return
+
+        while True:
+            pairs = [(options["topic"], options["difficulty"])] if options["topic"] else hot_topics()
+            for topic, difficulty in pairs:
+                depth = refill(topic, difficulty, target_depth=options["depth"])
+                self.stdout.write(f"{topic} ({difficulty}): {depth} questions")
+
+            if not options["loop"]:
+                break
+            time.sleep(bank_settings()["WARM_INTERVAL"])
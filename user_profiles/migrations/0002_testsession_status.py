@@ -0,0 +1,35 @@
+# Generated by Django 5.2.9 on 2026-10-17 02:42
+
+from django.db import migrations, models
+
+
+def mark_existing_completed(apps, schema_editor):
+    # sessions created before background generation already hold their questions
+    TestSession = apps.get_model('user_profiles', 'TestSession')
+    TestSession.objects.all().update(status='completed')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_profiles', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testsession',
+            name='errorMessage',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='testsession',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=15),
+        ),
+        migrations.AlterField(
+            model_name='testsession',
+            name='questionsSet',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.RunPython(mark_existing_completed, migrations.RunPython.noop),
+    ]
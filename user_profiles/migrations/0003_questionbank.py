@@ -0,0 +1,31 @@
+# Generated by Django 5.2.9 on 2026-10-17 02:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_profiles', '0002_testsession_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionBank',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic', models.CharField(max_length=255)),
+                ('normalizedTopic', models.CharField(max_length=255)),
+                ('difficultyLevel', models.CharField(choices=[('easy', 'Easy'), ('medium', 'Medium'), ('hard', 'Hard')], max_length=15)),
+                ('fingerprint', models.CharField(max_length=40)),
+                ('question', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('servedTo', models.ManyToManyField(blank=True, related_name='servedBankQuestions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['normalizedTopic', 'difficultyLevel'], name='user_profil_normali_908950_idx')],
+                'constraints': [models.UniqueConstraint(fields=('normalizedTopic', 'difficultyLevel', 'fingerprint'), name='unique_bank_question')],
+            },
+        ),
+    ]
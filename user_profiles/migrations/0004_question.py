@@ -0,0 +1,32 @@
+# Generated by Django 5.2.9 on 2026-10-17 02:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_profiles', '0003_questionbank'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Question',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ordinal', models.PositiveIntegerField()),
+                ('text', models.TextField()),
+                ('choices', models.JSONField()),
+                ('correct_index', models.IntegerField()),
+                ('hint', models.TextField(blank=True, default='')),
+                ('explanation', models.TextField(blank=True, default='')),
+                ('related_topic', models.JSONField(blank=True, default=list)),
+                ('testSession', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='questions', to='user_profiles.testsession')),
+            ],
+            options={
+                'ordering': ['ordinal'],
+                'constraints': [models.UniqueConstraint(fields=('testSession', 'ordinal'), name='unique_question_ordinal')],
+            },
+        ),
+    ]
@@ -0,0 +1,63 @@
+from django.db import migrations
+
+
+def move_blobs_to_questions(apps, schema_editor):
+    TestSession = apps.get_model('user_profiles', 'TestSession')
+    Question = apps.get_model('user_profiles', 'Question')
+
+    sessions = TestSession.objects.filter(questionsSet__isnull=False).only('id', 'questionsSet')
+    for session in sessions.iterator(chunk_size=200):
+        blob = session.questionsSet
+        questions = blob.get('questions', []) if isinstance(blob, dict) else []
+        rows = []
+        for ordinal, question in enumerate(questions, start=1):
+            if not isinstance(question, dict):
+                continue
+            related_topic = question.get('related_topic', [])
+            rows.append(Question(
+                testSession_id=session.id,
+                ordinal=ordinal,
+                text=question.get('question', ''),
+                choices=question.get('choices', []),
+                correct_index=question.get('correct_index', 0),
+                hint=question.get('hint', ''),
+                explanation=question.get('explanation', ''),
+                related_topic=related_topic if isinstance(related_topic, list) else [related_topic],
+            ))
+        if not rows:
+            # keep unparsed responses around for debugging
+            continue
+        Question.objects.bulk_create(rows)
+        TestSession.objects.filter(id=session.id).update(questionsSet=None)
+
+
+def rebuild_blobs(apps, schema_editor):
+    TestSession = apps.get_model('user_profiles', 'TestSession')
+    Question = apps.get_model('user_profiles', 'Question')
+
+    for session in TestSession.objects.filter(questionsSet__isnull=True).only('id').iterator(chunk_size=200):
+        questions = [
+            {
+                'id': question.ordinal,
+                'question': question.text,
+                'choices': question.choices,
+                'correct_index': question.correct_index,
+                'related_topic': question.related_topic,
+                'hint': question.hint,
+                'explanation': question.explanation,
+            }
+            for question in Question.objects.filter(testSession_id=session.id).order_by('ordinal')
+        ]
+        if questions:
+            TestSession.objects.filter(id=session.id).update(questionsSet={'questions': questions})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_profiles', '0004_question'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_blobs_to_questions, rebuild_blobs),
+    ]
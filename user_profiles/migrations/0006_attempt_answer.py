@@ -0,0 +1,40 @@
+# Generated by Django 5.2.9 on 2026-10-17 02:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_profiles', '0005_move_questions_set'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Attempt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.IntegerField(default=0)),
+                ('total', models.IntegerField(default=0)),
+                ('topicBreakdown', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('testSession', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attempts', to='user_profiles.testsession')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attempts', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Answer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('selectedIndex', models.IntegerField(blank=True, null=True)),
+                ('isCorrect', models.BooleanField(default=False)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='user_profiles.question')),
+                ('attempt', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='user_profiles.attempt')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('attempt', 'question'), name='unique_attempt_answer')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.9 on 2026-10-17 02:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_profiles', '0006_attempt_answer'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TopicMastery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('relatedTopic', models.CharField(max_length=255)),
+                ('difficultyLevel', models.CharField(choices=[('easy', 'Easy'), ('medium', 'Medium'), ('hard', 'Hard')], max_length=15)),
+                ('attempted', models.IntegerField(default=0)),
+                ('correct', models.IntegerField(default=0)),
+                ('accuracy', models.FloatField(default=0.0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='topicMastery', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'accuracy'], name='user_profil_user_id_9edf45_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'relatedTopic', 'difficultyLevel'), name='unique_topic_mastery')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.9 on 2026-10-17 02:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_profiles', '0007_topicmastery'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SkillRating',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('normalizedTopic', models.CharField(max_length=255)),
+                ('rating', models.FloatField(default=0.0)),
+                ('answered', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='skillRatings', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'normalizedTopic'), name='unique_skill_rating')],
+            },
+        ),
+    ]
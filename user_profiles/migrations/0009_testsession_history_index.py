@@ -0,0 +1,17 @@
+# Generated by Django 5.2.9 on 2026-10-17 03:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_profiles', '0008_skillrating'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='testsession',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='testsession_user_created'),
+        ),
+    ]
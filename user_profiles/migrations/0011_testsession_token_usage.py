@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-17 03:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_profiles', '0010_outboundemail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testsession',
+            name='completionTokens',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='testsession',
+            name='promptTokens',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
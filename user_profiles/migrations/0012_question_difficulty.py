@@ -0,0 +1,37 @@
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_session_difficulty(apps, schema_editor):
+    TestSession = apps.get_model('user_profiles', 'TestSession')
+    Question = apps.get_model('user_profiles', 'Question')
+
+    # sessions created so far were generated at a single level
+    Question.objects.update(difficultyLevel=Subquery(
+        TestSession.objects.filter(id=OuterRef('testSession_id')).values('difficultyLevel')[:1]
+    ))
+    pairs = TestSession.objects.values_list('difficultyLevel', 'noOfQuestions').distinct()
+    for level, count in list(pairs):
+        TestSession.objects.filter(difficultyLevel=level, noOfQuestions=count).update(difficultyMix={level: count})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_profiles', '0011_testsession_token_usage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='difficultyLevel',
+            field=models.CharField(choices=[('easy', 'Easy'), ('medium', 'Medium'), ('hard', 'Hard')], default='medium', max_length=15),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='testsession',
+            name='difficultyMix',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.RunPython(copy_session_difficulty, migrations.RunPython.noop),
+    ]
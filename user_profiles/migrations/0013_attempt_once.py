@@ -0,0 +1,28 @@
+# Generated by Django 5.2.9 on 2026-10-17 03:47
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def keep_first_attempt(apps, schema_editor):
+    Attempt = apps.get_model('user_profiles', 'Attempt')
+
+    # later attempts could be made after the answers were revealed; only the first one is scored.
+    # Run `python manage.py rebuild_topic_mastery` afterwards to drop them from the rollups
+    first = Attempt.objects.values('testSession_id').annotate(first=Min('id')).values('first')
+    Attempt.objects.exclude(id__in=first).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_profiles', '0012_question_difficulty'),
+    ]
+
+    operations = [
+        migrations.RunPython(keep_first_attempt, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='attempt',
+            constraint=models.UniqueConstraint(fields=('testSession',), name='unique_session_attempt'),
+        ),
+    ]
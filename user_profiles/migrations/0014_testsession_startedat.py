@@ -0,0 +1,25 @@
+# Generated by Django 5.2.9 on 2026-10-17 05:10
+
+from django.db import migrations, models
+
+
+def backfill_started_at(apps, schema_editor):
+    # sessions already running have no start time; their creation time is the best guess
+    TestSession = apps.get_model("user_profiles", "TestSession")
+    TestSession.objects.filter(status="running", startedAt__isnull=True).update(startedAt=models.F("created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_profiles', '0013_attempt_once'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testsession',
+            name='startedAt',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_started_at, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,6 @@
-from django.db import models
+from asgiref.sync import sync_to_async
+from django.db import models, transaction
+from django.utils import timezone
 from django.contrib.auth.models import BaseUserManager, AbstractBaseUser
 import uuid
 
@@ -63,13 +65,243 @@ class TestSession(models.Model):
         ("medium", "Medium"),
         ("hard", "Hard")
     ]
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_COMPLETED = "completed"
+    STATUS_FAILED = "failed"
+    STATUSES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_COMPLETED, "Completed"),
+        (STATUS_FAILED, "Failed")
+    ]
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     sessionId = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     topicsName = models.CharField(max_length=255, null=False, blank=False)
     noOfQuestions = models.IntegerField(default=10)
+    # dominant level of the session; the level of each question is on Question
     difficultyLevel = models.CharField(max_length=15, choices=DIFFICULTIES)
-    questionsSet = models.JSONField()
+    # questions per level, e.g. {"easy": 3, "medium": 7} for an adaptive session
+    difficultyMix = models.JSONField(default=dict, blank=True)
+    # legacy blob, questions are stored as Question rows (see save_questions)
+    questionsSet = models.JSONField(null=True, blank=True)
+    status = models.CharField(max_length=15, choices=STATUSES, default=STATUS_PENDING)
+    errorMessage = models.TextField(blank=True, default="")
+    # LLM tokens spent on this session, 0 when it was served from the bank or cache
+    promptTokens = models.PositiveIntegerField(default=0)
+    completionTokens = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # when a worker claimed the session; stale-run recovery is measured from here
+    startedAt = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # session history is read newest first per user with a (created_at, id) keyset
+            models.Index(fields=["user", "created_at", "id"], name="testsession_user_created"),
+        ]
+
+    def __str__(self):
+        return f"Session {self.id} - {self.user.name}"
+
+    def save_questions(self, questions):
+        """
+        Replaces this session's questions with ``questions`` (dicts shaped like build_schema() items).
+        """
+        with transaction.atomic():
+            self.questions.all().delete()
+            Question.objects.bulk_create(
+                [Question.from_dict(self, question, ordinal) for ordinal, question in enumerate(questions, start=1)]
+            )
+
+    async def asave_questions(self, questions):
+        # transactions are per thread, so run the whole replacement in one
+        await sync_to_async(self.save_questions)(questions)
+
+    def question_dicts(self):
+        return [question.to_dict() for question in self.questions.all()]
+
+
+class Question(models.Model):
+    """
+    One question of a TestSession. Replaces the per-session questionsSet blob so
+    readers can load only the columns they need.
+    """
+    testSession = models.ForeignKey(TestSession, on_delete=models.CASCADE, related_name="questions")
+    ordinal = models.PositiveIntegerField()
+    text = models.TextField()
+    choices = models.JSONField()
+    correct_index = models.IntegerField()
+    hint = models.TextField(blank=True, default="")
+    explanation = models.TextField(blank=True, default="")
+    related_topic = models.JSONField(default=list, blank=True)
+    difficultyLevel = models.CharField(max_length=15, choices=TestSession.DIFFICULTIES)
+
+    class Meta:
+        ordering = ["ordinal"]
+        constraints = [
+            models.UniqueConstraint(fields=["testSession", "ordinal"], name="unique_question_ordinal"),
+        ]
+
+    def __str__(self):
+        return f"Session {self.testSession_id} - Q{self.ordinal}"
+
+    @classmethod
+    def from_dict(cls, test_session, question, ordinal):
+        related_topic = question.get("related_topic", [])
+        return cls(
+            testSession=test_session,
+            ordinal=ordinal,
+            text=question.get("question", ""),
+            choices=question.get("choices", []),
+            correct_index=question.get("correct_index", 0),
+            hint=question.get("hint", ""),
+            explanation=question.get("explanation", ""),
+            related_topic=related_topic if isinstance(related_topic, list) else [related_topic],
+            difficultyLevel=question.get("difficulty_level") or test_session.difficultyLevel,
+        )
+
+    def to_dict(self):
+        return {
+            "id": self.ordinal,
+            "question": self.text,
+            "choices": self.choices,
+            "correct_index": self.correct_index,
+            "related_topic": self.related_topic,
+            "hint": self.hint,
+            "explanation": self.explanation,
+            "difficulty_level": self.difficultyLevel,
+        }
+
+class QuestionBank(models.Model):
+    """
+    Pre-generated, validated questions served to /api/generate/ without calling the LLM.
+    """
+    topic = models.CharField(max_length=255)
+    normalizedTopic = models.CharField(max_length=255)
+    difficultyLevel = models.CharField(max_length=15, choices=TestSession.DIFFICULTIES)
+    fingerprint = models.CharField(max_length=40)
+    question = models.JSONField()
+    servedTo = models.ManyToManyField(User, blank=True, related_name="servedBankQuestions")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["normalizedTopic", "difficultyLevel"]),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["normalizedTopic", "difficultyLevel", "fingerprint"],
+                name="unique_bank_question",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.normalizedTopic} ({self.difficultyLevel}) #{self.id}"
+
+
+class Attempt(models.Model):
+    """
+    The submitted answer sheet of a TestSession, scored server-side. A session
+    takes one attempt, so answers revealed afterwards cannot be scored.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="attempts")
+    testSession = models.ForeignKey(TestSession, on_delete=models.CASCADE, related_name="attempts")
+    score = models.IntegerField(default=0)
+    total = models.IntegerField(default=0)
+    topicBreakdown = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["testSession"], name="unique_session_attempt"),
+        ]
+
+    def __str__(self):
+        return f"Attempt {self.id} - {self.score}/{self.total}"
+
+
+class Answer(models.Model):
+    attempt = models.ForeignKey(Attempt, on_delete=models.CASCADE, related_name="answers")
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name="answers")
+    selectedIndex = models.IntegerField(null=True, blank=True)
+    isCorrect = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["attempt", "question"], name="unique_attempt_answer"),
+        ]
+
+
+class TopicMastery(models.Model):
+    """
+    Running per-user accuracy for one related topic at one difficulty, updated on every attempt.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="topicMastery")
+    relatedTopic = models.CharField(max_length=255)
+    difficultyLevel = models.CharField(max_length=15, choices=TestSession.DIFFICULTIES)
+    attempted = models.IntegerField(default=0)
+    correct = models.IntegerField(default=0)
+    accuracy = models.FloatField(default=0.0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "relatedTopic", "difficultyLevel"], name="unique_topic_mastery"),
+        ]
+        indexes = [
+            models.Index(fields=["user", "accuracy"]),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.relatedTopic} ({self.difficultyLevel}): {self.correct}/{self.attempted}"
+
+
+class SkillRating(models.Model):
+    """
+    Durable copy of the in-memory skill model (see user_profiles.skills).
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="skillRatings")
+    normalizedTopic = models.CharField(max_length=255)
+    rating = models.FloatField(default=0.0)
+    answered = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "normalizedTopic"], name="unique_skill_rating"),
+        ]
+
+
+class OutboundEmail(models.Model):
+    """
+    Durable outbox row; sent in batches by user_profiles.outbox outside the request cycle.
+    """
+    STATUS_PENDING = "pending"
+    STATUS_SENDING = "sending"
+    STATUS_SENT = "sent"
+    STATUS_FAILED = "failed"
+    STATUSES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_SENDING, "Sending"),
+        (STATUS_SENT, "Sent"),
+        (STATUS_FAILED, "Failed")
+    ]
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    fromEmail = models.CharField(max_length=255, blank=True, default="")
+    to = models.JSONField(default=list)
+    status = models.CharField(max_length=15, choices=STATUSES, default=STATUS_PENDING)
+    attempts = models.IntegerField(default=0)
+    nextAttemptAt = models.DateTimeField(default=timezone.now)
+    claimedAt = models.DateTimeField(null=True, blank=True)
+    lastError = models.TextField(blank=True, default="")
     created_at = models.DateTimeField(auto_now_add=True)
+    sentAt = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "nextAttemptAt"]),
+        ]
 
     def __str__(self):
-        return f"Session {self.id} - {self.user.name}"
\ No newline at end of file
+        return f"{self.subject} -> {', '.join(self.to)} ({self.status})"
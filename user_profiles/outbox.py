@@ -0,0 +1,176 @@
+import logging
+import random
+import threading
+from datetime import timedelta
+from typing import Any, Dict, List
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from user_profiles.models import OutboundEmail
+
+
+logger = logging.getLogger(__name__)
+
+
+def outbox_settings() -> Dict[str, Any]:
+    config = {
+        "BATCH_SIZE": 50,
+        "MAX_ATTEMPTS": 6,
+        "BACKOFF_BASE": 30,
+        "BACKOFF_MAX": 3600,
+        "POLL_INTERVAL": 60,
+        "CLAIM_TIMEOUT": 600,
+        "AUTO_START": True,
+    }
+    config.update(getattr(settings, "EMAIL_OUTBOX", {}))
+    return config
+
+
+def queue_email(subject: str, body: str, to: List[str], from_email: str = None) -> OutboundEmail:
+    """
+    Stores an email in the outbox and wakes the sender once the surrounding
+    transaction commits. Never talks to the mail server.
+    """
+    email = OutboundEmail.objects.create(
+        subject=subject, body=body, to=list(to), fromEmail=from_email or settings.EMAIL_HOST_USER or ""
+    )
+    if outbox_settings()["AUTO_START"]:
+        transaction.on_commit(wake_sender)
+    return email
+
+
+def backoff(attempts: int) -> timedelta:
+    """
+    Exponential backoff with full jitter, capped at BACKOFF_MAX seconds.
+    """
+    config = outbox_settings()
+    ceiling = min(config["BACKOFF_MAX"], config["BACKOFF_BASE"] * 2 ** max(attempts - 1, 0))
+    return timedelta(seconds=random.uniform(ceiling / 2, ceiling))
+
+
+def _claim(batch_size: int) -> List[OutboundEmail]:
+    """
+    Marks up to batch_size due emails as sending and returns them. Rows left in
+    sending by a crashed sender are picked up again after CLAIM_TIMEOUT.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=outbox_settings()["CLAIM_TIMEOUT"])
+    due = Q(status=OutboundEmail.STATUS_PENDING, nextAttemptAt__lte=now) | Q(
+        status=OutboundEmail.STATUS_SENDING, claimedAt__lt=stale)
+    with transaction.atomic():
+        ids = list(OutboundEmail.objects.filter(due).order_by("nextAttemptAt").values_list("id", flat=True)[:batch_size])
+        # the status filter makes the claim safe against a concurrent sender
+        OutboundEmail.objects.filter(due, id__in=ids).update(status=OutboundEmail.STATUS_SENDING, claimedAt=now)
+    return list(OutboundEmail.objects.filter(id__in=ids, status=OutboundEmail.STATUS_SENDING, claimedAt=now))
+
+
+def _failed(email: OutboundEmail, error: Exception) -> None:
+    email.attempts += 1
+    email.lastError = str(error)[:2000]
+    if email.attempts >= outbox_settings()["MAX_ATTEMPTS"]:
+        email.status = OutboundEmail.STATUS_FAILED
+    else:
+        email.status = OutboundEmail.STATUS_PENDING
+        email.nextAttemptAt = timezone.now() + backoff(email.attempts)
+
+
+def send_pending(batch_size: int = None) -> Dict[str, int]:
+    """
+    Sends one batch of due emails over a single mail connection. Failed emails
+    are rescheduled with backoff until MAX_ATTEMPTS. Returns counts.
+    """
+    emails = _claim(batch_size or outbox_settings()["BATCH_SIZE"])
+    stats = {"sent": 0, "retried": 0, "failed": 0}
+    if not emails:
+        return stats
+
+    try:
+        connection = get_connection(fail_silently=False)
+        connection.open()
+    except Exception as e:
+        logger.warning("Could not connect to the mail server: %s", e)
+        for email in emails:
+            _failed(email, e)
+    else:
+        try:
+            for email in emails:
+                message = EmailMessage(email.subject, email.body, email.fromEmail or None, email.to, connection=connection)
+                try:
+                    # one message per call so a rejected recipient only fails its own email
+                    connection.send_messages([message])
+                except Exception as e:
+                    _failed(email, e)
+                else:
+                    email.status = OutboundEmail.STATUS_SENT
+                    email.sentAt = timezone.now()
+                    email.attempts += 1
+        finally:
+            connection.close()
+
+    for email in emails:
+        if email.status == OutboundEmail.STATUS_SENT:
+            stats["sent"] += 1
+        elif email.status == OutboundEmail.STATUS_FAILED:
+            stats["failed"] += 1
+        else:
+            stats["retried"] += 1
+    OutboundEmail.objects.bulk_update(
+        emails, ["status", "attempts", "nextAttemptAt", "lastError", "sentAt"], batch_size=500
+    )
+    return stats
+
+
+def send_all_pending() -> Dict[str, int]:
+    """
+    Sends batches until nothing is due.
+    """
+    totals = {"sent": 0, "retried": 0, "failed": 0}
+    while True:
+        stats = send_pending()
+        for key in totals:
+            totals[key] += stats[key]
+        if not any(stats.values()):
+            return totals
+
+
+_sender = None
+_sender_lock = threading.Lock()
+_wake = threading.Event()
+
+
+def _sender_loop() -> None:
+    while True:
+        _wake.wait(timeout=outbox_settings()["POLL_INTERVAL"])
+        _wake.clear()
+        try:
+            send_all_pending()
+        except Exception:
+            logger.exception("Outbox sender failed")
+        finally:
+            close_old_connections()
+
+
+def wake_sender() -> None:
+    """
+    Starts the background sender thread (once per process) and asks it to run now.
+    """
+    global _sender
+    with _sender_lock:
+        if _sender is None or not _sender.is_alive():
+            _sender = threading.Thread(target=_sender_loop, name="email-outbox", daemon=True)
+            _sender.start()
+    _wake.set()
+
+
+def start_sender() -> None:
+    """
+    Starts the sender when the server starts (AUTO_START), so emails the previous
+    process left pending or waiting on backoff go out without a new signup.
+    Called by the WSGI/ASGI entry points.
+    """
+    if outbox_settings()["AUTO_START"]:
+        wake_sender()
@@ -0,0 +1,156 @@
+import hashlib
+from datetime import timedelta
+from typing import Any, Dict, List, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from user_profiles.models import QuestionBank, TestSession
+from user_profiles.generation import get_deduplicator, get_generator, topic_scope
+from RAGpipelines.questionSets import normalize_text
+from RAGpipelines.streaming import is_complete_question
+
+
+def bank_settings() -> Dict[str, Any]:
+    config = {
+        "TARGET_DEPTH": 50,
+        "BATCH_SIZE": 10,
+        "HOT_TOPICS": [],
+        "HOT_TOPIC_LIMIT": 20,
+        "HOT_TOPIC_WINDOW_DAYS": 7,
+        "WARM_INTERVAL": 600,
+        "AUTO_WARM": False,
+    }
+    config.update(getattr(settings, "QUESTION_BANK", {}))
+    return config
+
+
+def normalize_topic(topic: str) -> str:
+    return normalize_text(topic)[:255]
+
+
+def question_fingerprint(question: Dict[str, Any]) -> str:
+    return hashlib.sha1(normalize_text(question.get("question", "")).encode("utf-8")).hexdigest()
+
+
+def stock_questions(topic: str, difficulty_level: str, questions: List[Dict[str, Any]]) -> int:
+    """
+    Adds valid questions to the bank, skipping ones it already holds or near-duplicates of them.
+    Returns how many were offered.
+    """
+    normalized = normalize_topic(topic)
+    questions, _ = get_deduplicator().filter(
+        [question for question in questions if is_complete_question(question)],
+        scopes=[topic_scope(topic, difficulty_level)],
+    )
+    rows = [
+        QuestionBank(
+            topic=topic,
+            normalizedTopic=normalized,
+            difficultyLevel=difficulty_level,
+            fingerprint=question_fingerprint(question),
+            question=question,
+        )
+        for question in questions
+    ]
+    QuestionBank.objects.bulk_create(rows, ignore_conflicts=True)
+    return len(rows)
+
+
+def tag_difficulty(questions: List[Dict[str, Any]], difficulty_level: str) -> List[Dict[str, Any]]:
+    """
+    Marks question dicts with the level they were asked for, saved on Question.difficultyLevel.
+    """
+    for question in questions:
+        question["difficulty_level"] = difficulty_level
+    return questions
+
+
+def bank_depth(topic: str, difficulty_level: str) -> int:
+    """
+    Bank questions of the pair not served to anyone yet, the stock the warmer keeps topped up.
+    """
+    return QuestionBank.objects.filter(
+        normalizedTopic=normalize_topic(topic), difficultyLevel=difficulty_level, servedTo__isnull=True
+    ).count()
+
+
+def take_from_bank(user, topic: str, difficulty_level: str, count: int, include_served: bool = False) -> List[Dict[str, Any]]:
+    """
+    Samples up to ``count`` bank questions this user has not been served yet and
+    marks them as served. Ids are left for the caller to renumber; questions
+    come back tagged with difficulty_level.
+    With include_served=True already served questions may be repeated (used as a
+    fallback while the provider is down).
+
+    The rows are picked and marked in one transaction, locked with
+    SKIP LOCKED where the database supports it, so concurrent requests of the
+    same user never get the same question (SQLite runs the whole transaction
+    under its write lock, see scorpian.database).
+    """
+    if count <= 0:
+        return []
+    with transaction.atomic():
+        candidates = QuestionBank.objects.filter(normalizedTopic=normalize_topic(topic), difficultyLevel=difficulty_level)
+        if not include_served:
+            candidates = candidates.exclude(servedTo=user)
+        chosen = dict(candidates.select_for_update(skip_locked=True).order_by("?").values_list("id", "question")[:count])
+        if not chosen:
+            return []
+        QuestionBank.servedTo.through.objects.bulk_create(
+            [QuestionBank.servedTo.through(questionbank_id=pk, user_id=user.pk) for pk in chosen],
+            ignore_conflicts=True,
+        )
+    return tag_difficulty(list(chosen.values()), difficulty_level)
+
+
+def hot_topics() -> List[Tuple[str, str]]:
+    """
+    Configured hot topics plus the most requested (topic, difficulty) pairs of the recent window.
+    """
+    config = bank_settings()
+    pairs = [(topic, difficulty) for topic, difficulty in config["HOT_TOPICS"]]
+    since = timezone.now() - timedelta(days=config["HOT_TOPIC_WINDOW_DAYS"])
+    recent = (
+        TestSession.objects.filter(created_at__gte=since)
+        .values("topicsName", "difficultyLevel")
+        .annotate(requests=Count("id"))
+        .order_by("-requests")[:config["HOT_TOPIC_LIMIT"]]
+    )
+    seen = {(normalize_topic(topic), difficulty) for topic, difficulty in pairs}
+    for row in recent:
+        key = (normalize_topic(row["topicsName"]), row["difficultyLevel"])
+        if key not in seen:
+            seen.add(key)
+            pairs.append((row["topicsName"], row["difficultyLevel"]))
+    return pairs
+
+
+def refill(topic: str, difficulty_level: str, target_depth: int = None, max_rounds: int = 5) -> int:
+    """
+    Generates questions until the bank holds target_depth questions for the pair
+    (or max_rounds generations in a row add nothing new). Returns the new depth.
+    """
+    config = bank_settings()
+    target_depth = target_depth or config["TARGET_DEPTH"]
+    client = get_generator()
+
+    depth = bank_depth(topic, difficulty_level)
+    stale_rounds = 0
+    while depth < target_depth and stale_rounds < max_rounds:
+        batch = min(config["BATCH_SIZE"], target_depth - depth)
+        response = client.call_gemini(prompt=topic, questions=batch, difficulty_level=difficulty_level)
+        stock_questions(topic, difficulty_level, response.get("questions", []))
+        new_depth = bank_depth(topic, difficulty_level)
+        stale_rounds = stale_rounds + 1 if new_depth == depth else 0
+        depth = new_depth
+    return depth
+
+
+def warm_bank() -> Dict[Tuple[str, str], int]:
+    """
+    Tops up every hot topic/difficulty pair to the target depth.
+    """
+    return {(topic, difficulty): refill(topic, difficulty) for topic, difficulty in hot_topics()}
@@ -0,0 +1,174 @@
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Union
+
+import numpy as np
+from cachetools import LRUCache
+from django.db import IntegrityError, transaction
+
+from user_profiles.analytics import record_attempt
+from user_profiles.models import Answer, Attempt, Question
+from user_profiles.skills import skill_model
+
+
+@dataclass
+class AnswerKey:
+    """
+    Per-session arrays used for scoring, in question order.
+    """
+    question_pks: np.ndarray     # Question primary keys
+    correct: np.ndarray          # correct_index per question
+    choice_counts: np.ndarray    # number of choices per question
+    difficulties: np.ndarray     # difficulty level per question
+    topics: List[str]            # distinct related topics
+    topic_matrix: np.ndarray     # questions x topics, 1 where the question covers the topic
+
+
+_keys = LRUCache(maxsize=4096)
+_keys_lock = threading.Lock()
+
+
+def build_answer_key(session_pk: int) -> AnswerKey:
+    rows = list(
+        Question.objects.filter(testSession_id=session_pk)
+        .order_by("ordinal")
+        .values_list("pk", "correct_index", "related_topic", "choices", "difficultyLevel")
+    )
+    topics: Dict[str, int] = {}
+    for _, _, related, _, _ in rows:
+        for topic in related or []:
+            topics.setdefault(str(topic), len(topics))
+
+    topic_matrix = np.zeros((len(rows), len(topics)), dtype=np.int32)
+    for row, (_, _, related, _, _) in enumerate(rows):
+        for topic in related or []:
+            topic_matrix[row, topics[str(topic)]] = 1
+
+    return AnswerKey(
+        question_pks=np.fromiter((pk for pk, _, _, _, _ in rows), dtype=np.int64, count=len(rows)),
+        correct=np.fromiter((correct for _, correct, _, _, _ in rows), dtype=np.int32, count=len(rows)),
+        choice_counts=np.fromiter((len(choices or []) for _, _, _, choices, _ in rows), dtype=np.int32, count=len(rows)),
+        difficulties=np.array([level for _, _, _, _, level in rows], dtype=object),
+        topics=list(topics),
+        topic_matrix=topic_matrix,
+    )
+
+
+def get_answer_key(session_pk: int) -> AnswerKey:
+    """
+    Answer keys are cached per process; questions of a completed session never change.
+    """
+    with _keys_lock:
+        key = _keys.get(session_pk)
+    if key is None:
+        key = build_answer_key(session_pk)
+        with _keys_lock:
+            _keys[session_pk] = key
+    return key
+
+
+class InvalidAnswer(ValueError):
+    """
+    A selected index that is not one of the question's choices.
+    """
+
+
+class AlreadySubmitted(Exception):
+    """
+    The session already has its scored attempt.
+    """
+
+
+def answer_array(answers: Union[List[Any], Dict[Any, Any]], choice_counts: np.ndarray) -> np.ndarray:
+    """
+    Turns an answer sheet into an array of selected indices, -1 for unanswered.
+    Accepts a list in question order or a dict of {question id: selected index}.
+    Raises InvalidAnswer for an index outside the question's choices.
+    """
+    size = len(choice_counts)
+    selected = np.full(size, -1, dtype=np.int32)
+
+    def select(position: int, choice: Any) -> None:
+        choice = int(choice)
+        # checked before the int32 store, which overflows on huge values
+        if not 0 <= choice < choice_counts[position]:
+            raise InvalidAnswer(f"Answer to question {position + 1} must be between 0 and {choice_counts[position] - 1}")
+        selected[position] = choice
+
+    if isinstance(answers, dict):
+        for question_id, choice in answers.items():
+            position = int(question_id) - 1
+            if 0 <= position < size and choice is not None:
+                select(position, choice)
+    else:
+        for position, choice in enumerate(answers[:size]):
+            if choice is not None:
+                select(position, choice)
+    return selected
+
+
+def score_answers(key: AnswerKey, selected: np.ndarray) -> Dict[str, Any]:
+    """
+    Scores the whole sheet in one vectorized pass, including the per-topic breakdown.
+    """
+    correct_mask = selected == key.correct
+    return {
+        "correct_mask": correct_mask,
+        "score": int(correct_mask.sum()),
+        "total": int(len(key.correct)),
+        "topicBreakdown": topic_breakdown(key.topics, key.topic_matrix, correct_mask),
+    }
+
+
+def topic_breakdown(topics: List[str], topic_matrix: np.ndarray, correct_mask: np.ndarray) -> Dict[str, Dict[str, int]]:
+    """
+    {topic: {"correct", "total"}} over the questions (rows) passed in; topics
+    none of them cover are left out.
+    """
+    topic_correct = topic_matrix.T @ correct_mask.astype(np.int32)
+    topic_total = topic_matrix.sum(axis=0)
+    return {
+        topic: {"correct": int(topic_correct[i]), "total": int(topic_total[i])}
+        for i, topic in enumerate(topics)
+        if topic_total[i]
+    }
+
+
+def submit_attempt(user, test_session, answers) -> Attempt:
+    """
+    Scores an answer sheet and stores the attempt with all answers in one bulk insert,
+    then folds it into the user's topic mastery rollups and skill estimate, each
+    question at its own difficulty level. A session takes one attempt; raises
+    AlreadySubmitted for a second one.
+    """
+    key = get_answer_key(test_session.pk)
+    selected = answer_array(answers, key.choice_counts)
+    result = score_answers(key, selected)
+
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                attempt = Attempt.objects.create(
+                    user=user,
+                    testSession=test_session,
+                    score=result["score"],
+                    total=result["total"],
+                    topicBreakdown=result["topicBreakdown"],
+                )
+        except IntegrityError:
+            raise AlreadySubmitted(f"Session {test_session.pk} already has an attempt")
+        Answer.objects.bulk_create([
+            Answer(
+                attempt=attempt,
+                question_id=int(question_pk),
+                selectedIndex=int(choice) if choice >= 0 else None,
+                isCorrect=bool(is_correct),
+            )
+            for question_pk, choice, is_correct in zip(key.question_pks, selected, result["correct_mask"])
+        ])
+        for level in np.unique(key.difficulties):
+            rows = key.difficulties == level
+            record_attempt(user, level, topic_breakdown(key.topics, key.topic_matrix[rows], result["correct_mask"][rows]))
+
+    skill_model().record_answers(user.pk, test_session.topicsName, key.difficulties, result["correct_mask"])
+    return attempt
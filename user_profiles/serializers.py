@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from user_profiles.models import User, TestSession
+from user_profiles.models import User, TestSession, Attempt, TopicMastery
 
 
 class UserRegisterSerializer(serializers.ModelSerializer):
@@ -43,8 +43,37 @@ class TestSessionSerializer(serializers.ModelSerializer):
         return TestSession.objects.create(user=user, **validated_data)
 
 
-class QuizSerializer(serializers.ModelSerializer):
+class TestSessionStatusSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = TestSession
-        fields = ['questionsSet']
\ No newline at end of file
+        fields = ['sessionId', 'status', 'errorMessage']
+
+
+class AttemptSerializer(serializers.ModelSerializer):
+    attemptId = serializers.IntegerField(source='id', read_only=True)
+
+    class Meta:
+        model = Attempt
+        fields = ['attemptId', 'score', 'total', 'topicBreakdown', 'created_at']
+
+
+class SessionSummarySerializer(serializers.Serializer):
+    """
+    Serializes the summary rows (dicts from values()) of the session history.
+    """
+    sessionId = serializers.UUIDField()
+    topicsName = serializers.CharField()
+    difficultyLevel = serializers.CharField()
+    noOfQuestions = serializers.IntegerField()
+    status = serializers.CharField()
+    created_at = serializers.DateTimeField()
+    score = serializers.IntegerField(allow_null=True)
+    total = serializers.IntegerField(allow_null=True)
+
+
+class TopicMasterySerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = TopicMastery
+        fields = ['relatedTopic', 'difficultyLevel', 'attempted', 'correct', 'accuracy']
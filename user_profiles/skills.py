@@ -0,0 +1,204 @@
+import atexit
+import logging
+import math
+import threading
+import time
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from user_profiles.models import SkillRating
+from user_profiles.question_bank import normalize_topic
+
+
+logger = logging.getLogger(__name__)
+
+
+# item difficulty on the ability (logit) scale, 1PL/Elo style
+DIFFICULTY_RATINGS = {"easy": -1.0, "medium": 0.0, "hard": 1.0}
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+class SkillModel:
+    """
+    Per (user, topic) ability estimates held in flat NumPy arrays.
+
+    A dict maps (user id, normalized topic) to a row; ratings and answer counts
+    live in preallocated arrays that double when full, so a lookup is one dict
+    access and an array read. Ratings move Elo-style after every answer with a
+    step that shrinks as the user answers more. Unknown keys are loaded from
+    SkillRating on first use; the changes made here are added to it by a
+    background thread every ``persist_interval`` seconds, see flush().
+    """
+
+    def __init__(self, capacity: int = 1024, target_success: float = 0.7, spread: float = 0.15,
+                 persist_interval: float = 60.0):
+        self.rows: Dict[Tuple[int, str], int] = {}
+        self.keys: List[Tuple[int, str]] = []
+        self.ratings = np.zeros(capacity, dtype=np.float32)
+        self.answered = np.zeros(capacity, dtype=np.int32)
+        # changes since the last flush, added to the stored values rather than overwriting them
+        self.pending_ratings = np.zeros(capacity, dtype=np.float64)
+        self.pending_answered = np.zeros(capacity, dtype=np.int32)
+        self.dirty = set()
+        self.target_success = target_success
+        self.spread = spread
+        self.persist_interval = persist_interval
+        self.lock = threading.RLock()
+
+    def _row(self, user_id: int, topic: str) -> int:
+        key = (user_id, normalize_topic(topic))
+        row = self.rows.get(key)
+        if row is not None:
+            return row
+
+        stored = SkillRating.objects.filter(user_id=user_id, normalizedTopic=key[1]).values_list("rating", "answered").first()
+        with self.lock:
+            row = self.rows.get(key)
+            if row is not None:
+                return row
+            row = len(self.rows)
+            if row >= len(self.ratings):
+                self.ratings = np.concatenate([self.ratings, np.zeros_like(self.ratings)])
+                self.answered = np.concatenate([self.answered, np.zeros_like(self.answered)])
+                self.pending_ratings = np.concatenate([self.pending_ratings, np.zeros_like(self.pending_ratings)])
+                self.pending_answered = np.concatenate([self.pending_answered, np.zeros_like(self.pending_answered)])
+            self.ratings[row], self.answered[row] = stored or (0.0, 0)
+            self.rows[key] = row
+            self.keys.append(key)
+        return row
+
+    def rating(self, user_id: int, topic: str) -> float:
+        return float(self.ratings[self._row(user_id, topic)])
+
+    def record_answers(self, user_id: int, topic: str, difficulty_levels: Iterable[str], outcomes: Iterable[bool]) -> None:
+        """
+        Updates the user's ability on a topic from a sequence of right/wrong
+        answers, each against the difficulty of its own question.
+        """
+        row = self._row(user_id, topic)
+        with self.lock:
+            theta = float(self.ratings[row])
+            answered = int(self.answered[row])
+            for difficulty_level, outcome in zip(difficulty_levels, outcomes):
+                item = DIFFICULTY_RATINGS.get(difficulty_level, 0.0)
+                expected = 1.0 / (1.0 + math.exp(item - theta))
+                step = max(0.05, 0.8 / math.sqrt(1 + answered))
+                theta += step * (float(outcome) - expected)
+                answered += 1
+            self.pending_ratings[row] += theta - float(self.ratings[row])
+            self.pending_answered[row] += answered - int(self.answered[row])
+            self.ratings[row] = theta
+            self.answered[row] = answered
+            self.dirty.add(row)
+
+    def pick_difficulty_mix(self, user_id: int, topic: str, count: int) -> Dict[str, int]:
+        """
+        Splits ``count`` questions across difficulties, favouring the levels whose
+        expected success rate is closest to target_success.
+        """
+        theta = self.ratings[self._row(user_id, topic)]
+        levels = list(DIFFICULTY_RATINGS)
+        expected = _sigmoid(theta - np.array([DIFFICULTY_RATINGS[level] for level in levels]))
+        weights = np.exp(-((expected - self.target_success) ** 2) / (2 * self.spread ** 2))
+        shares = weights / weights.sum() * count
+
+        counts = np.floor(shares).astype(int)
+        # hand out the remainder by largest fractional share
+        for index in np.argsort(shares - counts)[::-1][:count - counts.sum()]:
+            counts[index] += 1
+        return {level: int(n) for level, n in zip(levels, counts) if n}
+
+    def flush(self) -> None:
+        """
+        Adds the rating and answer count changes made in this process since the
+        last flush to SkillRating with F() expressions, so the changes of
+        several workers add up instead of the last writer winning. The flushed
+        rows are then read back, picking up what other workers added.
+        """
+        with self.lock:
+            rows = sorted(self.dirty)
+            self.dirty = set()
+            changes = [(row, self.keys[row], float(self.pending_ratings[row]), int(self.pending_answered[row]))
+                       for row in rows]
+            self.pending_ratings[rows] = 0.0
+            self.pending_answered[rows] = 0
+        if not changes:
+            return
+
+        keys = [key for _, key, _, _ in changes]
+        try:
+            with transaction.atomic():
+                # rows seen for the first time started from (0, 0) here, so the change is the whole value
+                SkillRating.objects.bulk_create(
+                    [SkillRating(user_id=user_id, normalizedTopic=topic) for user_id, topic in keys],
+                    ignore_conflicts=True,
+                )
+                now = timezone.now()
+                for _, (user_id, topic), rating, answered in changes:
+                    SkillRating.objects.filter(user_id=user_id, normalizedTopic=topic).update(
+                        rating=F("rating") + rating, answered=F("answered") + answered, updated_at=now)
+                stored = {
+                    (user_id, topic): (rating, answered)
+                    for user_id, topic, rating, answered in SkillRating.objects.filter(
+                        user_id__in={user_id for user_id, _ in keys}, normalizedTopic__in={topic for _, topic in keys}
+                    ).values_list("user_id", "normalizedTopic", "rating", "answered")
+                }
+        except Exception:
+            # keep the changes for the next flush
+            with self.lock:
+                for row, _, rating, answered in changes:
+                    self.pending_ratings[row] += rating
+                    self.pending_answered[row] += answered
+                    self.dirty.add(row)
+            raise
+
+        with self.lock:
+            for row, key, _, _ in changes:
+                if key in stored:
+                    rating, answered = stored[key]
+                    # answers recorded while the flush ran are still pending on top
+                    self.ratings[row] = rating + self.pending_ratings[row]
+                    self.answered[row] = answered + self.pending_answered[row]
+
+
+def _flush_loop(interval: float) -> None:
+    while True:
+        time.sleep(interval)
+        try:
+            if _model is not None:
+                _model.flush()
+        except Exception:
+            logger.exception("Skill model flush failed")
+        finally:
+            close_old_connections()
+
+
+_model = None
+_model_lock = threading.Lock()
+_flusher = None
+
+
+def skill_model() -> SkillModel:
+    """
+    The process-wide SkillModel. Its changes are written by a daemon thread
+    every persist_interval seconds and at exit, never on the request path.
+    """
+    global _model, _flusher
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = SkillModel(**getattr(settings, "SKILL_MODEL", {}))
+                atexit.register(_model.flush)
+                if _flusher is None and _model.persist_interval > 0:
+                    _flusher = threading.Thread(
+                        target=_flush_loop, args=(_model.persist_interval,), name="skill-flush", daemon=True)
+                    _flusher.start()
+    return _model
@@ -0,0 +1,58 @@
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from user_profiles import generation, jobs, skills, throttling
+from user_profiles.models import TestSession, User
+from user_profiles.tokens import issue_tokens
+
+
+QUESTIONS = [
+    {
+        "id": number,
+        "question": f"Which option is number {number}?",
+        "choices": ["Option A", "Option B", "Option C", "Option D"],
+        "correct_index": number % 4,
+        "related_topic": ["python"],
+        "hint": "A hint.",
+        "explanation": "An explanation.",
+    }
+    for number in range(1, 4)
+]
+
+GENERATE = {"topicName": "python", "difficultyLevel": "easy", "noOfQuestions": 3}
+
+
+@override_settings(
+    GENERATION_ROUTER={"BACKENDS": [{"NAME": "stub", "CLIENT": "RAGpipelines.modelRouter.StubClient"}]},
+    GENERATION_QUEUE={"BACKEND": "user_profiles.jobs.ImmediateQueue", "RECOVER_INTERVAL": 0},
+    GENERATION_CACHE={},
+    GENERATION_COALESCING={},
+)
+class APITestCase(TestCase):
+    """
+    Runs the API against the offline StubClient; the process-wide generation
+    singletons are rebuilt for every test so they pick up these settings.
+    """
+    def setUp(self):
+        generation._router = generation._cache = generation._single_flight = generation._deduplicator = None
+        jobs._queue = None
+        throttling._scheduler = None
+        skills._model = None
+        # write pending ratings while the test database still exists, not at exit
+        self.addCleanup(lambda: skills._model and skills._model.flush())
+        self.user = User.objects.create_user(email="owner@example.com", name="Owner", password="secret")
+        self.user.is_active = True
+        self.user.save()
+        self.client = self.bearer_client(self.user)
+
+    def bearer_client(self, user):
+        client = APIClient(enforce_csrf_checks=True)
+        client.credentials(HTTP_AUTHORIZATION="Bearer " + issue_tokens(user)["access"])
+        return client
+
+    def completed_session(self, user=None):
+        test_session = TestSession.objects.create(
+            user=user or self.user, topicsName="python", difficultyLevel="easy",
+            noOfQuestions=len(QUESTIONS), status=TestSession.STATUS_COMPLETED)
+        test_session.save_questions([dict(question) for question in QUESTIONS])
+        return test_session
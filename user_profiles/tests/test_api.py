@@ -0,0 +1,229 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import Client, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from user_profiles import jobs
+from user_profiles.models import Attempt, TestSession, TopicMastery, User
+from user_profiles.scoring import AlreadySubmitted, submit_attempt
+from user_profiles.tests.base import GENERATE, QUESTIONS, APITestCase
+from user_profiles.tokens import ACCESS, issue_tokens, read_token
+
+
+class QuizTests(APITestCase):
+    def test_quiz_views_do_not_leak_answers(self):
+        test_session = self.completed_session()
+        for url in (f"/api/quiz-session/{test_session.sessionId}/", f"/api/async/quiz-session/{test_session.sessionId}/"):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            questions = response.json()["questionsSet"]["questions"]
+            self.assertEqual(len(questions), len(QUESTIONS))
+            for question in questions:
+                self.assertEqual(set(question), {"id", "question", "choices"})
+
+    def test_answer_fields_cannot_be_requested(self):
+        test_session = self.completed_session()
+        for url in (f"/api/quiz-session/{test_session.sessionId}/", f"/api/async/quiz-session/{test_session.sessionId}/"):
+            response = self.client.get(url, {"fields": "question,correct_index"})
+            self.assertEqual(response.status_code, 400)
+
+    def test_quiz_is_owner_only(self):
+        test_session = self.completed_session()
+        other = User.objects.create_user(email="other@example.com", name="Other", password="secret")
+        client = self.bearer_client(other)
+        for url in (f"/api/quiz-session/{test_session.sessionId}/", f"/api/async/quiz-session/{test_session.sessionId}/"):
+            self.assertEqual(client.get(url).status_code, 404)
+
+    def test_async_quiz_revalidates_with_etag(self):
+        url = f"/api/async/quiz-session/{self.completed_session().sessionId}/"
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+class AnswerTests(APITestCase):
+    def test_out_of_range_answer_is_rejected(self):
+        url = f"/api/quiz-session/{self.completed_session().sessionId}/submit/"
+        for answers in ([2 ** 40, 0, 0], [0, -1, 0], {"2": 4}):
+            response = self.client.post(url, {"answers": answers}, format="json")
+            self.assertEqual(response.status_code, 400, answers)
+        self.assertFalse(Attempt.objects.exists())
+
+    def test_submit_scores_answers(self):
+        url = f"/api/quiz-session/{self.completed_session().sessionId}/submit/"
+        answers = [question["correct_index"] for question in QUESTIONS]
+        answers[0] = (answers[0] + 1) % 4
+        response = self.client.post(url, {"answers": answers}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.json()["score"], response.json()["total"]), (2, 3))
+
+    def test_reveal_requires_an_attempt(self):
+        test_session = self.completed_session()
+        url = f"/api/quiz-session/{test_session.sessionId}/reveal/"
+        self.assertEqual(self.client.get(url).status_code, 409)
+
+        self.client.post(f"/api/quiz-session/{test_session.sessionId}/submit/", {"answers": [0, 0, 0]}, format="json")
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["questions"], [
+            {"id": question["id"], "correct_index": question["correct_index"], "explanation": question["explanation"]}
+            for question in QUESTIONS
+        ])
+
+    def test_revealed_answers_cannot_be_resubmitted(self):
+        test_session = self.completed_session()
+        url = f"/api/quiz-session/{test_session.sessionId}/submit/"
+        self.assertEqual(self.client.post(url, {"answers": [1, 0, 0]}, format="json").status_code, 201)
+        revealed = self.client.get(f"/api/quiz-session/{test_session.sessionId}/reveal/").json()["questions"]
+
+        response = self.client.post(url, {"answers": [question["correct_index"] for question in revealed]}, format="json")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Attempt.objects.get().score, 1)
+        self.assertEqual(list(TopicMastery.objects.values_list("attempted", "correct")), [(3, 1)])
+
+    def test_second_attempt_loses_the_race(self):
+        test_session = self.completed_session()
+        submit_attempt(self.user, test_session, [0, 0, 0])
+        with self.assertRaises(AlreadySubmitted):
+            submit_attempt(self.user, test_session, [1, 2, 3])
+        self.assertEqual(Attempt.objects.count(), 1)
+
+    def test_hints_are_served_before_an_attempt(self):
+        test_session = self.completed_session()
+        response = self.client.get(f"/api/quiz-session/{test_session.sessionId}/hints/", {"ids": "2"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["questions"], [{"id": 2, "hint": "A hint."}])
+
+
+class GenerationTests(APITestCase):
+    def test_generate_runs_in_the_background(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/generate/", GENERATE, format="json")
+        self.assertEqual(response.status_code, 202)
+        test_session = TestSession.objects.get(sessionId=response.json()["sessionId"])
+        self.assertEqual(test_session.status, TestSession.STATUS_COMPLETED)
+        self.assertEqual(test_session.questions.count(), 3)
+
+    def test_invalid_difficulty_is_rejected(self):
+        response = self.client.post("/api/generate/", dict(GENERATE, difficultyLevel="impossible"), format="json")
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(GENERATION_RATE_LIMIT={"USER_BURST": 500})
+    def test_generation_over_the_burst_is_rejected(self):
+        response = self.client.post("/api/generate/", dict(GENERATE, noOfQuestions=10), format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(TestSession.objects.exists())
+
+    def test_async_generate_with_bearer_token_needs_no_csrf(self):
+        response = self.client.post("/api/async/generate/", GENERATE, format="json")
+        self.assertEqual(response.status_code, 201)
+        test_session = TestSession.objects.get(sessionId=response.json()["sessionId"])
+        self.assertEqual(test_session.questions.count(), 3)
+
+    def test_async_generate_with_session_cookie_needs_csrf(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        response = client.post("/api/async/generate/", GENERATE, content_type="application/json")
+        self.assertEqual(response.status_code, 403)
+
+        client.get("/api/auth/csrf_cookie/")
+        response = client.post("/api/async/generate/", GENERATE, content_type="application/json",
+                               HTTP_X_CSRFTOKEN=client.cookies["csrftoken"].value)
+        self.assertEqual(response.status_code, 201)
+
+    def test_async_generate_requires_authentication(self):
+        response = Client().post("/api/async/generate/", GENERATE, content_type="application/json")
+        self.assertEqual(response.status_code, 401)
+
+
+class RecoveryTests(APITestCase):
+    def stale_session(self, **fields):
+        test_session = TestSession.objects.create(
+            user=self.user, topicsName="python", difficultyLevel="easy", noOfQuestions=3, **fields)
+        TestSession.objects.filter(pk=test_session.pk).update(created_at=timezone.now() - timedelta(hours=2))
+        return test_session
+
+    def test_running_session_is_failed_by_its_start_time(self):
+        recent = self.stale_session(status=TestSession.STATUS_RUNNING, startedAt=timezone.now())
+        abandoned = self.stale_session(
+            status=TestSession.STATUS_RUNNING, startedAt=timezone.now() - timedelta(hours=1))
+        self.assertEqual(jobs.recover_stale_sessions(), {"requeued": 0, "failed": 1})
+        recent.refresh_from_db()
+        abandoned.refresh_from_db()
+        self.assertEqual((recent.status, abandoned.status), (TestSession.STATUS_RUNNING, TestSession.STATUS_FAILED))
+
+    def test_pending_session_is_requeued_through_the_rate_limiter(self):
+        test_session = self.stale_session()
+        test_session.save_questions([dict(QUESTIONS[0], difficulty_level="easy")])
+        with mock.patch.object(jobs, "enqueue_test_session", wraps=jobs.enqueue_test_session) as enqueue:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(jobs.recover_stale_sessions(), {"requeued": 1, "failed": 0})
+        enqueue.assert_called_once_with(test_session.pk, self.user.pk, 2)
+        test_session.refresh_from_db()
+        self.assertEqual(test_session.status, TestSession.STATUS_COMPLETED)
+        self.assertIsNotNone(test_session.startedAt)
+
+
+class TokenTests(APITestCase):
+    def refresh(self, token):
+        return APIClient().post("/api/auth/token/refresh/", {"refresh": token}, format="json")
+
+    def test_obtain_and_refresh(self):
+        response = APIClient().post("/api/auth/token/", {"email": self.user.email, "password": "secret"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        refresh = response.json()["refresh"]
+        self.assertEqual(self.refresh(refresh).status_code, 200)
+        # rotated, the old refresh token is spent
+        self.assertEqual(self.refresh(refresh).status_code, 401)
+
+    def test_deactivated_user_cannot_refresh(self):
+        refresh = issue_tokens(self.user)["refresh"]
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.refresh(refresh).status_code, 401)
+
+    def test_deleted_user_cannot_refresh(self):
+        refresh = issue_tokens(self.user)["refresh"]
+        self.user.delete()
+        self.assertEqual(self.refresh(refresh).status_code, 401)
+
+    def test_refresh_reads_current_claims(self):
+        self.user.is_admin = True
+        self.user.save()
+        refresh = issue_tokens(self.user)["refresh"]
+        self.user.is_admin = False
+        self.user.save()
+        response = self.refresh(refresh)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(read_token(response.json()["access"], ACCESS)["adm"])
+
+
+class SessionHistoryTests(APITestCase):
+    def test_pages_walk_every_session_once(self):
+        sessions = [self.completed_session() for _ in range(5)]
+        # equal timestamps, the id breaks the tie
+        TestSession.objects.filter(pk__in=[session.pk for session in sessions[1:4]]).update(
+            created_at=sessions[1].created_at)
+        self.completed_session(User.objects.create_user(email="other@example.com", name="Other", password="secret"))
+
+        seen, cursor = [], None
+        while True:
+            response = self.client.get("/api/sessions/", {"limit": 2, **({"cursor": cursor} if cursor else {})})
+            self.assertEqual(response.status_code, 200)
+            seen += [session["sessionId"] for session in response.json()["sessions"]]
+            cursor = response.json()["nextCursor"]
+            if not cursor:
+                break
+        expected = TestSession.objects.filter(user=self.user).order_by("-created_at", "-id")
+        self.assertEqual(seen, [str(session.sessionId) for session in expected])
+
+    def test_latest_attempt_score(self):
+        test_session = self.completed_session()
+        self.client.post(f"/api/quiz-session/{test_session.sessionId}/submit/",
+                         {"answers": [question["correct_index"] for question in QUESTIONS]}, format="json")
+        session = self.client.get("/api/sessions/").json()["sessions"][0]
+        self.assertEqual((session["score"], session["total"]), (3, 3))
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get("/api/sessions/", {"cursor": "not-a-cursor"}).status_code, 400)
@@ -0,0 +1,91 @@
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase
+
+from RAGpipelines.benchmarks.fakeLLM import fake_questions
+from RAGpipelines.dedup import QuestionDeduplicator
+from user_profiles.models import QuestionBank, TestSession
+from user_profiles.question_bank import question_fingerprint
+from user_profiles.tests.base import GENERATE, QUESTIONS, APITestCase
+
+
+STREAM = "/api/generate/stream/?topicName=python&difficultyLevel=easy&noOfQuestions=3"
+
+
+async def read_stream(response):
+    return b"".join([chunk async for chunk in response.streaming_content]).decode()
+
+
+class ScopeReloadTests(SimpleTestCase):
+    def setUp(self):
+        self.stored = []
+        self.question = fake_questions("python", 1)["questions"][0]
+
+    def deduplicator(self, ttl):
+        return QuestionDeduplicator(loader=lambda scope: list(self.stored), ttl=ttl)
+
+    def test_scope_sees_texts_stored_after_it_was_loaded(self):
+        deduplicator = self.deduplicator(ttl=0)
+        self.assertEqual(len(deduplicator.filter([self.question], scopes=["user"], remember=False)[0]), 1)
+        # saved by another worker
+        self.stored.append(self.question["question"])
+        self.assertEqual(deduplicator.filter([self.question], scopes=["user"], remember=False)[0], [])
+
+    def test_scope_is_kept_until_the_ttl(self):
+        deduplicator = self.deduplicator(ttl=3600)
+        deduplicator.filter([], scopes=["user"])
+        self.stored.append(self.question["question"])
+        self.assertEqual(len(deduplicator.filter([self.question], scopes=["user"], remember=False)[0]), 1)
+
+    def test_reload_keeps_remembered_texts(self):
+        deduplicator = self.deduplicator(ttl=0)
+        deduplicator.remember([self.question], ["user"])
+        self.assertEqual(deduplicator.filter([self.question], scopes=["user"], remember=False)[0], [])
+
+
+class GenerationDedupTests(APITestCase):
+    """
+    The stub model returns the same questions every time, so a second session
+    on the topic repeats every question of the first.
+    """
+    def stock_bank(self):
+        QuestionBank.objects.bulk_create([
+            QuestionBank(topic="python", normalizedTopic="python", difficultyLevel="easy",
+                         fingerprint=question_fingerprint(question), question=dict(question))
+            for question in QUESTIONS
+        ])
+
+    def generate(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/generate/", GENERATE, format="json")
+        return TestSession.objects.get(sessionId=response.json()["sessionId"])
+
+    def async_generate(self):
+        response = self.client.post("/api/async/generate/", GENERATE, format="json")
+        self.assertEqual(response.status_code, 201)
+        return TestSession.objects.get(sessionId=response.json()["sessionId"])
+
+    def texts(self, test_session):
+        return sorted(question["question"] for question in test_session.question_dicts())
+
+    def test_job_serves_repeats_rather_than_failing(self):
+        first = self.generate()
+        second = self.generate()
+        self.assertEqual(second.status, TestSession.STATUS_COMPLETED)
+        self.assertEqual(self.texts(second), self.texts(first))
+
+    def test_async_generation_drops_repeats(self):
+        self.async_generate()
+        self.stock_bank()
+        second = self.async_generate()
+        self.assertEqual(self.texts(second), sorted(question["question"] for question in QUESTIONS))
+
+    def test_stream_holds_back_repeats(self):
+        self.async_generate()
+        self.stock_bank()
+        response = self.client.get(STREAM)
+        body = async_to_sync(read_stream)(response)
+        self.assertEqual(body.count("event: question"), 3)
+        self.assertNotIn("placeholder question", body)
+        test_session = TestSession.objects.latest("id")
+        self.assertEqual(test_session.status, TestSession.STATUS_COMPLETED)
+        self.assertEqual(self.texts(test_session), sorted(question["question"] for question in QUESTIONS))
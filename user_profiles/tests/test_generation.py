@@ -0,0 +1,268 @@
+import asyncio
+import copy
+import json
+
+from django.test import SimpleTestCase
+
+from RAGpipelines.benchmarks.fakeLLM import fake_llm, fake_questions
+from RAGpipelines.generationCache import (
+    POLICY_MIX, POLICY_REUSE, POLICY_SHUFFLE, GenerationCache, LRUCacheBackend, generation_cache_key,
+)
+from RAGpipelines.questionGeneratorPipeline import QUESTION_VALIDATOR, GeneratorClient
+from RAGpipelines.singleFlight import SingleFlight
+from RAGpipelines.streaming import QuestionStreamParser
+from RAGpipelines.tokenUsage import track_usage
+
+
+class CountingClient:
+    """
+    Stands in for GeneratorClient in front of the cache; counts the model calls.
+    """
+    model_name = "fake"
+    temperature = 0.6
+    context_version = ""
+
+    def __init__(self, response=None):
+        self.response = response
+        self.calls = []
+
+    def call_gemini(self, prompt, questions=5, difficulty_level="easy"):
+        self.calls.append(questions)
+        return copy.deepcopy(self.response) if self.response is not None else fake_questions(prompt, questions)
+
+
+class ScriptedModel:
+    """
+    Structured model returning the given responses in order.
+    """
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.prompts = []
+
+    def invoke(self, prompt, *args, **kwargs):
+        self.prompts.append(prompt)
+        return self.responses.pop(0)
+
+
+def answers(question_set):
+    return {question["question"]: question["choices"][question["correct_index"]] for question in question_set["questions"]}
+
+
+class GenerationCacheKeyTests(SimpleTestCase):
+    def test_prompt_is_normalized(self):
+        self.assertEqual(
+            generation_cache_key("Python  Lists", 5, "easy", "fake", 0.6),
+            generation_cache_key(" python lists", 5, "easy", "fake", 0.6),
+        )
+
+    def test_every_setting_is_part_of_the_key(self):
+        key = generation_cache_key("python", 5, "easy", "fake", 0.6, "v1")
+        for other in (
+            generation_cache_key("python", 6, "easy", "fake", 0.6, "v1"),
+            generation_cache_key("python", 5, "hard", "fake", 0.6, "v1"),
+            generation_cache_key("python", 5, "easy", "other", 0.6, "v1"),
+            generation_cache_key("python", 5, "easy", "fake", 0.7, "v1"),
+            generation_cache_key("python", 5, "easy", "fake", 0.6, "v2"),
+        ):
+            self.assertNotEqual(key, other)
+
+
+class GenerationCacheTests(SimpleTestCase):
+    def test_reuse_serves_the_cached_set(self):
+        cache, client = GenerationCache(LRUCacheBackend(), policy=POLICY_REUSE), CountingClient()
+        first = cache.call(client, "python", 4)
+        self.assertEqual(cache.call(client, "python", 4), first)
+        self.assertEqual(client.calls, [4])
+
+    def test_shuffle_keeps_each_answer_with_its_question(self):
+        cache, client = GenerationCache(LRUCacheBackend(), policy=POLICY_SHUFFLE), CountingClient()
+        first = cache.call(client, "python", 8)
+        second = cache.call(client, "python", 8)
+        self.assertEqual(client.calls, [8])
+        self.assertEqual(answers(second), answers(first))
+        self.assertEqual([question["id"] for question in second["questions"]], list(range(1, 9)))
+
+    def test_mix_generates_part_of_the_set_fresh(self):
+        cache, client = GenerationCache(LRUCacheBackend(), policy=POLICY_MIX, mix_ratio=0.25), CountingClient()
+        cache.call(client, "python", 8)
+        self.assertEqual(len(cache.call(client, "python", 8)["questions"]), 8)
+        self.assertEqual(client.calls, [8, 2])
+
+    def test_errors_are_not_cached(self):
+        cache, client = GenerationCache(LRUCacheBackend()), CountingClient({"error": "quota"})
+        cache.call(client, "python", 4)
+        cache.call(client, "python", 4)
+        self.assertEqual(client.calls, [4, 4])
+
+
+class ChunkedGenerationTests(SimpleTestCase):
+    def test_chunk_sizes_cover_the_request(self):
+        with fake_llm():
+            client = GeneratorClient(chunk_size=10)
+        self.assertEqual(client._chunk_sizes(23), [10, 10, 3])
+        self.assertEqual(client._chunk_sizes(20), [10, 10])
+
+    def test_merge_drops_repeats_and_failed_chunks(self):
+        with fake_llm():
+            client = GeneratorClient(chunk_size=2)
+        merged = client._merge_chunks([
+            fake_questions("a", 2),
+            {"error": "timeout"},
+            {"questions": fake_questions("a", 2)["questions"] + fake_questions("b", 1)["questions"]},
+        ], 5)
+        self.assertEqual([question["question"] for question in merged["questions"]],
+                         ["a: fake question 1?", "a: fake question 2?", "b: fake question 1?"])
+        self.assertEqual([question["id"] for question in merged["questions"]], [1, 2, 3])
+
+    def test_merge_reports_the_error_when_every_chunk_failed(self):
+        with fake_llm():
+            client = GeneratorClient(chunk_size=2)
+        self.assertEqual(client._merge_chunks([{"error": "timeout"}, {"error": "quota"}], 4), {"error": "timeout"})
+
+    def test_large_request_is_split(self):
+        with fake_llm():
+            client = GeneratorClient(chunk_size=3)
+            client.structured_model = ScriptedModel(*(fake_questions(f"chunk {n}", 3) for n in range(3)))
+            response = client.call_gemini("python", questions=7)
+        self.assertEqual(len(response["questions"]), 7)
+        self.assertEqual(sorted(prompt.rsplit(": ", 1)[1] for prompt in client.structured_model.prompts), ["1", "3", "3"])
+
+
+class AsyncGeneratorClientTests(SimpleTestCase):
+    def test_async_chunks_run_concurrently(self):
+        with fake_llm(delay=0.2):
+            client = GeneratorClient(chunk_size=2)
+
+            async def run():
+                start = asyncio.get_running_loop().time()
+                with track_usage() as usage:
+                    response = await client.acall_gemini("python", questions=6)
+                return response, usage, asyncio.get_running_loop().time() - start
+
+            response, usage, elapsed = asyncio.run(run())
+        # every chunk asks the fake model for the same two questions, the merge keeps one copy
+        self.assertEqual([question["id"] for question in response["questions"]], [1, 2])
+        # three chunks of 0.2s in flight together, not one after the other
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual(usage.calls, 3)
+
+    def test_async_and_sync_paths_agree(self):
+        with fake_llm():
+            client = GeneratorClient()
+            self.assertEqual(asyncio.run(client.acall_gemini("python", questions=3)),
+                             client.call_gemini("python", questions=3))
+
+
+class ValidationTests(SimpleTestCase):
+    def test_split_keeps_the_valid_questions(self):
+        response = fake_questions("python", 4)
+        response["questions"][1]["correct_index"] = 4
+        response["questions"][2]["choices"] = ["Same", "same", "Other", "Else"]
+        del response["questions"][3]["hint"]
+        valid, errors = QUESTION_VALIDATOR.split(response)
+        self.assertEqual([question["id"] for question in valid], [1])
+        self.assertEqual(errors, [
+            "$.questions[1].correct_index: out of range",
+            "$.questions[2].choices: not unique",
+            "$.questions[3].hint: missing",
+        ])
+
+    def test_booleans_are_not_integers(self):
+        question = fake_questions("python", 1)["questions"][0]
+        question["correct_index"] = True
+        self.assertFalse(QUESTION_VALIDATOR.is_valid(question))
+
+    def test_malformed_response(self):
+        self.assertEqual(QUESTION_VALIDATOR.split({"error": "quota"}), ([], ["quota"]))
+        self.assertEqual(QUESTION_VALIDATOR.split("text"), ([], ["malformed response"]))
+
+    def test_repair_asks_only_for_the_invalid_questions(self):
+        first = fake_questions("python", 3)
+        first["questions"][2]["correct_index"] = 9
+        with fake_llm():
+            client = GeneratorClient(repair_rounds=1)
+            client.structured_model = ScriptedModel(first, fake_questions("repaired", 1))
+            response = client.call_gemini("python", questions=3)
+        self.assertEqual([question["question"] for question in response["questions"]],
+                         ["python: fake question 1?", "python: fake question 2?", "repaired: fake question 1?"])
+        self.assertTrue(client.structured_model.prompts[1].endswith("Number of questions: 1"))
+
+
+class QuestionStreamParserTests(SimpleTestCase):
+    def test_questions_are_returned_as_soon_as_they_close(self):
+        text = '{"questions": [' + ", ".join(
+            json.dumps(question) for question in fake_questions("python", 2)["questions"]) + "]}"
+        parser = QuestionStreamParser()
+        split = text.index("}, {") + 1
+        self.assertEqual(parser.feed(text[:10]), [])
+        self.assertEqual([question["id"] for question in parser.feed(text[10:split])], [1])
+        self.assertEqual([question["id"] for question in parser.feed(text[split:])], [2])
+        self.assertTrue(parser.done)
+
+    def test_braces_inside_strings_and_incomplete_objects(self):
+        question = fake_questions("python", 1)["questions"][0]
+        question["question"] = 'What does "{}" print? \\ }'
+        parser = QuestionStreamParser()
+        text = '{"questions": [{"id": 1}, ' + json.dumps(question) + "]}"
+        parsed = [item for char in text for item in parser.feed(char)]
+        self.assertEqual(parsed, [question])
+
+
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        self.flight = SingleFlight()
+        self.calls = 0
+        self.release = None
+
+    async def generate(self):
+        self.calls += 1
+        await self.release.wait()
+        return fake_questions("python", 2)
+
+    def test_concurrent_callers_share_one_call(self):
+        async def run():
+            self.release = asyncio.Event()
+            callers = [asyncio.ensure_future(self.flight.ado("key", self.generate)) for _ in range(3)]
+            await asyncio.sleep(0)
+            self.release.set()
+            return await asyncio.gather(*callers)
+
+        (leader, shared), *followers = asyncio.run(run())
+        self.assertEqual(self.calls, 1)
+        self.assertFalse(shared)
+        for response, shared in followers:
+            self.assertTrue(shared)
+            self.assertEqual(response, leader)
+            self.assertIsNot(response, leader)
+
+    def test_cancelled_leader_does_not_fail_its_followers(self):
+        async def run():
+            self.release = asyncio.Event()
+            leader = asyncio.ensure_future(self.flight.ado("key", self.generate))
+            await asyncio.sleep(0)
+            follower = asyncio.ensure_future(self.flight.ado("key", self.generate))
+            await asyncio.sleep(0)
+            leader.cancel()
+            await asyncio.sleep(0)
+            self.release.set()
+            return leader, await follower
+
+        leader, (response, shared) = asyncio.run(run())
+        self.assertTrue(leader.cancelled())
+        self.assertEqual(len(response["questions"]), 2)
+        self.assertEqual(self.calls, 1)
+
+    def test_call_is_cancelled_when_nobody_waits(self):
+        async def run():
+            self.release = asyncio.Event()
+            caller = asyncio.ensure_future(self.flight.ado("key", self.generate))
+            await asyncio.sleep(0)
+            caller.cancel()
+            await asyncio.sleep(0)
+            # a new caller starts over instead of joining the cancelled call
+            self.release.set()
+            return await self.flight.ado("key", self.generate)
+
+        response, shared = asyncio.run(run())
+        self.assertFalse(shared)
+        self.assertEqual(self.calls, 2)
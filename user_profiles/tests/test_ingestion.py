@@ -0,0 +1,102 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from RAGpipelines import ingestion
+from RAGpipelines.embeddings import get_embedder
+from RAGpipelines.ingestion import Retriever, ingest
+from RAGpipelines.vectorIndex import VectorIndex
+
+
+class IndexTestCase(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.index_dir = os.path.join(self.root, "index")
+        self.docs = os.path.join(self.root, "docs")
+        os.makedirs(self.docs)
+        self.embedder = get_embedder("hashing", dim=64)
+
+    def write(self, name, text):
+        with open(os.path.join(self.docs, name), "w") as fh:
+            fh.write(text)
+
+    def ingest(self, **kwargs):
+        # a separate VectorIndex, as the ingestion command opens in its own process
+        return ingest([self.docs], VectorIndex(self.index_dir, dim=64), self.embedder, chunk_size=60, chunk_overlap=0,
+                      **kwargs)
+
+
+class IndexReloadTests(IndexTestCase):
+    def test_reader_follows_a_compacting_reindex(self):
+        for number in range(6):
+            self.write(f"doc{number}.txt", f"Document {number} talks about topic {number} in some detail.")
+        self.ingest()
+        retriever = Retriever(VectorIndex(self.index_dir, reload_interval=0), self.embedder, k=2)
+        retriever.context_for("topic 3")
+        old_version = retriever.version
+
+        for number in range(5):
+            os.remove(os.path.join(self.docs, f"doc{number}.txt"))
+        self.write("new.txt", "Entirely new material about recursion and stacks.")
+        self.assertEqual(self.ingest(prune=True)["compacted"], 1)
+
+        hits = retriever.retrieve("recursion and stacks")
+        self.assertEqual({hit["source"] for hit in hits},
+                         {os.path.join(self.docs, "new.txt"), os.path.join(self.docs, "doc5.txt")})
+        self.assertNotEqual(retriever.version, old_version)
+        self.assertEqual(retriever.index.version, VectorIndex(self.index_dir).version)
+
+    def test_reader_sees_deletions_without_compaction(self):
+        self.write("a.txt", "Alpha material on sorting algorithms.")
+        self.write("b.txt", "Beta material on graph traversal.")
+        self.ingest()
+        index = VectorIndex(self.index_dir, reload_interval=0)
+        self.assertEqual(len(index.search(self.embedder.embed_query("graph"), k=5)), 2)
+
+        os.remove(os.path.join(self.docs, "b.txt"))
+        self.assertEqual(self.ingest(prune=True, compact_threshold=1.0)["compacted"], 0)
+        self.assertEqual([hit["source"] for hit in index.search(self.embedder.embed_query("graph"), k=5)],
+                         [os.path.join(self.docs, "a.txt")])
+
+    def test_reload_waits_for_the_interval(self):
+        self.write("a.txt", "Alpha material on sorting algorithms.")
+        index = VectorIndex(self.index_dir, dim=64, reload_interval=3600)
+        self.ingest()
+        self.assertFalse(index.refresh())
+        self.assertEqual(len(index), 0)
+
+
+class IncrementalIngestTests(IndexTestCase):
+    def ingest_counting_reads(self):
+        with mock.patch.object(ingestion, "read_document", wraps=ingestion.read_document) as read_document:
+            stats = self.ingest()
+        return stats, read_document.call_count
+
+    def test_unchanged_files_are_not_read(self):
+        self.write("a.txt", "Alpha material on sorting algorithms.")
+        self.write("b.txt", "Beta material on graph traversal.")
+        self.assertEqual(self.ingest_counting_reads()[1], 2)
+
+        stats, reads = self.ingest_counting_reads()
+        self.assertEqual((stats["documents_unchanged"], reads), (2, 0))
+
+    def test_touched_file_is_hashed_not_extracted(self):
+        self.write("a.txt", "Alpha material on sorting algorithms.")
+        self.ingest()
+        path = os.path.join(self.docs, "a.txt")
+        os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10 ** 9))
+
+        stats, reads = self.ingest_counting_reads()
+        self.assertEqual((stats["documents_unchanged"], reads), (1, 0))
+
+    def test_edited_file_is_reindexed(self):
+        self.write("a.txt", "Alpha material on sorting algorithms.")
+        self.ingest()
+        self.write("a.txt", "Alpha material on sorting algorithms. Now with heaps.")
+
+        stats, reads = self.ingest_counting_reads()
+        self.assertEqual((stats["documents_changed"], reads), (1, 1))
@@ -0,0 +1,91 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core import mail
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from user_profiles import outbox, views
+from user_profiles.models import OutboundEmail, User
+
+
+class FailingBackend:
+    """
+    Mail backend whose connection opens but refuses every message.
+    """
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def open(self):
+        return True
+
+    def close(self):
+        pass
+
+    def send_messages(self, messages):
+        raise ConnectionError("mail server rejected the message")
+
+
+@override_settings(EMAIL_OUTBOX={"AUTO_START": False, "MAX_ATTEMPTS": 2})
+class OutboxTests(TestCase):
+    def queue(self):
+        return outbox.queue_email("Subject", "Body", ["user@example.com"], from_email="noreply@example.com")
+
+    def test_pending_email_is_sent(self):
+        email = self.queue()
+        self.assertEqual(outbox.send_pending(), {"sent": 1, "retried": 0, "failed": 0})
+        self.assertEqual([message.to for message in mail.outbox], [["user@example.com"]])
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), (OutboundEmail.STATUS_SENT, 1))
+
+    def test_failed_send_is_retried_after_backoff(self):
+        email = self.queue()
+        with mock.patch.object(outbox, "get_connection", FailingBackend):
+            self.assertEqual(outbox.send_pending(), {"sent": 0, "retried": 1, "failed": 0})
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), (OutboundEmail.STATUS_PENDING, 1))
+        self.assertGreater(email.nextAttemptAt, timezone.now())
+        self.assertIn("rejected", email.lastError)
+
+        # not due yet
+        self.assertEqual(outbox.send_pending(), {"sent": 0, "retried": 0, "failed": 0})
+        OutboundEmail.objects.filter(pk=email.pk).update(nextAttemptAt=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(outbox.send_all_pending(), {"sent": 1, "retried": 0, "failed": 0})
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_email_fails_after_max_attempts(self):
+        email = self.queue()
+        with mock.patch.object(outbox, "get_connection", FailingBackend):
+            outbox.send_pending()
+            OutboundEmail.objects.filter(pk=email.pk).update(nextAttemptAt=timezone.now())
+            self.assertEqual(outbox.send_pending(), {"sent": 0, "retried": 0, "failed": 1})
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), (OutboundEmail.STATUS_FAILED, 2))
+
+    def test_sender_starts_with_the_server(self):
+        with mock.patch.object(outbox, "wake_sender") as wake_sender:
+            outbox.start_sender()
+            wake_sender.assert_not_called()
+            with self.settings(EMAIL_OUTBOX={"AUTO_START": True}):
+                outbox.start_sender()
+            wake_sender.assert_called_once_with()
+
+
+@override_settings(EMAIL_OUTBOX={"AUTO_START": False})
+class RegistrationOutboxTests(TestCase):
+    SIGNUP = {"name": "New", "email": "new@example.com", "password": "secret", "confirm_password": "secret"}
+
+    def test_registration_queues_the_activation_email(self):
+        response = APIClient().post("/api/auth/registration/", self.SIGNUP, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(User.objects.get(email="new@example.com").is_active)
+        self.assertEqual(OutboundEmail.objects.get().to, ["new@example.com"])
+        self.assertEqual(mail.outbox, [])
+
+    def test_user_is_not_kept_when_the_email_cannot_be_queued(self):
+        with mock.patch.object(views, "send_activation_email", side_effect=RuntimeError("database unavailable")):
+            response = APIClient().post("/api/auth/registration/", self.SIGNUP, format="json")
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(User.objects.filter(email="new@example.com").exists())
+        self.assertFalse(OutboundEmail.objects.exists())
@@ -0,0 +1,180 @@
+import asyncio
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from RAGpipelines.benchmarks.fakeLLM import fake_llm
+from RAGpipelines.callPolicy import CallPolicy, CircuitBreaker, CircuitOpenError, DeadlineExceeded
+from RAGpipelines.clientRegistry import ClientRegistry
+from RAGpipelines.questionGeneratorPipeline import GeneratorClient
+from user_profiles import generation, jobs
+from user_profiles.models import TestSession
+from user_profiles.tests.base import GENERATE, APITestCase
+
+
+def quick_policy(**kwargs):
+    options = dict(retries=0, deadline=5, backoff_initial=0.001, backoff_max=0.001, failure_threshold=1,
+                   recovery_timeout=3600)
+    options.update(kwargs)
+    return CallPolicy(**options)
+
+
+def fail():
+    raise ConnectionError("provider unavailable")
+
+
+class FlakyStream:
+    """
+    Streaming model whose first ``failures`` requests fail before the first chunk.
+    """
+    def __init__(self, model, failures):
+        self.model = model
+        self.failures = failures
+        self.opened = 0
+
+    async def astream(self, prompt):
+        self.opened += 1
+        if self.opened <= self.failures:
+            raise ConnectionError("connection reset")
+        async for chunk in self.model.astream(prompt):
+            yield chunk
+
+
+async def collect(stream):
+    return [question async for question in stream]
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=10, clock=lambda: self.now)
+
+    def test_opens_after_consecutive_failures(self):
+        self.breaker.record_failure()
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(self.breaker.allow())
+
+    def test_one_probe_after_the_recovery_timeout(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.now = 10
+        self.assertEqual(self.breaker.admit(), (True, True))
+        self.assertEqual(self.breaker.admit(), (False, False))
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_released_probe_lets_the_next_call_probe(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.now = 10
+        self.breaker.admit()
+        self.breaker.release_probe()
+        self.assertEqual(self.breaker.admit(), (True, True))
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+
+class CallPolicyTests(SimpleTestCase):
+    def test_retries_until_success(self):
+        outcomes = [ConnectionError("reset"), "ok"]
+
+        def flaky():
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        self.assertEqual(quick_policy(retries=1, failure_threshold=5).call(flaky), "ok")
+
+    def test_open_circuit_fails_fast(self):
+        policy = quick_policy()
+        with self.assertRaises(ConnectionError):
+            policy.call(fail)
+        calls = []
+        with self.assertRaises(CircuitOpenError):
+            policy.call(calls.append, 1)
+        self.assertEqual(calls, [])
+
+    def test_deadline_abandons_a_stuck_call(self):
+        policy = quick_policy(deadline=0.05, failure_threshold=5)
+        with self.assertRaises(DeadlineExceeded):
+            asyncio.run(policy.acall(asyncio.sleep, 1))
+
+    def test_cancelled_probe_releases_the_circuit(self):
+        policy = quick_policy(recovery_timeout=0)
+        with self.assertRaises(ConnectionError):
+            policy.call(fail)
+
+        async def cancel_probe():
+            probe = asyncio.ensure_future(policy.acall(asyncio.sleep, 10))
+            await asyncio.sleep(0.01)
+            probe.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await probe
+
+        asyncio.run(cancel_probe())
+        # the next call may probe instead of finding the slot taken forever
+        self.assertEqual(policy.call(lambda: "ok"), "ok")
+        self.assertEqual(policy.breaker.state, CircuitBreaker.CLOSED)
+
+
+class GeneratorClientPolicyTests(SimpleTestCase):
+    def generator(self, **kwargs):
+        with fake_llm():
+            return GeneratorClient(policy=quick_policy(**kwargs))
+
+    def test_request_timeout_is_below_the_deadline(self):
+        client = self.generator(deadline=30)
+        self.assertLess(client.request_timeout, 30)
+
+    def test_open_circuit_is_reported_as_an_error(self):
+        client = self.generator()
+        client.policy.breaker.record_failure()
+        self.assertEqual(client.call_gemini("python", questions=2), {"error": "provider circuit is open"})
+
+    def test_stream_is_refused_while_the_circuit_is_open(self):
+        client = self.generator()
+        client.policy.breaker.record_failure()
+        with self.assertRaises(CircuitOpenError):
+            asyncio.run(collect(client.astream_questions("python", questions=2)))
+
+    def test_stream_setup_is_retried(self):
+        client = self.generator(retries=1, failure_threshold=5)
+        client.json_model = FlakyStream(client.json_model, failures=1)
+        questions = asyncio.run(collect(client.astream_questions("python", questions=2)))
+        self.assertEqual([question["id"] for question in questions], [1, 2])
+        self.assertEqual(client.json_model.opened, 2)
+
+    def test_failed_stream_opens_the_circuit(self):
+        client = self.generator()
+        client.json_model = FlakyStream(client.json_model, failures=1)
+        with self.assertRaises(ConnectionError):
+            asyncio.run(collect(client.astream_questions("python", questions=2)))
+        self.assertEqual(client.policy.breaker.state, CircuitBreaker.OPEN)
+
+    def test_policy_outlives_evicted_clients(self):
+        registry = ClientRegistry(max_size=1, factory=generation._build_generator_client)
+        with fake_llm():
+            first = registry.get(model_name="policy-test")
+            registry.get(model_name="other-model")
+            second = registry.get(model_name="policy-test")
+        self.assertIsNot(first, second)
+        self.assertIs(first.policy, second.policy)
+        self.assertIsNot(first.policy, generation.get_call_policy("other-model"))
+
+
+class RegenerationFailureTests(APITestCase):
+    def test_questions_in_hand_are_kept_when_regeneration_fails(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/api/generate/", GENERATE, format="json")
+        # the stub repeats itself, so the second session asks for replacements
+        regenerator = mock.Mock(**{"call_gemini.side_effect": CircuitOpenError("provider circuit is open")})
+        with mock.patch.object(jobs, "get_generator", return_value=regenerator):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post("/api/generate/", GENERATE, format="json")
+        regenerator.call_gemini.assert_called_once()
+        test_session = TestSession.objects.get(sessionId=response.json()["sessionId"])
+        self.assertEqual(test_session.status, TestSession.STATUS_COMPLETED)
+        self.assertEqual(test_session.questions.count(), 3)
@@ -0,0 +1,41 @@
+from django.test import TestCase
+
+from RAGpipelines.benchmarks.fakeLLM import fake_questions
+from user_profiles.models import QuestionBank, User
+from user_profiles.question_bank import bank_depth, question_fingerprint, take_from_bank
+
+
+class QuestionBankTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="owner@example.com", name="Owner", password="secret")
+        self.other = User.objects.create_user(email="other@example.com", name="Other", password="secret")
+        QuestionBank.objects.bulk_create([
+            QuestionBank(topic="Python", normalizedTopic="python", difficultyLevel="easy",
+                         fingerprint=question_fingerprint(question), question=question)
+            for question in fake_questions("python", 6)["questions"]
+        ])
+
+    def texts(self, questions):
+        return {question["question"] for question in questions}
+
+    def test_depth_counts_questions_nobody_was_served(self):
+        self.assertEqual(bank_depth("Python", "easy"), 6)
+        take_from_bank(self.user, "Python", "easy", 2)
+        self.assertEqual(bank_depth("Python", "easy"), 4)
+        take_from_bank(self.other, "Python", "easy", 6)
+        self.assertEqual(bank_depth("Python", "easy"), 0)
+
+    def test_user_is_never_served_a_question_twice(self):
+        first = take_from_bank(self.user, "python", "easy", 4)
+        second = take_from_bank(self.user, "python", "easy", 4)
+        self.assertEqual((len(first), len(second)), (4, 2))
+        self.assertFalse(self.texts(first) & self.texts(second))
+        self.assertEqual(take_from_bank(self.user, "python", "easy", 4), [])
+        # other users still get the whole bank
+        self.assertEqual(len(take_from_bank(self.other, "python", "easy", 6)), 6)
+
+    def test_fallback_repeats_served_questions(self):
+        take_from_bank(self.user, "python", "easy", 6)
+        repeats = take_from_bank(self.user, "python", "easy", 3, include_served=True)
+        self.assertEqual(len(repeats), 3)
+        self.assertEqual({question["difficulty_level"] for question in repeats}, {"easy"})
@@ -0,0 +1,45 @@
+from django.test import TestCase
+
+from user_profiles.models import SkillRating, User
+from user_profiles.skills import SkillModel
+
+
+class SkillPersistenceTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="owner@example.com", name="Owner", password="secret")
+
+    def stored(self):
+        return SkillRating.objects.values_list("rating", "answered").get(user=self.user, normalizedTopic="python")
+
+    def test_answers_are_not_written_on_the_request_path(self):
+        model = SkillModel(persist_interval=0)
+        model.record_answers(self.user.pk, "Python", ["easy", "hard"], [True, False])
+        self.assertFalse(SkillRating.objects.exists())
+        model.flush()
+        self.assertEqual(self.stored()[1], 2)
+        self.assertAlmostEqual(self.stored()[0], model.rating(self.user.pk, "python"), places=5)
+
+    def test_workers_add_up_instead_of_overwriting(self):
+        # two worker processes that both loaded the user's rating before either flushed
+        first, second = SkillModel(), SkillModel()
+        first.record_answers(self.user.pk, "python", ["medium"] * 3, [True] * 3)
+        second.record_answers(self.user.pk, "python", ["medium"] * 2, [False] * 2)
+        first_change = first.rating(self.user.pk, "python")
+        second_change = second.rating(self.user.pk, "python")
+        first.flush()
+        second.flush()
+
+        rating, answered = self.stored()
+        self.assertEqual(answered, 5)
+        self.assertAlmostEqual(rating, first_change + second_change, places=5)
+        # the last flush also brought the other worker's answers into memory
+        self.assertAlmostEqual(second.rating(self.user.pk, "python"), rating, places=5)
+
+    def test_answers_recorded_during_a_flush_stay_pending(self):
+        model = SkillModel()
+        model.record_answers(self.user.pk, "python", ["easy"], [True])
+        model.flush()
+        model.record_answers(self.user.pk, "python", ["easy"], [True])
+        self.assertEqual(self.stored()[1], 1)
+        model.flush()
+        self.assertEqual(self.stored()[1], 2)
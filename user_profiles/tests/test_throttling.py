@@ -0,0 +1,108 @@
+import threading
+import time
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from user_profiles.throttling import (
+    GLOBAL_BUCKET, DjangoCacheBucketStore, FairScheduler, GenerationLimiter, MemoryBucketStore,
+)
+
+
+class SlowCache:
+    """
+    Widens the window between reading and writing a bucket, as a network cache would.
+    """
+    def __init__(self, cache):
+        self.cache = cache
+
+    def get_many(self, keys):
+        values = self.cache.get_many(keys)
+        time.sleep(0.002)
+        return values
+
+    def __getattr__(self, name):
+        return getattr(self.cache, name)
+
+
+def limiter(store, user_burst=1000, global_burst=100):
+    # refill is negligible over the length of a test
+    return GenerationLimiter(store, user_rate=1e-6, user_burst=user_burst, global_rate=1e-6, global_burst=global_burst)
+
+
+class BucketStoreTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_both_buckets_are_charged_or_neither(self):
+        for store in (MemoryBucketStore(), DjangoCacheBucketStore()):
+            buckets = limiter(store, user_burst=30)
+            self.assertEqual(buckets.try_acquire(1, 20), 0)
+            self.assertGreater(buckets.try_acquire(1, 20), 0)
+            # the refused check took nothing from the global bucket
+            for user_id in range(2, 6):
+                self.assertEqual(buckets.try_acquire(user_id, 20), 0)
+            self.assertGreater(buckets.try_acquire(6, 20), 0)
+
+    def test_global_bucket_holds_across_concurrent_users(self):
+        store = DjangoCacheBucketStore(lock_wait=5)
+        store._cache = SlowCache(store._cache)
+        buckets = limiter(store)
+        admitted = []
+        start = threading.Barrier(20)
+
+        def check(user_id):
+            start.wait()
+            if not buckets.try_acquire(user_id, 10):
+                admitted.append(user_id)
+
+        threads = [threading.Thread(target=check, args=(user_id,)) for user_id in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(admitted), 10)
+
+    def test_busy_lock_refuses_the_check(self):
+        store = DjangoCacheBucketStore(lock_wait=0.01)
+        cache.add(f"ratelimit:lock:{GLOBAL_BUCKET}", 1)
+        self.assertGreater(limiter(store).try_acquire(1, 10), 0)
+        cache.delete(f"ratelimit:lock:{GLOBAL_BUCKET}")
+        # nothing was charged while the lock was held
+        self.assertEqual(limiter(store, global_burst=10).try_acquire(1, 10), 0)
+
+
+class FairSchedulerTests(SimpleTestCase):
+    def setUp(self):
+        self.started = []
+        # 10 tokens a burst, refilled in 0.05s
+        self.scheduler = FairScheduler(
+            GenerationLimiter(MemoryBucketStore(), user_rate=200, user_burst=10, global_rate=200, global_burst=10),
+            lambda func, name: self.started.append(name),
+        )
+
+    def test_turn_is_immediate_when_nothing_waits(self):
+        self.assertTrue(self.scheduler.reserve(1, 10).done())
+
+    def test_turn_waits_behind_queued_jobs(self):
+        self.scheduler.submit(1, 10, None, "first")
+        self.assertFalse(self.scheduler.submit(2, 10, None, "queued"))
+        turn = self.scheduler.reserve(3, 10)
+        self.assertFalse(turn.done())
+        self.assertTrue(turn.result(timeout=5))
+        self.assertEqual(self.started, ["first", "queued"])
+
+    def test_cancelled_turn_is_dropped(self):
+        self.scheduler.submit(1, 10, None, "first")
+        turn = self.scheduler.reserve(2, 10)
+        turn.cancel()
+        self.scheduler.submit(3, 10, None, "after")
+        deadline = time.monotonic() + 5
+        while self.started != ["first", "after"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.started, ["first", "after"])
+        self.assertEqual(self.scheduler.queued(), 0)
+
+    def test_oversized_cost_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.scheduler.reserve(1, 11)
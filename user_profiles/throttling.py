@@ -0,0 +1,280 @@
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Tuple
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_BUCKET = "global"
+
+
+def limit_settings() -> Dict[str, Any]:
+    config = {
+        "BACKEND": "user_profiles.throttling.MemoryBucketStore",
+        "OPTIONS": {},
+        "USER_TOKENS_PER_MINUTE": 20000,
+        "USER_BURST": 30000,
+        "GLOBAL_TOKENS_PER_MINUTE": 200000,
+        "GLOBAL_BURST": 300000,
+        "TOKENS_PER_QUESTION": 150,
+        "BASE_TOKENS": 100,
+        "MAX_QUESTIONS": 100,
+        "MAX_WAIT": 30,
+    }
+    config.update(getattr(settings, "GENERATION_RATE_LIMIT", {}))
+    return config
+
+
+def estimate_tokens(questions: int) -> int:
+    """
+    Rough output size of a generation; every question carries text, four
+    choices, a hint and an explanation.
+    """
+    config = limit_settings()
+    return config["BASE_TOKENS"] + config["TOKENS_PER_QUESTION"] * max(questions, 0)
+
+
+def _refill(level: float, updated: float, capacity: float, rate: float, now: float) -> float:
+    return min(capacity, level + (now - updated) * rate)
+
+
+def _take_all(state: Dict[str, Tuple[float, float]], requests, now: float) -> Tuple[Dict[str, Tuple[float, float]], float]:
+    """
+    Refills every requested bucket and takes ``cost`` from all of them, or from
+    none. Returns the new state and 0, or the unchanged state and the seconds
+    until the slowest bucket can cover its cost.
+    """
+    levels = {}
+    wait = 0.0
+    for key, capacity, rate, cost in requests:
+        level, updated = state.get(key, (capacity, now))
+        level = _refill(level, updated, capacity, rate, now)
+        levels[key] = level
+        if level < cost:
+            wait = max(wait, (cost - level) / rate)
+    if wait:
+        return state, wait
+    for key, _, _, cost in requests:
+        state[key] = (levels[key] - cost, now)
+    return state, 0.0
+
+
+class MemoryBucketStore:
+    """
+    Token buckets held in this process. One dict lookup per bucket per check.
+    """
+    def __init__(self):
+        self.buckets: Dict[str, Tuple[float, float]] = {}
+        self.lock = threading.Lock()
+
+    def take(self, requests) -> float:
+        with self.lock:
+            self.buckets, wait = _take_all(self.buckets, requests, time.time())
+        return wait
+
+
+class DjangoCacheBucketStore:
+    """
+    Token buckets in a Django cache shared by all workers. Every bucket has its
+    own short cache.add() lock, taken in sorted order so two checks sharing the
+    global bucket serialize on it without deadlocking. If the locks cannot be
+    had within ``lock_wait`` seconds the check is refused with a short wait,
+    like an empty bucket, instead of being let through.
+    """
+    def __init__(self, alias: str = "default", lock_wait: float = 0.05, lock_timeout: float = 1, ttl: float = 3600):
+        from django.core.cache import caches
+
+        self._cache = caches[alias]
+        self.lock_wait = lock_wait
+        # a lock left behind by a crashed worker expires after lock_timeout seconds
+        self.lock_timeout = lock_timeout
+        self.ttl = ttl
+
+    def _lock(self, lock_key: str, deadline: float) -> bool:
+        while not self._cache.add(lock_key, 1, timeout=self.lock_timeout):
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.002)
+        return True
+
+    def take(self, requests) -> float:
+        keys = [f"ratelimit:bucket:{key}" for key, _, _, _ in requests]
+        deadline = time.monotonic() + self.lock_wait
+        held = []
+        try:
+            for cache_key in sorted(keys):
+                lock_key = cache_key.replace("ratelimit:bucket:", "ratelimit:lock:", 1)
+                if not self._lock(lock_key, deadline):
+                    logger.warning("Rate limit lock %s busy, asking the caller to wait", lock_key)
+                    return self.lock_wait
+                held.append(lock_key)
+
+            stored = self._cache.get_many(keys)
+            state = {key: stored[cache_key] for (key, _, _, _), cache_key in zip(requests, keys) if cache_key in stored}
+            state, wait = _take_all(state, requests, time.time())
+            if not wait:
+                self._cache.set_many(
+                    {cache_key: state[key] for (key, _, _, _), cache_key in zip(requests, keys)}, timeout=self.ttl
+                )
+            return wait
+        finally:
+            if held:
+                self._cache.delete_many(held)
+
+
+class GenerationLimiter:
+    """
+    Per-user and global token buckets, refilled continuously and charged with
+    the estimated output tokens of each generation.
+    """
+    def __init__(self, store, user_rate: float, user_burst: float, global_rate: float, global_burst: float):
+        self.store = store
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.global_rate = global_rate
+        self.global_burst = global_burst
+
+    def fits(self, cost: float) -> bool:
+        """
+        Whether the buckets can ever pay ``cost``; a larger job would wait forever.
+        """
+        return cost <= min(self.user_burst, self.global_burst)
+
+    def try_acquire(self, user_id: int, cost: float) -> float:
+        """
+        Takes ``cost`` tokens from the user's and the global bucket. Returns 0 on
+        success, otherwise the seconds to wait before trying again.
+        """
+        return self.store.take([
+            (f"user:{user_id}", self.user_burst, self.user_rate, cost),
+            (GLOBAL_BUCKET, self.global_burst, self.global_rate, cost),
+        ])
+
+
+class FairScheduler:
+    """
+    Holds generations that are over the limit instead of rejecting them. Each
+    user has their own FIFO; a dispatcher thread visits users round-robin and
+    starts a user's next job as soon as both buckets can pay for it, so one
+    user with many large requests cannot starve the others.
+    """
+    def __init__(self, limiter: GenerationLimiter, dispatch):
+        self.limiter = limiter
+        self.dispatch = dispatch
+        self.waiting: "OrderedDict[int, deque]" = OrderedDict()
+        self.condition = threading.Condition()
+        self.thread = None
+
+    def submit(self, user_id: int, cost: float, func, *args) -> bool:
+        """
+        Dispatches right away when nobody is queued and the buckets allow it.
+        Returns False when the job was queued. Raises ValueError for a cost the
+        buckets can never cover.
+        """
+        return self._enqueue(user_id, cost, lambda: self.dispatch(func, *args))
+
+    def reserve(self, user_id: int, cost: float) -> Future:
+        """
+        Queues a turn instead of a job, for callers that run the generation
+        themselves (the async views). The future resolves once the buckets have
+        paid for the turn; cancel it to give the turn up while it waits.
+        """
+        turn = Future()
+
+        def start():
+            if turn.set_running_or_notify_cancel():
+                turn.set_result(True)
+
+        self._enqueue(user_id, cost, start, turn.cancelled)
+        return turn
+
+    def _enqueue(self, user_id: int, cost: float, start, cancelled=lambda: False) -> bool:
+        if not self.limiter.fits(cost):
+            raise ValueError(f"Generation cost of {cost} tokens exceeds the rate limit burst")
+        with self.condition:
+            if not self.waiting and not self.limiter.try_acquire(user_id, cost):
+                immediate = True
+            else:
+                immediate = False
+                self.waiting.setdefault(user_id, deque()).append((cost, start, cancelled))
+                self._ensure_thread()
+                self.condition.notify()
+        if immediate:
+            start()
+        return immediate
+
+    def queued(self) -> int:
+        with self.condition:
+            return sum(len(jobs) for jobs in self.waiting.values())
+
+    def _ensure_thread(self) -> None:
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self._loop, name="generation-scheduler", daemon=True)
+            self.thread.start()
+
+    def _next_ready(self) -> Tuple[List[Callable[[], Any]], float]:
+        ready, wait = [], None
+        for user_id in list(self.waiting):
+            jobs = self.waiting[user_id]
+            # turns given up while waiting are dropped without paying for them
+            while jobs and jobs[0][2]():
+                jobs.popleft()
+            if not jobs:
+                del self.waiting[user_id]
+                continue
+            cost, start, _ = jobs[0]
+            user_wait = self.limiter.try_acquire(user_id, cost)
+            if user_wait:
+                wait = user_wait if wait is None else min(wait, user_wait)
+                continue
+            jobs.popleft()
+            ready.append(start)
+            # served users go to the back of the rotation
+            self.waiting.move_to_end(user_id)
+            if not jobs:
+                del self.waiting[user_id]
+        return ready, wait or 0.0
+
+    def _loop(self) -> None:
+        while True:
+            with self.condition:
+                while not self.waiting:
+                    self.condition.wait()
+                ready, wait = self._next_ready()
+                if not ready:
+                    self.condition.wait(timeout=max(wait, 0.01))
+            for start in ready:
+                start()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_limiter() -> GenerationLimiter:
+    return get_scheduler().limiter
+
+
+def get_scheduler() -> FairScheduler:
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                from user_profiles.jobs import get_queue
+
+                config = limit_settings()
+                limiter = GenerationLimiter(
+                    import_string(config["BACKEND"])(**config["OPTIONS"]),
+                    user_rate=config["USER_TOKENS_PER_MINUTE"] / 60.0,
+                    user_burst=config["USER_BURST"],
+                    global_rate=config["GLOBAL_TOKENS_PER_MINUTE"] / 60.0,
+                    global_burst=config["GLOBAL_BURST"],
+                )
+                _scheduler = FairScheduler(limiter, lambda func, *args: get_queue().submit(func, *args))
+    return _scheduler
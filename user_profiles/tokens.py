@@ -0,0 +1,142 @@
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication
+
+from user_profiles.models import User
+
+
+ACCESS = "access"
+REFRESH = "refresh"
+_SALTS = {ACCESS: "user_profiles.tokens.access", REFRESH: "user_profiles.tokens.refresh"}
+
+
+def token_settings() -> Dict[str, Any]:
+    config = {
+        "ACCESS_TTL": 15 * 60,
+        "REFRESH_TTL": 14 * 24 * 3600,
+        "CACHE_ALIAS": "default",
+    }
+    config.update(getattr(settings, "AUTH_TOKENS", {}))
+    return config
+
+
+def _revocations():
+    return caches[token_settings()["CACHE_ALIAS"]]
+
+
+def _sign(claims: Dict[str, Any], kind: str) -> str:
+    return signing.dumps(dict(claims, typ=kind, jti=uuid.uuid4().hex, iat=int(time.time())), salt=_SALTS[kind])
+
+
+def issue_tokens(user) -> Dict[str, Any]:
+    """
+    Signed access and refresh tokens for ``user``. The access token carries
+    everything the API needs to rebuild the user without a query.
+    """
+    config = token_settings()
+    claims = {"uid": user.pk, "email": user.email, "name": user.name, "adm": bool(user.is_admin)}
+    return {
+        "access": _sign(claims, ACCESS),
+        "refresh": _sign(claims, REFRESH),
+        "expiresIn": config["ACCESS_TTL"],
+    }
+
+
+def read_token(token: str, kind: str) -> Dict[str, Any]:
+    """
+    Verifies signature, age, type and revocation of a token and returns its claims.
+    Raises signing.BadSignature (or its SignatureExpired subclass) when invalid.
+    """
+    ttl = token_settings()["ACCESS_TTL" if kind == ACCESS else "REFRESH_TTL"]
+    claims = signing.loads(token, salt=_SALTS[kind], max_age=ttl)
+    if claims.get("typ") != kind:
+        raise signing.BadSignature("Wrong token type")
+    if _revocations().get(f"auth:revoked:{claims['jti']}"):
+        raise signing.BadSignature("Token revoked")
+    return claims
+
+
+def revoke_token(claims: Dict[str, Any]) -> None:
+    """
+    Adds a token to the revocation list until it would have expired anyway.
+    """
+    ttl = token_settings()["ACCESS_TTL" if claims["typ"] == ACCESS else "REFRESH_TTL"]
+    remaining = max(1, claims["iat"] + ttl - int(time.time()))
+    _revocations().set(f"auth:revoked:{claims['jti']}", 1, timeout=remaining)
+
+
+def refresh_tokens(refresh: str) -> Dict[str, Any]:
+    """
+    Exchanges a refresh token for a new pair; the old refresh token is revoked (rotation).
+    The user is reloaded, so deleted or deactivated users cannot refresh and the
+    new tokens carry the current claims. Raises signing.BadSignature otherwise.
+    """
+    claims = read_token(refresh, REFRESH)
+    revoke_token(claims)
+    user = User.objects.filter(pk=claims["uid"]).first()
+    if user is None or not user.is_active:
+        raise signing.BadSignature("User is inactive or no longer exists")
+    return issue_tokens(user)
+
+
+def user_from_claims(claims: Dict[str, Any]) -> User:
+    """
+    An in-memory User for the token's subject. Usable as a foreign key value
+    and for permission checks; it is not reloaded from the database.
+    """
+    user = User(id=claims["uid"], email=claims["email"], name=claims.get("name", ""),
+                is_admin=claims.get("adm", False), is_active=True)
+    user._state.adding = False
+    user._state.db = "default"
+    return user
+
+
+def bearer_token(request) -> Optional[str]:
+    header = request.META.get("HTTP_AUTHORIZATION", "")
+    scheme, _, token = header.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return token.strip()
+
+
+def user_from_request(request) -> Optional[User]:
+    """
+    The user of a bearer access token on a plain Django request, None when the
+    request has no valid token.
+    """
+    token = bearer_token(request)
+    if token is None:
+        return None
+    try:
+        return user_from_claims(read_token(token, ACCESS))
+    except signing.BadSignature:
+        return None
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """
+    DRF authentication for ``Authorization: Bearer <access token>``. Tokens are
+    verified in memory; the only lookup is the revocation list in the cache.
+    """
+    keyword = "Bearer"
+
+    def authenticate(self, request):
+        token = bearer_token(request)
+        if token is None:
+            return None
+        try:
+            claims = read_token(token, ACCESS)
+        except signing.SignatureExpired:
+            raise exceptions.AuthenticationFailed("Access token expired.")
+        except signing.BadSignature:
+            raise exceptions.AuthenticationFailed("Invalid access token.")
+        return user_from_claims(claims), claims
+
+    def authenticate_header(self, request):
+        return self.keyword
@@ -5,7 +5,10 @@ from user_profiles.views import (
     # activateConfirm,
     accountActivateView,
     GetCSRFToken, LoginView, LogoutView,
-    testSessionView, quizView
+    TokenObtainView, TokenRefreshView, TokenRevokeView,
+    testSessionView, quizView, generationStatusView, questionStreamView,
+    asyncTestSessionView, asyncQuizView, quizHintView, quizRevealView, submitAnswersView,
+    weakestTopicsView, generationBackendsView, sessionHistoryView
 )
 urlpatterns = [
     path('auth/registration/', RegistrationView.as_view(), name='register'),
@@ -13,6 +16,19 @@ urlpatterns = [
     path('auth/csrf_cookie/', GetCSRFToken.as_view(), name='csrf_cookie'),
     path('auth/signin/', LoginView.as_view(), name='signin'),
     path('auth/logout/', LogoutView.as_view(), name='logout'),
+    path('auth/token/', TokenObtainView.as_view(), name='token-obtain'),
+    path('auth/token/refresh/', TokenRefreshView.as_view(), name='token-refresh'),
+    path('auth/token/revoke/', TokenRevokeView.as_view(), name='token-revoke'),
     path('generate/', testSessionView.as_view(), name='generate'),
-    path('quiz-session/<str:sessionId>/', quizView.as_view(), name='quiz-session')
+    path('generate/backends/', generationBackendsView.as_view(), name='generate-backends'),
+    path('generate/stream/', questionStreamView.as_view(), name='generate-stream'),
+    path('generate/<str:sessionId>/status/', generationStatusView.as_view(), name='generate-status'),
+    path('quiz-session/<str:sessionId>/', quizView.as_view(), name='quiz-session'),
+    path('quiz-session/<str:sessionId>/hints/', quizHintView.as_view(), name='quiz-hints'),
+    path('quiz-session/<str:sessionId>/reveal/', quizRevealView.as_view(), name='quiz-reveal'),
+    path('quiz-session/<str:sessionId>/submit/', submitAnswersView.as_view(), name='quiz-submit'),
+    path('sessions/', sessionHistoryView.as_view(), name='session-history'),
+    path('analytics/weakest-topics/', weakestTopicsView.as_view(), name='weakest-topics'),
+    path('async/generate/', asyncTestSessionView.as_view(), name='async-generate'),
+    path('async/quiz-session/<str:sessionId>/', asyncQuizView.as_view(), name='async-quiz-session')
 ]
\ No newline at end of file
@@ -19,19 +19,21 @@
 
 
 
-from django.core.mail import send_mail
 from django.conf import settings
 
+from user_profiles.outbox import queue_email
+
 def send_activation_email(recipient_email, activation_url):
-    
+    """
+    Queues the activation email in the outbox; the background sender delivers it.
+    """
     subject = "Activate your account"
     message = f"Click the link to activate your account:\n\n{activation_url}"
     from_email = settings.EMAIL_HOST_USER
 
-    send_mail(
+    queue_email(
         subject,
         message,
-        from_email,
         [recipient_email],
-        fail_silently=False,
+        from_email=from_email,
     )
@@ -1,21 +1,38 @@
+import asyncio
+import base64
+import hashlib
+import json
+from asgiref.sync import sync_to_async
 from rest_framework.views import APIView
 from rest_framework.permissions import (
-    AllowAny, IsAuthenticated
+    AllowAny, IsAuthenticated, IsAdminUser
     )
 from rest_framework.response import Response
+from rest_framework.authentication import CSRFCheck
 from user_profiles.serializers import (
-    UserSerializer, TestSessionSerializer, UserRegisterSerializer, QuizSerializer
+    UserSerializer, TestSessionSerializer, UserRegisterSerializer,
+    TestSessionStatusSerializer, AttemptSerializer, TopicMasterySerializer,
+    SessionSummarySerializer
     )
 from django.views.decorators.csrf import (
     ensure_csrf_cookie,
+    csrf_exempt,
     csrf_protect
     )
 from django.utils.decorators import method_decorator
+from django.views import View
+from django.http import HttpResponse, StreamingHttpResponse, JsonResponse
 from django.conf import settings
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import OuterRef, Q, Subquery
+from django.utils.dateparse import parse_datetime
+from django.utils import timezone
 from django.contrib.auth import (
-    authenticate, login, logout, get_user_model
+    authenticate, login, logout
     )
-from user_profiles.models import User, TestSession
+from user_profiles.models import User, TestSession, Question, Attempt
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import (
     urlsafe_base64_encode, urlsafe_base64_decode
@@ -25,7 +42,19 @@ from django.utils.encoding import (
     )
 from rest_framework import status
 from user_profiles.utils import send_activation_email
-from RAGpipelines.questionGeneratorPipeline import GeneratorClient
+from user_profiles.jobs import enqueue_test_session, top_up_questions
+from user_profiles.generation import agenerate_question_set, get_deduplicator, get_generator, get_router, user_scope
+from user_profiles.question_bank import tag_difficulty, take_from_bank
+from user_profiles.scoring import AlreadySubmitted, InvalidAnswer, submit_attempt
+from user_profiles.analytics import weakest_topics
+from user_profiles.skills import skill_model
+from user_profiles.tokens import (
+    ACCESS, REFRESH, bearer_token, issue_tokens, read_token, refresh_tokens, revoke_token, user_from_request
+    )
+from user_profiles.throttling import estimate_tokens, get_limiter, get_scheduler, limit_settings
+from RAGpipelines.questionSets import renumber_questions
+from RAGpipelines.tokenUsage import track_usage
+from scorpian.database import read_from_replica, reading_from_replica, replica_reads
 
 
 
@@ -54,23 +83,21 @@ class RegistrationView(APIView):
             print(request.data)
             
             if serializer.is_valid():
-                user = serializer.save()
-                user.is_active = False
-                user.save()
+                # the user and their activation email are stored together or not at all
+                with transaction.atomic():
+                    user = serializer.save()
+                    user.is_active = False
+                    user.save()
 
-                # Generate activation link
-                uid = urlsafe_base64_encode(force_bytes(user.pk))
-                token = default_token_generator.make_token(user)
+                    # Generate activation link
+                    uid = urlsafe_base64_encode(force_bytes(user.pk))
+                    token = default_token_generator.make_token(user)
 
-                # activation_path = reverse('activate', kwargs={'uid': uid, 'token':token})
-                activation_url = f"{settings.SITE_DOMAIN}/signup/activate?uid={uid}&token={token}"
+                    # activation_path = reverse('activate', kwargs={'uid': uid, 'token':token})
+                    activation_url = f"{settings.SITE_DOMAIN}/signup/activate?uid={uid}&token={token}"
 
-                # Send activation email (replace with actual email sending logic)
-                try:
+                    # queued in the outbox, delivered by the background sender
                     send_activation_email(user.email, activation_url)
-                except Exception as email_error:
-                    print(f"Error sending email: {email_error}")
-                    return Response({'message': 'Error sending activation email'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
                 return Response(
                     {"message": "User created. Check your email to activate your account."},
@@ -147,14 +174,7 @@ class LoginView(APIView):
             if not email or not password:
                 return Response({'message': 'Email and password are required.'}, status=status.HTTP_400_BAD_REQUEST)
 
-            # Check if user exists before authentication
-            try:
-                User = get_user_model()
-                user_obj = User.objects.get(email=email)
-            except User.DoesNotExist:
-                return Response({'message': 'User not found.'}, status=status.HTTP_404_NOT_FOUND)
-
-            # Authenticate the user
+            # a single lookup: authenticate() fetches the user and checks the password
             user = authenticate(request, email=email, password=password)
 
             if user is not None:
@@ -168,6 +188,91 @@ class LoginView(APIView):
 
 
 
+@method_decorator(csrf_exempt, name='dispatch')
+class TokenObtainView(APIView):
+    """
+    Exchanges email and password for a signed access token and a refresh token.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        email = request.data.get('email')
+        password = request.data.get('password')
+        if not email or not password:
+            return Response({'message': 'Email and password are required.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        user = authenticate(request, email=email, password=password)
+        if user is None:
+            return Response({'message': 'Email or password incorrect.'}, status=status.HTTP_401_UNAUTHORIZED)
+        return Response(issue_tokens(user), status=status.HTTP_200_OK)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class TokenRefreshView(APIView):
+    """
+    Rotates a refresh token: returns a new token pair and revokes the old refresh token.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        try:
+            tokens = refresh_tokens(request.data.get('refresh') or '')
+        except signing.BadSignature:
+            return Response({'message': 'Invalid or expired refresh token.'}, status=status.HTTP_401_UNAUTHORIZED)
+        return Response(tokens, status=status.HTTP_200_OK)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class TokenRevokeView(APIView):
+    """
+    Revokes the given refresh token and the access token of the request, if any.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        try:
+            revoke_token(read_token(request.data.get('refresh') or '', REFRESH))
+        except signing.BadSignature:
+            return Response({'message': 'Invalid or expired refresh token.'}, status=status.HTTP_401_UNAUTHORIZED)
+        access = bearer_token(request)
+        if access:
+            try:
+                revoke_token(read_token(access, ACCESS))
+            except signing.BadSignature:
+                pass
+        return Response({'detail': 'Token revoked'}, status=status.HTTP_200_OK)
+
+
+def _csrf_failure(request):
+    """
+    Why a session-authenticated request fails Django's CSRF check, None if it passes.
+    """
+    check = CSRFCheck(lambda request: None)
+    check.process_request(request)
+    return check.process_view(request, None, (), {})
+
+
+async def _authenticate(request):
+    """
+    (user, error response) for an async view. A bearer access token wins and
+    needs no CSRF token; the session user gets the CSRF check the middleware
+    skips for these csrf_exempt views.
+    """
+    user = user_from_request(request)
+    if user is not None:
+        return user, None
+    user = await request.auser()
+    if not user.is_authenticated:
+        return user, JsonResponse({'error': 'Authentication credentials were not provided.'}, status=status.HTTP_401_UNAUTHORIZED)
+    reason = _csrf_failure(request)
+    if reason:
+        return user, JsonResponse({'error': f'CSRF Failed: {reason}'}, status=status.HTTP_403_FORBIDDEN)
+    return user, None
+
+
 class LogoutView(APIView):
     def post(self, request):
         logout(request)
@@ -175,51 +280,599 @@ class LogoutView(APIView):
     
 
 
+ADAPTIVE_DIFFICULTY = 'adaptive'
+DIFFICULTY_LEVELS = [level for level, _ in TestSession.DIFFICULTIES] + [ADAPTIVE_DIFFICULTY]
+
+
+def _read_generation_params(data):
+    """
+    Pulls topicName, difficultyLevel and noOfQuestions out of request data.
+    Returns (topicsName, difficultyLevel, noOfQuestions, error).
+    """
+    topicsName = data.get('topicName')
+    difficultyLevel = data.get('difficultyLevel')
+    noOfQuestions = data.get('noOfQuestions')
+
+    if not topicsName or not difficultyLevel or not noOfQuestions:
+        return None, None, None, 'Missing required fields'
+    if difficultyLevel not in DIFFICULTY_LEVELS:
+        return None, None, None, f"difficultyLevel must be one of {', '.join(DIFFICULTY_LEVELS)}"
+
+    try:
+        noOfQuestions = int(noOfQuestions)
+    except (TypeError, ValueError):
+        return None, None, None, 'noOfQuestions must be an integer'
+
+    maxQuestions = limit_settings()["MAX_QUESTIONS"]
+    if not 1 <= noOfQuestions <= maxQuestions:
+        return None, None, None, f'noOfQuestions must be between 1 and {maxQuestions}'
+    if not get_limiter().fits(estimate_tokens(noOfQuestions)):
+        # the rate limiter could never admit it, it would wait until it times out
+        return None, None, None, 'noOfQuestions is more than the generation rate limit allows in one request'
+
+    return topicsName, difficultyLevel, noOfQuestions, None
+
+
+def _difficulty_mix(user, topicsName, difficultyLevel, noOfQuestions):
+    """
+    Questions per level for a request, chosen by the skill model for "adaptive".
+    Returns (mix, dominant level recorded on the session).
+    """
+    if difficultyLevel != ADAPTIVE_DIFFICULTY:
+        return {difficultyLevel: noOfQuestions}, difficultyLevel
+    difficultyMix = skill_model().pick_difficulty_mix(user.pk, topicsName, noOfQuestions)
+    return difficultyMix, max(difficultyMix, key=difficultyMix.get)
+
+
 class testSessionView(APIView):
     permission_classes = [IsAuthenticated]
     def post(self, request):
         user = request.user
-        topicsName = request.data.get('topicName')
-        difficultyLevel = request.data.get('difficultyLevel')
-        noOfQuestions = request.data.get('noOfQuestions')
+        topicsName, difficultyLevel, noOfQuestions, error = _read_generation_params(request.data)
+        if error:
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
 
-        if not topicsName or not difficultyLevel or not noOfQuestions:
-            return Response({'error': 'Missing required fields'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        generateTestSessionClient = GeneratorClient()
         try:
-            modelResponse = generateTestSessionClient.call_gemini(
-                prompt=topicsName, 
-                questions=noOfQuestions, 
-                difficulty_level=difficultyLevel)
+            difficultyMix, difficultyLevel = _difficulty_mix(user, topicsName, difficultyLevel, noOfQuestions)
+
+            # serve from the pre-generated bank first, the LLM only fills the shortfall
+            bankQuestions = []
+            for level, count in difficultyMix.items():
+                bankQuestions += take_from_bank(user, topicsName, level, count)
+            bankQuestions = renumber_questions(bankQuestions)
+            if len(bankQuestions) >= noOfQuestions:
+                test_session = TestSession.objects.create(
+                    user=user,
+                    topicsName=topicsName,
+                    noOfQuestions=noOfQuestions,
+                    difficultyLevel=difficultyLevel,
+                    difficultyMix=difficultyMix,
+                    status=TestSession.STATUS_COMPLETED
+                )
+                test_session.save_questions(bankQuestions)
+                serializer = TestSessionSerializer(test_session)
+                return Response(
+                    {"sessionId": serializer.data["sessionId"], "status": test_session.status},
+                    status=status.HTTP_201_CREATED
+                )
 
-            if "error" in modelResponse:
-                return Response({"error": modelResponse["error"]}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            
+            # generation runs in the background worker pool, the client polls the session status
             test_session = TestSession.objects.create(
                 user=user,
                 topicsName=topicsName,
                 noOfQuestions=noOfQuestions,
                 difficultyLevel=difficultyLevel,
-                questionsSet=modelResponse
+                difficultyMix=difficultyMix,
+                status=TestSession.STATUS_PENDING
             )
+            if bankQuestions:
+                test_session.save_questions(bankQuestions)
+            enqueue_test_session(test_session.pk, user.pk, noOfQuestions - len(bankQuestions))
             serializer = TestSessionSerializer(test_session)
 
-            return Response({"sessionId": serializer.data["sessionId"]}, status=status.HTTP_201_CREATED)
+            return Response(
+                {"sessionId": serializer.data["sessionId"], "status": test_session.status},
+                status=status.HTTP_202_ACCEPTED
+            )
           
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class generationStatusView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, sessionId):
+        try:
+            test_session = TestSession.objects.only('sessionId', 'status', 'errorMessage').get(
+                sessionId=sessionId, user=request.user)
+        except (TestSession.DoesNotExist, ValidationError):
+            return Response({"error": "Test session not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        serializer = TestSessionStatusSerializer(test_session)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
         
+QUIZ_FIELDS = {
+    'id': 'ordinal',
+    'question': 'text',
+    'choices': 'choices',
+    'related_topic': 'related_topic',
+}
+REVEAL_FIELDS = {
+    'id': 'ordinal',
+    'correct_index': 'correct_index',
+    'explanation': 'explanation',
+}
+HINT_FIELDS = {
+    'id': 'ordinal',
+    'hint': 'hint',
+}
+QUIZ_DEFAULT_FIELDS = ['id', 'question', 'choices']
+QUIZ_DEFAULT_LIMIT = 50
+QUIZ_MAX_LIMIT = 100
+ALREADY_SUBMITTED = 'Answers for this session were already submitted'
+
+
+def _etag_for(*parts):
+    # questions of a completed session never change, so the request shape identifies the payload
+    return '"' + hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest() + '"'
+
+
+def _etag_matches(request, etag):
+    header = request.headers.get('If-None-Match', '')
+    return etag in [tag.strip() for tag in header.split(',')] or header.strip() == '*'
+
+
+def _project_questions(queryset, fields, columns_by_field):
+    columns = [columns_by_field[field] for field in fields]
+    return [
+        {field: row[column] for field, column in zip(fields, columns)}
+        for row in queryset.values(*columns)
+    ]
+
+
+def _quiz_payload(request, params, user, sessionId):
+    """
+    Questions of one of ``user``'s sessions without their answers, projected to
+    the requested fields and paged by offset/limit. Shared by quizView and
+    asyncQuizView; returns (data, status, headers), data is None for a 304.
+    """
+    try:
+        # Retrieve the TestSession object using the sessionId
+        test_session = TestSession.objects.only('id', 'sessionId', 'status', 'errorMessage').get(
+            sessionId=sessionId, user=user)
+    except TestSession.DoesNotExist:
+        if reading_from_replica():
+            # a session created moments ago may not have reached the replica yet
+            with replica_reads(enabled=False):
+                return _quiz_payload(request, params, user, sessionId)
+        return {"error": "Test session not found"}, status.HTTP_404_NOT_FOUND, {}
+    except ValidationError:
+        return {"error": "Test session not found"}, status.HTTP_404_NOT_FOUND, {}
+
+    if test_session.status != TestSession.STATUS_COMPLETED:
+        # still generating (or failed), report progress instead of an empty set
+        serializer = TestSessionStatusSerializer(test_session)
+        return serializer.data, status.HTTP_202_ACCEPTED, {}
+
+    fields = [field for field in params.get('fields', '').split(',') if field] or QUIZ_DEFAULT_FIELDS
+    unknown = [field for field in fields if field not in QUIZ_FIELDS]
+    if unknown:
+        return {"error": f"Unknown fields: {', '.join(unknown)}"}, status.HTTP_400_BAD_REQUEST, {}
+    if 'id' not in fields:
+        fields = ['id'] + fields
+
+    try:
+        # offset is a cursor over question ids: return questions with id > offset
+        offset = max(int(params.get('offset', 0)), 0)
+        limit = min(max(int(params.get('limit', QUIZ_DEFAULT_LIMIT)), 1), QUIZ_MAX_LIMIT)
+    except ValueError:
+        return {"error": "offset and limit must be integers"}, status.HTTP_400_BAD_REQUEST, {}
+
+    etag = _etag_for(test_session.sessionId, test_session.status, ",".join(fields), offset, limit)
+    if _etag_matches(request, etag):
+        return None, status.HTTP_304_NOT_MODIFIED, {'ETag': etag}
+
+    page = Question.objects.filter(testSession=test_session, ordinal__gt=offset).order_by('ordinal')[:limit + 1]
+    questions = _project_questions(page, fields, QUIZ_FIELDS)
+    hasMore = len(questions) > limit
+    questions = questions[:limit]
+
+    data = {
+        "questionsSet": {"questions": questions},
+        "nextOffset": questions[-1]['id'] if hasMore else None,
+    }
+    return data, status.HTTP_200_OK, {'ETag': etag}
+
+
 class quizView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @method_decorator(read_from_replica)
+    def get(self, request, sessionId):
+        data, code, headers = _quiz_payload(request, request.query_params, request.user, sessionId)
+        return Response(data, status=code, headers=headers)
+
+
+def _question_columns(request, test_session, columns_by_field, tag):
+    """
+    The given columns of a completed session's questions, optionally limited
+    to ?ids=1,2; shared by the reveal and hint endpoints.
+    """
+    try:
+        ids = sorted({int(pk) for pk in request.query_params.get('ids', '').split(',') if pk})
+    except ValueError:
+        return Response({"error": "ids must be a comma separated list of question ids"}, status=status.HTTP_400_BAD_REQUEST)
+
+    etag = _etag_for(test_session.sessionId, test_session.status, tag, ",".join(map(str, ids)))
+    if _etag_matches(request, etag):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+    questions = Question.objects.filter(testSession=test_session).order_by('ordinal')
+    if ids:
+        questions = questions.filter(ordinal__in=ids)
+
+    return Response(
+        {"questions": _project_questions(questions, list(columns_by_field), columns_by_field)},
+        status=status.HTTP_200_OK,
+        headers={'ETag': etag}
+    )
+
+
+class quizHintView(APIView):
+    """
+    Hints of a session's questions, available while answering.
+    """
+    permission_classes = [IsAuthenticated]
+
     def get(self, request, sessionId):
         try:
-            # Retrieve the TestSession object using the sessionId
-            test_session = TestSession.objects.get(sessionId=sessionId)
-        except TestSession.DoesNotExist:
+            test_session = TestSession.objects.only('id', 'sessionId', 'status').get(
+                sessionId=sessionId, user=request.user)
+        except (TestSession.DoesNotExist, ValidationError):
             return Response({"error": "Test session not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        serializer = QuizSerializer(test_session)
-        
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        if test_session.status != TestSession.STATUS_COMPLETED:
+            return Response({"error": "Test session is not ready"}, status=status.HTTP_409_CONFLICT)
+        return _question_columns(request, test_session, HINT_FIELDS, 'hint')
+
+
+class quizRevealView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, sessionId):
+        try:
+            test_session = TestSession.objects.only('id', 'sessionId', 'status').get(
+                sessionId=sessionId, user=request.user)
+        except (TestSession.DoesNotExist, ValidationError):
+            return Response({"error": "Test session not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        if test_session.status != TestSession.STATUS_COMPLETED:
+            return Response({"error": "Test session is not ready"}, status=status.HTTP_409_CONFLICT)
+        if not Attempt.objects.filter(testSession=test_session, user=request.user).exists():
+            # answers are only revealed once the session's single attempt is scored
+            return Response({"error": "Submit your answers before revealing them"}, status=status.HTTP_409_CONFLICT)
+        return _question_columns(request, test_session, REVEAL_FIELDS, 'reveal')
+
+
+class submitAnswersView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, sessionId):
+        try:
+            test_session = TestSession.objects.only('id', 'sessionId', 'status', 'difficultyLevel', 'topicsName').get(
+                sessionId=sessionId, user=request.user)
+        except (TestSession.DoesNotExist, ValidationError):
+            return Response({"error": "Test session not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        if test_session.status != TestSession.STATUS_COMPLETED:
+            return Response({"error": "Test session is not ready"}, status=status.HTTP_409_CONFLICT)
+        if Attempt.objects.filter(testSession=test_session).exists():
+            return Response({"error": ALREADY_SUBMITTED}, status=status.HTTP_409_CONFLICT)
+
+        answers = request.data.get('answers')
+        if not isinstance(answers, (list, dict)):
+            return Response(
+                {"error": "answers must be a list of selected indices or a {questionId: index} object"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            attempt = submit_attempt(request.user, test_session, answers)
+        except InvalidAnswer as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except AlreadySubmitted:
+            # a concurrent submit of the same session won the unique constraint
+            return Response({"error": ALREADY_SUBMITTED}, status=status.HTTP_409_CONFLICT)
+        except (TypeError, ValueError):
+            return Response({"error": "Selected indices must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = AttemptSerializer(attempt)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class weakestTopicsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @method_decorator(read_from_replica)
+    def get(self, request):
+        difficultyLevel = request.query_params.get('difficultyLevel')
+        try:
+            limit = min(max(int(request.query_params.get('limit', 5)), 1), 50)
+            minAttempted = max(int(request.query_params.get('minAttempted', 1)), 1)
+        except ValueError:
+            return Response({"error": "limit and minAttempted must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+
+        topics = weakest_topics(request.user, limit=limit, difficulty_level=difficultyLevel, min_attempted=minAttempted)
+        serializer = TopicMasterySerializer(topics, many=True)
+        return Response({"topics": serializer.data}, status=status.HTTP_200_OK)
+
+
+def _encode_history_cursor(created_at, pk):
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{pk}".encode()).decode()
+
+
+def _decode_history_cursor(cursor):
+    created_at, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+    created_at = parse_datetime(created_at)
+    if created_at is None:
+        raise ValueError("bad cursor")
+    return created_at, int(pk)
+
+
+SESSION_SUMMARY_FIELDS = ('id', 'sessionId', 'topicsName', 'difficultyLevel', 'noOfQuestions', 'status', 'created_at')
+
+
+class sessionHistoryView(APIView):
+    """
+    The user's quiz sessions, newest first. Keyset pagination on (created_at, id)
+    walks the (user, created_at, id) index, so every page costs the same no
+    matter how deep it is. Only summary columns are read.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @method_decorator(read_from_replica)
+    def get(self, request):
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        sessions = TestSession.objects.filter(user=request.user)
+        cursor = request.query_params.get('cursor')
+        if cursor:
+            try:
+                created_at, pk = _decode_history_cursor(cursor)
+            except (ValueError, UnicodeDecodeError):
+                return Response({"error": "Invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
+            # the plain bound lets the index range scan start at the cursor
+            sessions = sessions.filter(created_at__lte=created_at).filter(
+                Q(created_at__lt=created_at) | Q(id__lt=pk))
+
+        # score of the latest attempt, if the quiz was taken
+        latest = Attempt.objects.filter(testSession=OuterRef('pk')).order_by('-created_at', '-id')
+        rows = list(
+            sessions.order_by('-created_at', '-id')
+            .annotate(score=Subquery(latest.values('score')[:1]), total=Subquery(latest.values('total')[:1]))
+            .values(*SESSION_SUMMARY_FIELDS, 'score', 'total')[:limit + 1]
+        )
+
+        nextCursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            nextCursor = _encode_history_cursor(rows[-1]['created_at'], rows[-1]['id'])
+
+        serializer = SessionSummarySerializer(rows, many=True)
+        return Response({"sessions": serializer.data, "nextCursor": nextCursor}, status=status.HTTP_200_OK)
+
+
+class generationBackendsView(APIView):
+    """
+    Rolling latency histograms and health of the model router backends.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        router = get_router()
+        if router is None:
+            client = get_generator()
+            return Response({"routing": False, "model": client.model_name, "policy": client.policy.stats()},
+                            status=status.HTTP_200_OK)
+        return Response({"routing": True, "backends": router.stats()}, status=status.HTTP_200_OK)
+
+
+async def _await_generation_slot(user_id, noOfQuestions):
+    """
+    Waits (without holding a worker) for the generation's turn in the fair
+    scheduler, behind the jobs already queued. Returns False if that takes
+    longer than MAX_WAIT seconds.
+    """
+    turn = get_scheduler().reserve(user_id, estimate_tokens(noOfQuestions))
+    try:
+        await asyncio.wait_for(asyncio.wrap_future(turn), timeout=limit_settings()["MAX_WAIT"])
+    except asyncio.TimeoutError:
+        turn.cancel()
+        return False
+    return True
+
+
+RATE_LIMITED = {'error': 'Too many questions requested, try again later.'}
+
+
+def _sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class questionStreamView(View):
+    """
+    Server-Sent Events endpoint that emits each question as soon as the LLM has
+    produced it. Needs an ASGI server (scorpian.asgi) to stream without holding a worker.
+    """
+
+    async def get(self, request):
+        user, error = await _authenticate(request)
+        if error:
+            return error
+
+        topicsName, difficultyLevel, noOfQuestions, error = _read_generation_params(request.GET)
+        if error:
+            return JsonResponse({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+        if not await _await_generation_slot(user.pk, noOfQuestions):
+            return JsonResponse(RATE_LIMITED, status=status.HTTP_429_TOO_MANY_REQUESTS)
+
+        difficultyMix, difficultyLevel = await sync_to_async(_difficulty_mix)(
+            user, topicsName, difficultyLevel, noOfQuestions)
+        test_session = await TestSession.objects.acreate(
+            user=user,
+            topicsName=topicsName,
+            noOfQuestions=noOfQuestions,
+            difficultyLevel=difficultyLevel,
+            difficultyMix=difficultyMix,
+            status=TestSession.STATUS_RUNNING,
+            startedAt=timezone.now()
+        )
+
+        async def events():
+            finished = False
+            try:
+                yield _sse_event("session", {"sessionId": str(test_session.sessionId)})
+                questions, dropped = [], []
+                deduplicator = get_deduplicator()
+                scopes = [user_scope(user.pk, topicsName)]
+                try:
+                    client = get_generator()
+                    with track_usage() as usage:
+                        # an adaptive mix streams one level after the other, ids continue across levels
+                        for level, count in difficultyMix.items():
+                            async for question in client.astream_questions(
+                                    prompt=topicsName, questions=count, difficulty_level=level):
+                                tag_difficulty([question], level)
+                                # near-duplicates of the questions already sent or of the user's history are held back
+                                kept, _ = await sync_to_async(deduplicator.filter)(
+                                    questions + [question], scopes=scopes, remember=False)
+                                if not kept or kept[-1] is not question:
+                                    dropped.append(question)
+                                    continue
+                                question["id"] = len(questions) + 1
+                                questions.append(question)
+                                yield _sse_event("question", question)
+                    if dropped:
+                        topped_up = await sync_to_async(top_up_questions)(
+                            user, topicsName, list(questions), dropped, difficultyMix)
+                        for question in topped_up[len(questions):]:
+                            question["id"] = len(questions) + 1
+                            questions.append(question)
+                            yield _sse_event("question", question)
+                except Exception as e:
+                    test_session.status = TestSession.STATUS_FAILED
+                    test_session.errorMessage = str(e)
+                    await test_session.asave(update_fields=["status", "errorMessage"])
+                    finished = True
+                    yield _sse_event("error", {"error": str(e)})
+                    return
+
+                # persist the finished set so quizView serves it like any other session
+                if questions:
+                    await test_session.asave_questions(questions)
+                    await sync_to_async(deduplicator.remember)(questions, scopes)
+                    test_session.status = TestSession.STATUS_COMPLETED
+                else:
+                    test_session.status = TestSession.STATUS_FAILED
+                    test_session.errorMessage = "No questions generated"
+                test_session.promptTokens = usage.prompt_tokens
+                test_session.completionTokens = usage.completion_tokens
+                await test_session.asave(update_fields=["status", "errorMessage", "promptTokens", "completionTokens"])
+                finished = True
+                yield _sse_event("done", {"sessionId": str(test_session.sessionId), "status": test_session.status})
+            finally:
+                if not finished:
+                    # the client went away mid-stream (GeneratorExit / CancelledError)
+                    await TestSession.objects.filter(pk=test_session.pk, status=TestSession.STATUS_RUNNING).aupdate(
+                        status=TestSession.STATUS_FAILED, errorMessage="Stream closed before generation finished")
+
+        response = StreamingHttpResponse(events(), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class asyncTestSessionView(View):
+    """
+    Async generate endpoint. Awaits the LLM on the event loop instead of a
+    worker thread, so one ASGI worker can keep many generations in flight.
+    """
+
+    async def post(self, request):
+        user, error = await _authenticate(request)
+        if error:
+            return error
+
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            return JsonResponse({'error': 'Invalid JSON body'}, status=status.HTTP_400_BAD_REQUEST)
+
+        topicsName, difficultyLevel, noOfQuestions, error = _read_generation_params(data)
+        if error:
+            return JsonResponse({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+        if not await _await_generation_slot(user.pk, noOfQuestions):
+            return JsonResponse(RATE_LIMITED, status=status.HTTP_429_TOO_MANY_REQUESTS)
+
+        try:
+            difficultyMix, difficultyLevel = await sync_to_async(_difficulty_mix)(
+                user, topicsName, difficultyLevel, noOfQuestions)
+            with track_usage() as usage:
+                # one generation per level of the mix, all in flight at once
+                modelResponses = await asyncio.gather(*(
+                    agenerate_question_set(topic=topicsName, questions=count, difficulty_level=level)
+                    for level, count in difficultyMix.items()
+                ))
+
+            questions = []
+            for level, modelResponse in zip(difficultyMix, modelResponses):
+                if "error" in modelResponse:
+                    return JsonResponse({"error": modelResponse["error"]}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                questions += tag_difficulty(modelResponse.get("questions", []), level)
+
+            # the same near-duplicate rules as the background job
+            deduplicator = get_deduplicator()
+            scopes = [user_scope(user.pk, topicsName)]
+            questions, dropped = await sync_to_async(deduplicator.filter)(questions, scopes=scopes, remember=False)
+            questions = await sync_to_async(top_up_questions)(user, topicsName, questions, dropped, difficultyMix)
+            if not questions:
+                return JsonResponse({"error": "No questions generated"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+            test_session = await TestSession.objects.acreate(
+                user=user,
+                topicsName=topicsName,
+                noOfQuestions=noOfQuestions,
+                difficultyLevel=difficultyLevel,
+                difficultyMix=difficultyMix,
+                status=TestSession.STATUS_COMPLETED,
+                promptTokens=usage.prompt_tokens,
+                completionTokens=usage.completion_tokens
+            )
+            await test_session.asave_questions(renumber_questions(questions[:noOfQuestions]))
+            await sync_to_async(deduplicator.remember)(questions[:noOfQuestions], scopes)
+            return JsonResponse({"sessionId": str(test_session.sessionId)}, status=status.HTTP_201_CREATED)
+
+        except Exception as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class asyncQuizView(View):
+
+    async def get(self, request, sessionId):
+        user, error = await _authenticate(request)
+        if error:
+            return error
+
+        with replica_reads():
+            data, code, headers = await sync_to_async(_quiz_payload)(request, request.GET, user, sessionId)
+        if data is None:
+            return HttpResponse(status=code, headers=headers)
+        return JsonResponse(data, status=code, headers=headers)